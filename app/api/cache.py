@@ -0,0 +1,110 @@
+import functools
+import hashlib
+import inspect
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import ResponseValidationError
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter, ValidationError
+
+from app.core.config import settings
+from app.infra.cache.backends import pack_entry, unpack_entry
+from app.infra.cache.response_cache import get_backend
+
+_REQ = "_cache_request"
+_ADAPTERS: Dict[Any, TypeAdapter] = {}
+
+
+def _key(request: Request) -> str:
+    q = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{q}"
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    inm = request.headers.get("if-none-match")
+    return bool(inm) and (inm.strip() == "*" or etag in [t.strip() for t in inm.split(",")])
+
+
+def _content(request: Request, result):
+    """
+    The route's response_model applied as FastAPI would (validation, field
+    filtering, aliases): a cached Response skips FastAPI's own serialization.
+    """
+    route = request.scope.get("route")
+    model = getattr(route, "response_model", None)
+    if model is None:
+        return jsonable_encoder(result)
+    adapter = _ADAPTERS.get(model)
+    if adapter is None:
+        adapter = _ADAPTERS[model] = TypeAdapter(model)
+    try:
+        value = adapter.validate_python(result, from_attributes=True)
+    except ValidationError as e:
+        raise ResponseValidationError(errors=e.errors(include_url=False), body=result)
+    return adapter.dump_python(
+        value, mode="json", by_alias=True,
+        exclude_unset=route.response_model_exclude_unset,
+        exclude_defaults=route.response_model_exclude_defaults,
+        exclude_none=route.response_model_exclude_none,
+    )
+
+
+def _respond(request: Request, etag: str, body: bytes, hit: bool) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "X-Cache": "hit" if hit else "miss"}
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def cached(ttl: Optional[float] = None) -> Callable:
+    """
+    Cache a GET endpoint's JSON body by route + query params. Entries are
+    valid until `ttl` (default CACHE_TTL_SECONDS) or until a commit that
+    changed data bumps the data version. Responses carry an ETag and a
+    matching If-None-Match gets 304. The endpoint's own dependencies (auth)
+    still run on every request.
+    """
+    def deco(fn: Callable) -> Callable:
+        sig = inspect.signature(fn)
+        extra = inspect.Parameter(_REQ, inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+
+        def _lookup(request: Request):
+            backend = get_backend()
+            version = backend.version()
+            raw = backend.get(_key(request))
+            if raw is not None:
+                v, etag, body = unpack_entry(raw)
+                if v == version:
+                    return version, (etag, body)
+            return version, None
+
+        def _store(request: Request, version: int, result) -> Response:
+            if isinstance(result, Response):
+                return result
+            body = JSONResponse(_content(request, result)).body
+            etag = '"%s"' % hashlib.sha1(body).hexdigest()[:20]
+            get_backend().set(_key(request), pack_entry(version, etag, body), settings.CACHE_TTL_SECONDS if ttl is None else ttl)
+            return _respond(request, etag, body, hit=False)
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                request: Request = kwargs.pop(_REQ)
+                version, hit = _lookup(request)
+                if hit:
+                    return _respond(request, *hit, hit=True)
+                return _store(request, version, await fn(*args, **kwargs))
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                request: Request = kwargs.pop(_REQ)
+                version, hit = _lookup(request)
+                if hit:
+                    return _respond(request, *hit, hit=True)
+                return _store(request, version, fn(*args, **kwargs))
+
+        wrapper.__signature__ = sig.replace(parameters=[*sig.parameters.values(), extra])
+        return wrapper
+    return deco
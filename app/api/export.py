@@ -0,0 +1,121 @@
+import csv
+import importlib.util
+import io
+import json
+from datetime import datetime
+from typing import Callable, Iterator, List, Sequence
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+
+from app.infra.db.database import SessionLocal
+
+FORMATS = ("csv", "ndjson", "parquet")
+_MEDIA = {"csv": "text/csv", "ndjson": "application/x-ndjson", "parquet": "application/vnd.apache.parquet"}
+# rows per server-side cursor fetch / CSV flush / parquet row group
+BATCH_ROWS = 5000
+
+
+def _rows(build: Callable[[Session], Select]) -> Iterator[Sequence]:
+    # own session: the request-scoped one may be closed before the body is streamed
+    db = SessionLocal()
+    try:
+        q = build(db).execution_options(yield_per=BATCH_ROWS)
+        for row in db.execute(q):
+            yield row
+    finally:
+        db.close()
+
+
+def _plain(v):
+    if isinstance(v, datetime):
+        return v.isoformat()
+    if isinstance(v, (dict, list)):
+        return json.dumps(v, default=str)
+    return v
+
+
+def _csv(columns: List[str], rows: Iterator[Sequence]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(columns)
+    n = 0
+    for r in rows:
+        w.writerow([_plain(v) for v in r])
+        n += 1
+        if n % BATCH_ROWS == 0:
+            yield buf.getvalue().encode()
+            buf.seek(0); buf.truncate()
+    yield buf.getvalue().encode()
+
+
+def _json_default(v):
+    return v.isoformat() if isinstance(v, datetime) else str(v)
+
+
+def _ndjson(columns: List[str], rows: Iterator[Sequence]) -> Iterator[bytes]:
+    for r in rows:
+        yield (json.dumps(dict(zip(columns, r)), default=_json_default) + "\n").encode()
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file that hands written bytes back to the generator."""
+    def __init__(self):
+        self.chunks: List[bytes] = []
+    def writable(self):
+        return True
+    def write(self, b):
+        self.chunks.append(bytes(b))
+        return len(b)
+    def take(self) -> bytes:
+        out = b"".join(self.chunks)
+        self.chunks.clear()
+        return out
+
+
+def _parquet(columns: List[str], rows: Iterator[Sequence]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    sink = _Sink()
+    writer = None
+    batch: List[Sequence] = []
+
+    def flush():
+        nonlocal writer
+        cols = list(zip(*batch)) if batch else [[] for _ in columns]
+        table = pa.table({c: [_plain(v) if isinstance(v, (dict, list)) else v for v in vals]
+                          for c, vals in zip(columns, cols)})
+        if writer is None:
+            # columns that are all NULL in the first row group can't be typed yet: write them as strings
+            schema = pa.schema([pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f
+                                for f in table.schema])
+            writer = pq.ParquetWriter(sink, schema)
+        writer.write_table(table.cast(writer.schema) if table.schema != writer.schema else table)
+        batch.clear()
+
+    for r in rows:
+        batch.append(r)
+        if len(batch) >= BATCH_ROWS:
+            flush()
+            yield sink.take()
+    if batch or writer is None:
+        flush()
+    writer.close()
+    yield sink.take()
+
+
+def stream_export(build: Callable[[Session], Select], columns: List[str], fmt: str, filename: str) -> StreamingResponse:
+    """
+    Stream a query as CSV / NDJSON / Parquet through a server-side cursor;
+    memory is bounded by BATCH_ROWS whatever the result size.
+    """
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(FORMATS)}")
+    if fmt == "parquet":
+        if importlib.util.find_spec("pyarrow") is None:
+            raise HTTPException(status_code=400, detail="parquet export needs the pyarrow package")
+    body = {"csv": _csv, "ndjson": _ndjson, "parquet": _parquet}[fmt](columns, _rows(build))
+    return StreamingResponse(body, media_type=_MEDIA[fmt],
+                             headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'})
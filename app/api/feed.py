@@ -0,0 +1,46 @@
+import asyncio
+import json
+from typing import AsyncIterator
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.infra.feed.anomaly_feed import get_broker
+from app.infra.feed.broker import Subscription
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _events(request: Request, sub: Subscription) -> AsyncIterator[str]:
+    broker = get_broker()
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                ev = await asyncio.wait_for(sub.queue.get(), settings.FEED_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keepalive\n\n"
+                continue
+            dropped = sub.take_dropped()
+            if dropped:
+                # the client fell behind; it should re-read the listing to catch up
+                yield _sse("dropped", {"count": dropped})
+            yield _sse(ev["event"], ev)
+    finally:
+        broker.unsubscribe(sub)
+
+
+def stream_feed(request: Request, **filters) -> StreamingResponse:
+    broker = get_broker()
+    if not broker.running:
+        raise HTTPException(503, "Anomaly feed is disabled")
+    sub = broker.subscribe(**filters)
+    if sub is None:
+        raise HTTPException(503, "Too many feed clients")
+    return StreamingResponse(_events(request, sub), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
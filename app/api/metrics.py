@@ -0,0 +1,50 @@
+import time
+
+from fastapi import Response
+
+from app.infra.metrics.instruments import HTTP_LATENCY, REGISTRY
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (no per-request task or body buffering): records the
+    time until the response headers go out, labelled with the route template so
+    /anomalies/{id}/resolve stays one series. Streaming bodies (exports, the SSE
+    feed) are therefore measured to their first byte. Unmatched paths are
+    grouped under "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        t0 = time.perf_counter()
+        done = False
+
+        def record(status):
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_LATENCY.observe(time.perf_counter() - t0, (scope["method"], path, str(status)))
+
+        async def send_wrapper(message):
+            nonlocal done
+            if message["type"] == "http.response.start" and not done:
+                done = True
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            if not done:
+                done = True
+                record(500)
+            raise
+
+
+def metrics_response() -> Response:
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -1,8 +1,11 @@
-from fastapi import APIRouter
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
+from app.api.cache import cached
+from app.api.deps import get_uow, require_role
 
-router = APIRouter(prefix="/api/v1/analytics", tags=["analytics"])
+router = APIRouter(prefix="/api/v1/analytics", tags=["analytics"], dependencies=[Depends(require_role("admin","analyst"))])
 
 class ThreatType(BaseModel):
     type: str
@@ -13,6 +16,8 @@ class ThreatType(BaseModel):
 class ThreatDistributionResp(BaseModel):
     threat_types: List[ThreatType]
     total_threats: int
+    start: datetime
+    end: datetime
 
 class DeptRisk(BaseModel):
     department_id: str
@@ -24,24 +29,39 @@ class DeptRisk(BaseModel):
 class RiskByDeptResp(BaseModel):
     departments: List[DeptRisk]
 
+def _utc(ts: Optional[datetime]) -> Optional[datetime]:
+    if ts is not None and ts.tzinfo is None:
+        return ts.replace(tzinfo=timezone.utc)
+    return ts
+
 @router.get("/threat-distribution", response_model=ThreatDistributionResp)
-def threat_distribution():
+@cached()
+def threat_distribution(uow = Depends(get_uow), start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """Anomalies per type detected in [start, end) (default: last 7 days), from anomaly_counts_hourly."""
+    end = _utc(end) or datetime.now(timezone.utc)
+    start = _utc(start) or end - timedelta(days=7)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    rows = uow.analytics.anomaly_type_counts(start, end)
+    total = sum(r["count"] for r in rows)
     return {
         "threat_types": [
-            {"type": "data_exfiltration", "label": "Data Exfiltration", "count": 23, "percentage": 35},
-            {"type": "privilege_abuse", "label": "Privilege Abuse", "count": 18, "percentage": 28},
-            {"type": "geo_anomaly", "label": "Geo Anomaly", "count": 14, "percentage": 22},
-            {"type": "off_hours", "label": "Off-hours Activity", "count": 11, "percentage": 15},
+            {**r, "percentage": round(100.0 * r["count"] / total, 1) if total else 0.0} for r in rows
         ],
-        "total_threats": 66,
+        "total_threats": total,
+        "start": start,
+        "end": end,
     }
 
 @router.get("/risk-by-department", response_model=RiskByDeptResp)
-def risk_by_department():
+@cached()
+def risk_by_department(uow = Depends(get_uow)):
+    """Risk per user group from group_risk (roles stand in for departments)."""
     return {
         "departments": [
-            {"department_id": "dept_fin", "department_name": "Finance", "average_risk_score": 92, "user_count": 45, "high_risk_users": 3},
-            {"department_id": "dept_it", "department_name": "IT Ops", "average_risk_score": 70, "user_count": 60, "high_risk_users": 5},
-            {"department_id": "dept_hr", "department_name": "HR", "average_risk_score": 58, "user_count": 22, "high_risk_users": 1},
+            {"department_id": g["group_code"], "department_name": g["group_name"],
+             "average_risk_score": g["average_risk_score"], "user_count": g["user_count"],
+             "high_risk_users": g["high_risk_users"]}
+            for g in uow.analytics.group_risk()
         ]
     }
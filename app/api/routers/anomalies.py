@@ -1,11 +1,34 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
+from datetime import datetime
+from typing import Literal
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
+from pydantic import BaseModel, Field
+from app.api.cache import cached
 from app.api.deps import get_uow, require_role
+from app.api.export import stream_export
+from app.api.feed import stream_feed
+from app.infra.db.repositories.anomaly_repo import AnomalyRepo
 from app.core.responses import ok
+from app.domain.services.triage import TriageService
 from app.infra.db.models import Anomaly, User, AnomalyType
 
 router = APIRouter(prefix="/anomalies", tags=["anomalies"], dependencies=[Depends(require_role("admin","analyst"))])
 
+class TriageFilter(BaseModel):
+    type: str | None = None
+    uid: str | None = None
+    since: datetime | None = None
+    until: datetime | None = None
+    max_risk: float | None = Field(None, description="only anomalies with risk below this")
+    status: Literal["open", "closed"] | None = None
+
+class TriageRequest(BaseModel):
+    action: Literal["close", "reopen", "assign"]
+    ids: list[int] | None = None
+    filter: TriageFilter | None = None
+    assignee: str | None = Field(None, max_length=128, description="for action=assign; null unassigns")
+
 @router.get("")
+@cached()
 def list_anomalies(uow = Depends(get_uow), status: str | None = Query(None, pattern="^(open|closed)$"), limit: int = 50, offset: int = 0):
     q = (uow._session.query(Anomaly, User.uid, AnomalyType.code)
             .join(User, Anomaly.user_id == User.id)
@@ -17,7 +40,7 @@ def list_anomalies(uow = Depends(get_uow), status: str | None = Query(None, patt
     for a, uid, at_code in q.all():
         items.append({
             "id": a.id, "uid": uid, "type": at_code, "score": a.score,
-            "risk": a.risk, "confidence": a.confidence, "status": a.status,
+            "risk": a.risk, "confidence": a.confidence, "status": a.status, "assignee": a.assignee,
             "detected_at": a.detected_at, "evidence": a.evidence_json
         })
     return ok({"items": items, "count": len(items)})
@@ -27,6 +50,35 @@ def resolve_anomaly(anomaly_id: int, uow = Depends(get_uow)):
     a = uow._session.get(Anomaly, anomaly_id)
     if not a: raise HTTPException(404, "Anomaly not found")
     if a.status != "closed":
-        a.status = "closed"
+        uow.anomalies.set_status(anomaly_id, "closed")
+        # only open anomalies count towards risk (as in TriageService)
+        uow.users.refresh_risk({a.user_id})
+        uow.analytics.apply_group_deltas(uow.users.pop_group_deltas())
         uow.commit()
     return ok({"id": anomaly_id, "status": "closed"})
+
+@router.post("/triage")
+def triage_anomalies(body: TriageRequest, uow = Depends(get_uow)):
+    """Close / reopen / reassign every anomaly matching `ids` and/or `filter` (both given: both must match)."""
+    filters = body.filter.model_dump(exclude_none=True) if body.filter else {}
+    if body.ids is None and not filters:
+        raise HTTPException(400, "Give ids or at least one filter")
+    if "type" in filters:
+        filters["type_code"] = filters.pop("type")
+    return ok(TriageService(uow).apply(body.action, ids=body.ids, assignee=body.assignee, **filters))
+
+@router.get("/export")
+def export_anomalies(status: str | None = Query(None, pattern="^(open|closed)$"),
+                     format: str = Query("csv", pattern="^(csv|ndjson|parquet)$")):
+    """Every matching anomaly, streamed (CSV / NDJSON / Parquet)."""
+    return stream_export(lambda db: AnomalyRepo(db).export_query(status), AnomalyRepo.EXPORT_COLUMNS,
+                         format, "anomalies")
+
+@router.get("/stream")
+async def stream_anomalies(request: Request,
+                           type: str | None = Query(None, description="comma-separated anomaly type codes"),
+                           min_risk: float = Query(0.0, ge=0),
+                           user_id: int | None = None):
+    """Server-sent events for anomalies created or updated after the client connects."""
+    types = {t.strip() for t in type.split(",") if t.strip()} if type else None
+    return stream_feed(request, types=types, min_risk=min_risk, user_id=user_id)
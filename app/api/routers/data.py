@@ -3,8 +3,11 @@ from app.api.deps import get_uow, require_role
 from app.core.responses import ok
 from app.domain.entities.log import LogEntity
 from app.domain.entities.user import UserEntity
+from app.domain.services.feature_builder import FeatureBuilder
+from app.domain.services.ingest import ingest_observers
+from app.infra.metrics.instruments import INGEST_RATE, INGEST_UPLOAD
 
-import io, csv, json
+import io, csv, json, time
 from datetime import datetime, timezone
 
 # ?????? ??????: admin/analyst
@@ -42,8 +45,12 @@ async def upload_logs(file: UploadFile, uow = Depends(get_uow)):
         raise HTTPException(status_code=400, detail="Empty file")
 
     required = {"uid","timestamp","activity_type"}
+    t0 = time.perf_counter()
     inserted = 0
     buffer: list[LogEntity] = []
+    observers = ingest_observers()
+    found = []
+    first_ts = last_ts = None
 
     try:
         for r in _read_rows(raw):
@@ -61,16 +68,24 @@ async def upload_logs(file: UploadFile, uow = Depends(get_uow)):
 
             ts = _parse_ts(r.get("timestamp"))
             hour = ts.hour
+            aware = ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+            if first_ts is None or aware < first_ts:
+                first_ts = aware
+            if last_ts is None or aware > last_ts:
+                last_ts = aware
 
             at_code = str(r.get("activity_type")).strip()
             at_id = uow.logs.resolve_activity_type_id(at_code)
 
-            buffer.append(LogEntity(
+            log = LogEntity(
                 id=None, user_id=u.id, ts=ts, activity_type_id=at_id,
                 source_ip=r.get("source_ip"),
                 params=r, hour=hour,
                 is_weekend=None, is_night=None
-            ))
+            )
+            buffer.append(log)
+            for obs in observers:
+                found.extend(obs.observe(uow, log, at_code))
 
             if len(buffer) >= 5000:
                 inserted += uow.logs.bulk_add(buffer)
@@ -78,9 +93,23 @@ async def upload_logs(file: UploadFile, uow = Depends(get_uow)):
 
         if buffer:
             inserted += uow.logs.bulk_add(buffer)
+        for obs in observers:
+            found.extend(obs.flush(uow))
+        if found:
+            uow.anomalies.bulk_add(found)
+            uow.users.refresh_risk({a.user_id for a in found})
+            uow.analytics.refresh_anomaly_buckets(uow.anomalies.pop_touched_buckets())
+        if first_ts is not None:
+            # late or historical rows: stored feature windows that cover them are stale
+            FeatureBuilder(uow).invalidate(first_ts, last_ts)
+        # last before commit: the touched group_risk rows stay locked until then
+        uow.analytics.apply_group_deltas(uow.users.pop_group_deltas())
 
         uow.commit()
-        return ok({"inserted": inserted})
+        elapsed = time.perf_counter() - t0
+        INGEST_UPLOAD.observe(elapsed)
+        INGEST_RATE.set(inserted / elapsed if elapsed > 0 else 0.0)
+        return ok({"inserted": inserted, "anomalies": len(found)})
 
     except HTTPException:
         raise
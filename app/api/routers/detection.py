@@ -1,12 +1,82 @@
-from fastapi import APIRouter, Depends, Query
+import json
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi.responses import StreamingResponse
 from app.api.deps import get_uow, require_role
 from app.core.responses import ok
 from app.domain.services.detection_service import DetectionService
+from app.domain.services.feature_builder import FEATURE_VERSION
+from app.infra.db.database import SessionLocal
+from app.infra.db.repositories.feature_repo import FeatureStoreRepo
+from app.infra.db.profiler import QueryProfiler
+from app.infra.models.catboost_detector import FEATURE_SCHEMAS
+from app.infra.models.preload import model_status, reload_changed_models
 
 router = APIRouter(prefix="/detection", tags=["detection"], dependencies=[Depends(require_role("admin"))])
 
 @router.post("/run")
-def run_detection(uow = Depends(get_uow), enabled: list[str] | None = Query(None)):
-    svc = DetectionService(uow)
-    created = svc.run_all(enabled)
-    return ok({"created": created})
+def run_detection(uow = Depends(get_uow), enabled: list[str] | None = Query(None),
+                  profile: bool = False, dry_run: bool = False):
+    profiler = QueryProfiler(uow._session) if profile else None
+    svc = DetectionService(uow, profiler=profiler)
+    with profiler or nullcontext():
+        created = svc.run_all(enabled, dry_run=dry_run)
+    if not (profile or dry_run):
+        return ok({"created": created})
+    data = {"created": 0, "would_create": created} if dry_run else {"created": created}
+    data["dry_run"] = dry_run
+    if profiler:
+        data["profile"] = profiler.report()
+    return ok(data)
+
+@router.post("/refresh-risk")
+def refresh_risk(uow = Depends(get_uow)):
+    """Re-aggregate users.risk_score / anomaly_count for every user (e.g. periodically when decay is on)."""
+    updated = uow.users.refresh_risk(None)
+    uow.analytics.refresh_group_risk()
+    uow.commit()
+    return ok({"updated": updated})
+
+@router.get("/feature-schemas/{schema_id}")
+def feature_schema(schema_id: str, uow = Depends(get_uow)):
+    """Column list behind the `feature_schema` id stored in model anomaly evidence."""
+    cols = FEATURE_SCHEMAS.get(schema_id) or uow.features.get_schema(schema_id)
+    if cols is None:
+        raise HTTPException(404, "Unknown feature schema")
+    return ok({"id": schema_id, "columns": cols})
+
+@router.get("/models")
+def models():
+    return ok({"models": model_status()})
+
+@router.post("/models/reload")
+def reload_models():
+    """Load new versions of changed model files and swap them in."""
+    return ok({"reloaded": reload_changed_models(), "models": model_status()})
+
+@router.get("/features/windows")
+def feature_windows(uow = Depends(get_uow), version: int | None = None, limit: int = Query(100, ge=1, le=1000)):
+    """Stored feature windows (newest first)."""
+    return ok({"current_version": FEATURE_VERSION, "windows": uow.features.windows(version, limit)})
+
+@router.get("/features/export")
+def export_features(as_of: datetime | None = None, version: int = FEATURE_VERSION):
+    """
+    Point-in-time training snapshot as NDJSON: for every user the latest stored
+    feature row whose window ended at or before `as_of` (default: now).
+    """
+    as_of = as_of or datetime.now(timezone.utc)
+    if as_of.tzinfo is None:
+        as_of = as_of.replace(tzinfo=timezone.utc)
+
+    def lines():
+        # own session: the request-scoped one may be closed before the body is streamed
+        db = SessionLocal()
+        try:
+            for uid, we, feats in FeatureStoreRepo(db).iter_as_of(as_of, version):
+                yield json.dumps({"user_id": uid, "window_end": we.isoformat(), **feats}) + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -0,0 +1,15 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, Query
+from app.api.deps import require_role
+from app.api.export import stream_export
+from app.infra.db.repositories.log_repo import LogRepo
+
+router = APIRouter(prefix="/logs", tags=["logs"], dependencies=[Depends(require_role("admin","analyst"))])
+
+@router.get("/export")
+def export_logs(uid: str | None = None, activity_type: str | None = None,
+                since: datetime | None = None, until: datetime | None = None,
+                format: str = Query("csv", pattern="^(csv|ndjson|parquet)$")):
+    """Raw logs ordered by time, streamed (CSV / NDJSON / Parquet)."""
+    return stream_export(lambda db: LogRepo(db).export_query(uid, activity_type, since, until),
+                         LogRepo.EXPORT_COLUMNS, format, "logs")
@@ -1,8 +1,15 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 from app.infra.db.database import get_db
+from app.infra.db.slow_queries import get_recorder
+from app.api.deps import require_role
 from app.core.responses import ok
+from app.infra.db.lookup_cache import lookup_cache
+from app.infra.cache.response_cache import get_backend
+from app.infra.feed.anomaly_feed import get_broker
+from app.core.auth_supabase import jwks_stats
+from app.core.token_cache import token_cache
 
 router = APIRouter(prefix="/system", tags=["system"])
 
@@ -18,6 +25,37 @@ def status(db: Session = Depends(get_db)):
     except Exception as e:
         return ok({"db": "error", "reason": str(e)[:200]})
 
+@router.get("/lookup-cache", dependencies=[Depends(require_role("admin"))])
+def lookup_cache_stats():
+    return ok(lookup_cache.stats())
+
+@router.get("/response-cache", dependencies=[Depends(require_role("admin"))])
+def response_cache_stats():
+    return ok(get_backend().stats())
+
+@router.get("/anomaly-feed", dependencies=[Depends(require_role("admin"))])
+def anomaly_feed_stats():
+    return ok(get_broker().stats())
+
+@router.get("/auth-cache", dependencies=[Depends(require_role("admin"))])
+def auth_cache_stats():
+    return ok({"tokens": token_cache.stats(), "jwks": jwks_stats()})
+
+@router.get("/slow-queries", dependencies=[Depends(require_role("admin"))])
+def slow_queries(tag: str | None = None, limit: int = 50):
+    """Recent statements over SLOW_QUERY_MS (newest first) with parameters and sampled EXPLAIN plans."""
+    recorder = get_recorder()
+    if recorder is None:
+        raise HTTPException(404, "Slow-query recorder is off (SLOW_QUERY_MS=0)")
+    return ok({**recorder.summary(), "entries": recorder.entries(tag, limit)})
+
+@router.delete("/slow-queries", dependencies=[Depends(require_role("admin"))])
+def clear_slow_queries():
+    recorder = get_recorder()
+    if recorder is not None:
+        recorder.clear()
+    return ok({"cleared": recorder is not None})
+
 @router.post("/dev-token")
 def dev_token(uid: str = "demo-user", role: str = "admin"):
     from app.core.security import create_token
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Query
+import base64
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 from typing import List, Literal, Optional, Dict
+from app.api.cache import cached
+from app.api.deps import get_uow, require_role
+from app.core.config import settings
+from app.infra.utils.ipgeo import IPGeoResolver
 
-router = APIRouter(prefix="/api/v1/users", tags=["users"])
+router = APIRouter(prefix="/api/v1/users", tags=["users"], dependencies=[Depends(require_role("admin","analyst"))])
 
 class Department(BaseModel):
     id: str
@@ -49,6 +55,8 @@ class Pagination(BaseModel):
     per_page: int
     total_pages: int
     total_count: int
+    # opaque keyset cursor for the next page (pass as `cursor`); None on the last page
+    next_cursor: Optional[str] = None
 
 class UsersResp(BaseModel):
     users: List[UserOut]
@@ -59,89 +67,87 @@ class UsersStatsResp(BaseModel):
     total_users: int
     by_status: Dict[str, int]
 
-_MOCK_USERS: List[UserOut] = [
-    UserOut(
-        user_id="usr_1",
-        username="j.anderson",
-        full_name="Jane Anderson",
-        email="j.anderson@example.com",
-        department=Department(id="dept_fin", name="Finance"),
-        role=Role(id="role_sa", title="Senior Analyst"),
-        status="high_risk",
-        risk_score=92,
-        last_login=LastLogin(timestamp="2025-10-24T15:45:00Z", relative="2 min ago"),
-        location=Location(city="Unknown", country="Unknown", is_suspicious=True),
-        device=Device(type="desktop", os="Windows 11", browser="Chrome"),
-        anomalies=Anoms(today=3, this_week=8),
-    ),
-    UserOut(
-        user_id="usr_2",
-        username="m.chen",
-        full_name="Michael Chen",
-        email="m.chen@example.com",
-        department=Department(id="dept_it", name="IT Operations"),
-        role=Role(id="role_sys", title="Systems Admin"),
-        status="investigating",
-        risk_score=87,
-        last_login=LastLogin(timestamp="2025-10-24T15:30:00Z", relative="15 min ago"),
-        location=Location(city="New York", country="US", is_suspicious=False),
-        device=Device(type="laptop", os="macOS", browser="Safari"),
-        anomalies=Anoms(today=2, this_week=6),
-    ),
-    UserOut(
-        user_id="usr_3",
-        username="s.rodriguez",
-        full_name="Sarah Rodriguez",
-        email="s.rodriguez@example.com",
-        department=Department(id="dept_hr", name="HR"),
-        role=Role(id="role_mgr", title="HR Manager"),
-        status="normal",
-        risk_score=78,
-        last_login=LastLogin(timestamp="2025-10-24T14:50:00Z", relative="1 hour ago"),
-        location=Location(city="London", country="UK", is_suspicious=False),
-        device=Device(type="laptop", os="Windows 10", browser="Edge"),
-        anomalies=Anoms(today=1, this_week=5),
-    ),
-]
-
-def _filter_users(users: List[UserOut], status: str, department: str, q: str) -> List[UserOut]:
-    out = users
-    if status != "all":
-        status_norm = status.replace("-", "_").lower()
-        out = [u for u in out if u.status == status_norm]
-    if department != "all":
-        out = [u for u in out if u.department.name.lower() == department.lower()]
-    if q:
-        ql = q.lower()
-        out = [u for u in out if ql in u.username.lower() or ql in u.full_name.lower() or ql in u.department.name.lower()]
-    return out
+_STATUSES = ("normal", "investigating", "high_risk")
+_geo = IPGeoResolver()
+
+def _encode_cursor(risk: float, user_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{risk!r}:{user_id}".encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        risk, uid = raw.split(":")
+        return float(risk), int(uid)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _relative(ts: datetime | None) -> str:
+    if ts is None:
+        return "never"
+    secs = int((datetime.now(timezone.utc) - ts).total_seconds())
+    for unit, size in (("day", 86400), ("hour", 3600), ("min", 60)):
+        if secs >= size:
+            n = secs // size
+            return f"{n} {unit}{'s' if n > 1 and unit != 'min' else ''} ago"
+    return "just now"
+
+def _user_out(row: dict, act: dict) -> UserOut:
+    loc = _geo.locate(act["last_ip"]) if act["last_ip"] else None
+    ts = act["last_login"]
+    return UserOut(
+        user_id=row["uid"],
+        username=row["username"] or row["uid"],
+        full_name=row["username"] or row["uid"],
+        email=row["email"],
+        # no departments in the schema yet: the role doubles as the department
+        department=Department(id=row["role_code"], name=row["role_name"]),
+        role=Role(id=row["role_code"], title=row["role_name"]),
+        status=row["status"],
+        risk_score=int(round(row["risk_score"])),
+        last_login=LastLogin(timestamp=ts.isoformat() if ts else "", relative=_relative(ts)),
+        location=Location(city="Unknown", country=(loc[2] if loc and loc[2] else "Unknown"), is_suspicious=False),
+        device=Device(type="unknown", os="unknown", browser="unknown"),
+        anomalies=Anoms(today=act["today"], this_week=act["week"]),
+    )
 
 @router.get("", response_model=UsersResp)
+@cached()
 def list_users(
+    uow = Depends(get_uow),
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=100),
     status: str = Query("all"),
     department: str = Query("all"),
     search: str = Query(""),
+    cursor: Optional[str] = Query(None),
 ):
-    filtered = _filter_users(_MOCK_USERS, status, department, search)
-    total = len(filtered)
-    start = (page - 1) * per_page
-    end = start + per_page
-    slice_ = filtered[start:end]
+    status_norm = status.replace("-", "_").lower()
+    if status_norm != "all" and status_norm not in _STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of: all, {', '.join(_STATUSES)}")
+    filters = {
+        "status": None if status_norm == "all" else status_norm,
+        "role": None if department == "all" else department,
+        "search": search.strip() or None,
+    }
+    after = _decode_cursor(cursor) if cursor else None
+    rows = uow.users.list_page(**filters, limit=per_page, after=after,
+                               offset=0 if after else (page - 1) * per_page)
+    total = uow.users.count_filtered(**filters)
+    act = uow.users.page_activity([r["id"] for r in rows])
     total_pages = max(1, (total + per_page - 1) // per_page)
+    next_cursor = _encode_cursor(rows[-1]["risk_score"], rows[-1]["id"]) if len(rows) == per_page else None
     return {
-        "users": slice_,
+        "users": [_user_out(r, act[r["id"]]) for r in rows],
         "pagination": {
-            "page": page, "per_page": per_page, "total_pages": total_pages, "total_count": total
+            "page": page, "per_page": per_page, "total_pages": total_pages, "total_count": total,
+            "next_cursor": next_cursor,
         },
         "filters_applied": {"status": status, "department": department, "search_query": search},
     }
 
 @router.get("/statistics", response_model=UsersStatsResp)
-def users_statistics():
-    total = len(_MOCK_USERS)
-    by = {"normal": 0, "investigating": 0, "high_risk": 0}
-    for u in _MOCK_USERS:
-        by[u.status] = by.get(u.status, 0) + 1
-    return {"total_users": total, "by_status": by}
+@cached(ttl=settings.USERS_STATS_TTL_SECONDS)
+def users_statistics(uow = Depends(get_uow)):
+    # one GROUP BY; the response cache keeps it until data changes or the TTL ends
+    by = uow.users.status_counts()
+    return {"total_users": sum(by.values()), "by_status": by}
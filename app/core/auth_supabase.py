@@ -1,43 +1,61 @@
-import requests, json
+import threading
+from typing import Optional
 from jose import jwt
 from fastapi import HTTPException, Depends, Request
 from datetime import datetime
 
-JWKS_CACHE = None
-JWKS_URL = None
-ISS = None
-AUD = None
+from app.core.config import settings
+from app.core.jwks import JWKSManager
+from app.core.token_cache import token_cache
 
-def init_jwks():
-    global JWKS_CACHE, JWKS_URL, ISS, AUD
-    from app.core.config import settings
-    JWKS_URL = settings.SUPABASE_JWKS_URL
-    ISS = settings.SUPABASE_ISS
-    AUD = settings.SUPABASE_AUDIENCE
-    if not JWKS_URL:
-        raise RuntimeError("SUPABASE_JWKS_URL not set")
-    if JWKS_CACHE is None:
-        res = requests.get(JWKS_URL)
-        res.raise_for_status()
-        JWKS_CACHE = res.json()
+_MANAGER: Optional[JWKSManager] = None
+_INIT_LOCK = threading.Lock()
+
+def init_jwks() -> JWKSManager:
+    """Load the keys and start the background refresh (called at startup; lazily as a fallback)."""
+    global _MANAGER
+    with _INIT_LOCK:
+        if _MANAGER is None:
+            if not settings.SUPABASE_JWKS_URL:
+                raise RuntimeError("SUPABASE_JWKS_URL not set")
+            manager = JWKSManager(settings.SUPABASE_JWKS_URL, settings.JWKS_REFRESH_SECONDS,
+                                  settings.JWKS_MIN_REFRESH_SECONDS)
+            # tokens signed by a key that was withdrawn must not outlive it in the cache
+            manager.on_removed = lambda kids: token_cache.clear("jwks")
+            manager.start()
+            _MANAGER = manager
+    return _MANAGER
+
+def stop_jwks():
+    if _MANAGER is not None:
+        _MANAGER.stop()
+
+def jwks_stats() -> Optional[dict]:
+    return _MANAGER.stats() if _MANAGER else None
 
 def verify_jwt(token: str):
-    if JWKS_CACHE is None:
-        init_jwks()
+    claims = token_cache.get("jwks", token)
+    if claims is not None:
+        return claims
+    manager = _MANAGER or init_jwks()
     try:
         header = jwt.get_unverified_header(token)
-        key = next((k for k in JWKS_CACHE["keys"] if k["kid"] == header["kid"]), None)
+        key = manager.get(header.get("kid"))
         if not key:
             raise HTTPException(status_code=401, detail="Invalid key id")
-        return jwt.decode(
+        claims = jwt.decode(
             token,
             key,
             algorithms=["RS256"],
-            audience=AUD,
-            issuer=ISS,
+            audience=settings.SUPABASE_AUDIENCE,
+            issuer=settings.SUPABASE_ISS or None,
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"JWT invalid: {e}")
+    token_cache.put("jwks", token, claims)
+    return claims
 
 def get_current_user(request: Request):
     auth = request.headers.get("Authorization")
@@ -10,15 +10,103 @@ except Exception:
 
 class Settings(BaseModel):
     APP_ENV: str = os.getenv("APP_ENV", "dev")
+    # Which routes a worker serves: "api" (no detection routes, models and ML libraries are never
+    # loaded), "detection" (system + detection routes, models preloaded) or "all"
+    APP_ROLE: str = os.getenv("APP_ROLE", "all")
     PORT: int = int(os.getenv("PORT", "8001"))
     JWT_SECRET: str = os.getenv("JWT_SECRET", "change_me")
 
+    # Supabase-issued RS256 tokens: keys come from the JWKS endpoint, loaded at startup and
+    # refreshed every JWKS_REFRESH_SECONDS (or on an unknown kid, at most every JWKS_MIN_REFRESH_SECONDS)
+    SUPABASE_JWKS_URL: str = os.getenv("SUPABASE_JWKS_URL", "")
+    SUPABASE_ISS: str = os.getenv("SUPABASE_ISS", "")
+    SUPABASE_AUDIENCE: str = os.getenv("SUPABASE_AUDIENCE", "authenticated")
+    JWKS_REFRESH_SECONDS: float = float(os.getenv("JWKS_REFRESH_SECONDS", "3600"))
+    JWKS_MIN_REFRESH_SECONDS: float = float(os.getenv("JWKS_MIN_REFRESH_SECONDS", "30"))
+    # verified token claims kept in-process (LRU, each entry until the token's exp; 0 = off)
+    TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
     DB_HOST: str = os.getenv("DB_HOST", "localhost")
     DB_PORT: str = os.getenv("DB_PORT", "5432")
     DB_NAME: str = os.getenv("DB_NAME", "postgres")
     DB_USER: str = os.getenv("DB_USER", "postgres")
     DB_PASSWORD: str = os.getenv("DB_PASSWORD", "")
 
+    # users.risk_score = max open-anomaly risk, halved every N hours (0 = no decay)
+    RISK_HALF_LIFE_HOURS: float = float(os.getenv("RISK_HALF_LIFE_HOURS", "0"))
+
+    # Models: load + warm at startup, poll model files for hot reload (0 = off)
+    MODEL_PRELOAD: bool = os.getenv("MODEL_PRELOAD", "1") == "1"
+    MODEL_WATCH_SECONDS: float = float(os.getenv("MODEL_WATCH_SECONDS", "30"))
+
+    # Model inference over the active population in user-id chunks (0 = one matrix);
+    # INFER_WORKERS > 0 scores chunks in a process pool
+    INFER_CHUNK_SIZE: int = int(os.getenv("INFER_CHUNK_SIZE", "50000"))
+    INFER_WORKERS: int = int(os.getenv("INFER_WORKERS", "0"))
+
+    # Per-user feature store: model features are computed once per window
+    # (window_end aligned down to FEATURE_STEP_MINUTES) and read back from user_features
+    FEATURE_STORE: bool = os.getenv("FEATURE_STORE", "1") == "1"
+    FEATURE_STEP_MINUTES: int = int(os.getenv("FEATURE_STEP_MINUTES", "60"))
+
+    # Threshold rule definitions: a YAML/JSON file or a directory of them (empty = bundled definitions)
+    THRESHOLD_RULES_PATH: str = os.getenv("THRESHOLD_RULES_PATH", "")
+
+    # first_seen_entity: no alerts until a user's novelty index is this many days old
+    NOVELTY_LEARNING_DAYS: int = int(os.getenv("NOVELTY_LEARNING_DAYS", "14"))
+    # per-user Bloom filters: first layer sized for NOVELTY_BLOOM_CAPACITY values at NOVELTY_BLOOM_FP,
+    # growing as needed; stored filters over NOVELTY_BLOOM_MAX_FP are started over
+    NOVELTY_BLOOM_CAPACITY: int = int(os.getenv("NOVELTY_BLOOM_CAPACITY", "256"))
+    NOVELTY_BLOOM_FP: float = float(os.getenv("NOVELTY_BLOOM_FP", "0.01"))
+    NOVELTY_BLOOM_MAX_FP: float = float(os.getenv("NOVELTY_BLOOM_MAX_FP", "0.05"))
+
+    # GET /users/statistics is cached for this long
+    USERS_STATS_TTL_SECONDS: float = float(os.getenv("USERS_STATS_TTL_SECONDS", "30"))
+
+    # Read-endpoint response cache (ETag / 304). CACHE_URL=redis://... shares entries and the
+    # data version between workers; CACHE_URL=memory:// is an in-process LRU for a single worker
+    # only. Unset: caching is off
+    CACHE_URL: str = os.getenv("CACHE_URL", "")
+    CACHE_TTL_SECONDS: float = float(os.getenv("CACHE_TTL_SECONDS", "30"))
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+
+    # POST /anomalies/triage updates (and commits) matching anomalies in chunks of this many rows
+    TRIAGE_CHUNK_SIZE: int = int(os.getenv("TRIAGE_CHUNK_SIZE", "5000"))
+
+    # GET /metrics (Prometheus text format, per worker process): request latency, DB pool and
+    # statement timing, ingest and detection-stage metrics
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "1") == "1"
+
+    # Slow-query recorder (GET /system/slow-queries): statements over SLOW_QUERY_MS (0 = off) are kept
+    # in a ring buffer tagged with the repository method; a sample of slow reads gets EXPLAIN ANALYZE
+    SLOW_QUERY_MS: float = float(os.getenv("SLOW_QUERY_MS", "500"))
+    SLOW_QUERY_EXPLAIN_RATE: float = float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", "0.1"))
+    SLOW_QUERY_CAPACITY: int = int(os.getenv("SLOW_QUERY_CAPACITY", "200"))
+    SLOW_QUERY_EXPLAIN_TIMEOUT_MS: int = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", "30000"))
+
+    # Live anomaly feed (GET /anomalies/stream). "pg" publishes committed writes with NOTIFY and
+    # every worker LISTENs, so clients see writes from all workers; "memory" only sees this
+    # worker's writes; "off" disables the feed
+    FEED_BACKEND: str = os.getenv("FEED_BACKEND", "memory")
+    FEED_QUEUE_SIZE: int = int(os.getenv("FEED_QUEUE_SIZE", "256"))
+    FEED_MAX_CLIENTS: int = int(os.getenv("FEED_MAX_CLIENTS", "200"))
+    FEED_MAX_EVENTS_PER_COMMIT: int = int(os.getenv("FEED_MAX_EVENTS_PER_COMMIT", "500"))
+    FEED_KEEPALIVE_SECONDS: float = float(os.getenv("FEED_KEEPALIVE_SECONDS", "15"))
+
+    # Real-time detection on the ingest path
+    STREAM_DETECTION: bool = os.getenv("STREAM_DETECTION", "1") == "1"
+    STREAM_MAX_USERS: int = int(os.getenv("STREAM_MAX_USERS", "100000"))
+    STREAM_IDLE_SECONDS: int = int(os.getenv("STREAM_IDLE_SECONDS", str(6 * 3600)))
+    STREAM_FAILED_RING: int = int(os.getenv("STREAM_FAILED_RING", "32"))
+
+    @property
+    def SERVES_API(self) -> bool:
+        return self.APP_ROLE in ("all", "api")
+
+    @property
+    def SERVES_DETECTION(self) -> bool:
+        return self.APP_ROLE in ("all", "detection")
+
     @property
     def DATABASE_URL(self) -> str:
         # URL-encode user/password لتفادي أي رموز خاصة (@ : % & / ...)
@@ -0,0 +1,106 @@
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from jose import jwk
+from jose.backends.base import Key
+
+
+class JWKSManager:
+    """
+    Signing keys of the identity provider, indexed by `kid` and prepared once
+    (no per-request JWK parsing or key-list scan). Loaded at startup and
+    refreshed by a background thread every `ttl` seconds; a token with an
+    unknown kid (key rotation) triggers an immediate refresh, at most once per
+    `min_interval` seconds and by one thread at a time. A failed refresh keeps
+    the previous keys.
+    """
+
+    def __init__(self, url: str, ttl: float = 3600, min_interval: float = 30, timeout: float = 5):
+        self.url = url
+        self.ttl = ttl
+        self.min_interval = min_interval
+        self.timeout = timeout
+        self._keys: Dict[str, Key] = {}
+        self._fetch_lock = threading.RLock()
+        self._last_attempt = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.loaded_at: Optional[float] = None
+        self.refreshes = 0
+        self.errors = 0
+        # called with the removed kids when a refresh drops keys (revoked signing keys)
+        self.on_removed = None
+
+    def refresh(self) -> int:
+        with self._fetch_lock:
+            self._last_attempt = time.time()
+            try:
+                res = requests.get(self.url, timeout=self.timeout)
+                res.raise_for_status()
+                keys: Dict[str, Key] = {}
+                for k in res.json().get("keys", []):
+                    if not k.get("kid"):
+                        continue
+                    try:
+                        keys[k["kid"]] = jwk.construct(k, k.get("alg", "RS256"))
+                    except Exception as e:
+                        print("JWKS key skipped:", k.get("kid"), e)
+            except Exception:
+                self.errors += 1
+                raise
+            removed = set(self._keys) - set(keys)
+            self._keys = keys
+            self.loaded_at = time.time()
+            self.refreshes += 1
+        if removed and self.on_removed:
+            self.on_removed(removed)
+        return len(keys)
+
+    def get(self, kid: str) -> Optional[Key]:
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+        if time.time() - self._last_attempt < self.min_interval:
+            return None
+        with self._fetch_lock:
+            # another thread may have refreshed while this one waited
+            key = self._keys.get(kid)
+            if key is not None or time.time() - self._last_attempt < self.min_interval:
+                return key
+            try:
+                self.refresh()
+            except Exception as e:
+                print("JWKS refresh error:", e)
+            return self._keys.get(kid)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.ttl if self.loaded_at else self.min_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print("JWKS refresh error:", e)
+
+    def start(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            print("JWKS load error:", e)
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="jwks-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "url": self.url,
+            "kids": sorted(self._keys),
+            "loaded_at": self.loaded_at,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+        }
@@ -1,6 +1,7 @@
 import os, time
 from typing import Optional, Dict, Any
 from jose import jwt, JWTError
+from app.core.token_cache import token_cache
 
 ALGO = "HS256"
 SECRET = os.getenv("JWT_SECRET", "change_me")
@@ -17,7 +18,12 @@ def create_token(sub: str, role: str = "user", expires_in: int = 3600) -> str:
     return jwt.encode(payload, SECRET, algorithm=ALGO)
 
 def verify_token(token: str) -> Optional[Dict[str, Any]]:
+    claims = token_cache.get("hs", token)
+    if claims is not None:
+        return claims
     try:
-        return jwt.decode(token, SECRET, algorithms=[ALGO], options={"verify_aud": False})
+        claims = jwt.decode(token, SECRET, algorithms=[ALGO], options={"verify_aud": False})
     except JWTError:
         return None
+    token_cache.put("hs", token, claims)
+    return claims
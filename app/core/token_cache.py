@@ -0,0 +1,74 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+
+class TokenCache:
+    """
+    Bounded LRU of verified token claims, keyed by sha256 of the token (the raw
+    token is never kept). An entry is served only until the token's `exp`, so a
+    cache hit never accepts a token that full verification would reject as
+    expired. Tokens without `exp` are not cached.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(scope: str, token: str) -> str:
+        return scope + ":" + hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, scope: str, token: str) -> Optional[Dict[str, Any]]:
+        key = self._key(scope, token)
+        now = time.time()
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is not None and hit[0] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return hit[1]
+            if hit is not None:
+                del self._data[key]
+            self.misses += 1
+        return None
+
+    def put(self, scope: str, token: str, claims: Dict[str, Any]) -> None:
+        exp = claims.get("exp")
+        if self.max_entries <= 0 or not isinstance(exp, (int, float)) or exp <= time.time():
+            return
+        key = self._key(scope, token)
+        with self._lock:
+            self._data[key] = (float(exp), claims)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self, scope: Optional[str] = None) -> None:
+        with self._lock:
+            if scope is None:
+                self._data.clear()
+            else:
+                for k in [k for k in self._data if k.startswith(scope + ":")]:
+                    del self._data[k]
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else None,
+            }
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE)
@@ -1,12 +1,24 @@
 from abc import ABC, abstractmethod
-from app.domain.repositories.base import IUserRepo, ILogRepo, IAnomalyRepo
+from typing import Callable
+from app.domain.repositories.base import IUserRepo, ILogRepo, IAnomalyRepo, IFeatureRepo, IBaselineRepo, ISketchRepo, INoveltyRepo, IAnalyticsRepo
 
 class IUnitOfWork(ABC):
     users: IUserRepo
     logs: ILogRepo
     anomalies: IAnomalyRepo
+    features: IFeatureRepo
+    baselines: IBaselineRepo
+    sketches: ISketchRepo
+    novelty: INoveltyRepo
+    analytics: IAnalyticsRepo
 
     @abstractmethod
     def commit(self) -> None: ...
     @abstractmethod
     def rollback(self) -> None: ...
+    @abstractmethod
+    def on_commit(self, fn: Callable[[], None]) -> None:
+        """Run `fn` after the next successful commit; dropped on rollback."""
+    @abstractmethod
+    def detached(self) -> "IUnitOfWork":
+        """A new unit of work on its own transaction (commits on a clean `with` exit)."""
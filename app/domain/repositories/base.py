@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import Iterable, Optional
+from typing import Dict, Iterable, Optional
+from datetime import datetime
 from app.domain.entities.user import UserEntity
 from app.domain.entities.log import LogEntity
 from app.domain.entities.anomaly import AnomalyEntity
@@ -16,7 +17,13 @@ class IUserRepo(ABC):
     @abstractmethod
     def bump_user_risk(self, user_id:int, risk:float) -> None: ...
     @abstractmethod
+    def refresh_risk(self, user_ids: Optional[Iterable[int]] = None, half_life_hours: Optional[float] = None) -> int: ...
+    @abstractmethod
+    def pop_group_deltas(self) -> Dict: ...
+    @abstractmethod
     def top_by_risk(self, limit:int=100, min_risk:float=0) -> list[UserEntity]: ...
+    @abstractmethod
+    def role_codes(self, user_ids: Iterable[int]) -> Dict[int, str]: ...
 
 class ILogRepo(ABC):
     @abstractmethod
@@ -33,3 +40,61 @@ class IAnomalyRepo(ABC):
     def set_status(self, anomaly_id: int, status: str) -> None: ...
     @abstractmethod
     def resolve_type_id(self, code: str) -> int: ...
+
+class IFeatureRepo(ABC):
+    @abstractmethod
+    def is_complete(self, window_end: datetime, version: int, window_hours: int) -> bool: ...
+    @abstractmethod
+    def lock_windows(self) -> None: ...
+    @abstractmethod
+    def invalidate(self, since: datetime, until: datetime, reach_hours: int) -> int: ...
+    @abstractmethod
+    def upsert(self, window_end: datetime, version: int, feats: Dict[int, Dict]) -> int: ...
+    @abstractmethod
+    def mark_complete(self, window_end: datetime, version: int, window_hours: int, user_count: int) -> None: ...
+    @abstractmethod
+    def user_ids(self, window_end: datetime, version: int) -> list[int]: ...
+    @abstractmethod
+    def read_window(self, window_end: datetime, version: int, user_id_range=None) -> Dict[int, Dict]: ...
+    @abstractmethod
+    def save_schemas(self, schemas: Dict[str, list]) -> None: ...
+    @abstractmethod
+    def get_schema(self, schema_id: str) -> Optional[list]: ...
+
+class IBaselineRepo(ABC):
+    @abstractmethod
+    def get_many(self, user_ids: Iterable[int], for_update: bool = False) -> Dict: ...
+    @abstractmethod
+    def save_many(self, baselines: Iterable) -> int: ...
+    @abstractmethod
+    def deviating(self, since: datetime, min_hours: int, min_z: float, min_std: float = 1.0) -> list: ...
+    @abstractmethod
+    def mark_alerted(self, user_ids: Iterable[int]) -> None: ...
+
+class ISketchRepo(ABC):
+    @abstractmethod
+    def get_many(self, keys: Iterable[tuple], for_update: bool = False) -> Dict: ...
+    @abstractmethod
+    def save_many(self, sketches: Dict) -> int: ...
+    @abstractmethod
+    def in_ranges(self, attr: str, ranges: list, user_id_range=None) -> list: ...
+    @abstractmethod
+    def prune(self, before: datetime) -> int: ...
+
+class INoveltyRepo(ABC):
+    @abstractmethod
+    def get_many(self, user_ids: Iterable[int], for_update: bool = False) -> Dict: ...
+    @abstractmethod
+    def save_many(self, rows: Dict) -> int: ...
+
+class IAnalyticsRepo(ABC):
+    @abstractmethod
+    def refresh_anomaly_buckets(self, buckets: Iterable[datetime]) -> int: ...
+    @abstractmethod
+    def refresh_group_risk(self) -> None: ...
+    @abstractmethod
+    def apply_group_deltas(self, deltas: Dict) -> None: ...
+    @abstractmethod
+    def anomaly_type_counts(self, start: datetime, end: datetime) -> list: ...
+    @abstractmethod
+    def group_risk(self) -> list: ...
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta, timezone
+from typing import List
+from app.domain.rules.base import DetectionRule
+from app.core.uow import IUnitOfWork
+from app.domain.entities.anomaly import AnomalyEntity
+from app.domain.services.baselines import hour_bucket
+
+class BaselineDeviationRule(DetectionRule):
+    """
+    Flags users whose event count in the current hour is far above their own
+    hourly baseline (z-score over user_baselines; no log history is read).
+    """
+    name = "baseline_deviation"
+
+    MIN_Z = 3.0
+    MIN_HOURS = 7 * 24      # don't judge users with less than a week of baseline
+    MIN_STD = 1.0           # floor so near-constant users aren't flagged for one extra event
+    CONFIDENCE = 0.6
+
+    def score(self, z: float):
+        score = min(1.0, z / (2 * self.MIN_Z))
+        risk = round(100 * (0.6 * score + 0.4 * 0.5), 2)
+        return score, risk
+
+    def run(self, uow: IUnitOfWork) -> List[AnomalyEntity]:
+        out: List[AnomalyEntity] = []
+        now = datetime.now(timezone.utc)
+        # the open hour, or the previous one if nothing arrived yet this hour
+        since = hour_bucket(now) - timedelta(hours=1)
+        hits = uow.baselines.deviating(since, self.MIN_HOURS, self.MIN_Z, self.MIN_STD)
+        if not hits:
+            return out
+        anom_type_id = uow.anomalies.resolve_type_id(self.name)
+        for b, z in hits:
+            score, risk = self.score(z)
+            out.append(AnomalyEntity(
+                id=None, user_id=b.user_id, anomaly_type_id=anom_type_id,
+                score=score, risk=risk, confidence=self.CONFIDENCE, status="open",
+                detected_at=now,
+                evidence={
+                    "hour": b.cur_bucket.isoformat(),
+                    "events": b.cur_count,
+                    "baseline_mean": round(b.mean, 3),
+                    "baseline_std": round(b.std, 3),
+                    "z": round(z, 2),
+                    "hour_share": round(b.hour_share(b.cur_bucket.hour), 4),
+                    "typical_activities": [c for c, _ in b.top_activities()],
+                },
+            ))
+        uow.baselines.mark_alerted([b.user_id for b, _ in hits])
+        return out
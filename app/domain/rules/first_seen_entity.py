@@ -0,0 +1,47 @@
+from datetime import datetime
+from ipaddress import ip_network
+from typing import Dict, Optional, Tuple
+from app.domain.entities.anomaly import AnomalyEntity
+
+class FirstSeenEntityRule:
+    """
+    A user acting from an IP, network, country or device never seen for them
+    before. Evaluated per event at ingest (see domain/services/novelty.py)
+    against the user's novelty index, so it has no batch `run`.
+    """
+    name = "first_seen_entity"
+
+    # per-attribute severity; the event score is the highest novel one
+    WEIGHTS = {"ip": 0.3, "ip_prefix": 0.5, "device": 0.6, "country": 0.9}
+    DEVICE_KEYS = ("device", "device_id", "user_agent")
+    CONFIDENCE = 0.6
+
+    @staticmethod
+    def ip_prefix(ip: str) -> Optional[str]:
+        # /24 for IPv4, /48 for IPv6
+        try:
+            net = ip_network(ip + ("/48" if ":" in ip else "/24"), strict=False)
+        except ValueError:
+            return None
+        return str(net)
+
+    def device(self, params: dict | None) -> Optional[str]:
+        params = params or {}
+        for k in self.DEVICE_KEYS:
+            v = params.get(k)
+            if v:
+                return str(v)
+        return None
+
+    def score(self, novel: Dict[str, str]) -> Tuple[float, float]:
+        score = max(self.WEIGHTS[a] for a in novel)
+        risk = round(100 * (0.7 * score + 0.3 * 0.5), 2)
+        return score, risk
+
+    def anomaly(self, user_id: int, anom_type_id: int, ts: datetime, novel: Dict[str, str]) -> AnomalyEntity:
+        score, risk = self.score(novel)
+        return AnomalyEntity(
+            id=None, user_id=user_id, anomaly_type_id=anom_type_id,
+            score=score, risk=risk, confidence=self.CONFIDENCE, status="open",
+            detected_at=ts, evidence={"first_seen": novel, "source": "stream"},
+        )
@@ -1,5 +1,5 @@
 from datetime import datetime, timezone
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 from ipaddress import ip_address, ip_network
 from app.domain.rules.base import DetectionRule
 from app.core.uow import IUnitOfWork
@@ -14,6 +14,10 @@ class ImpossibleTravelRule(DetectionRule):
     # fallback: ???? ??? /24 ?? ??? ?? 30 ?????  ????? ????
     FALLBACK_MINUTES = 30
 
+    SCORE = 0.8       # ???? ??????
+    RISK = 85.0       # ???? ?????? ???? ????? ????? ????????
+    CONFIDENCE = 0.75
+
     def _same24(self, ip1: str, ip2: str) -> bool:
         try:
             n1 = ip_network(ip1 + "/24", strict=False)
@@ -22,6 +26,28 @@ class ImpossibleTravelRule(DetectionRule):
         except Exception:
             return False
 
+    def check_hop(self, prev_ts: datetime, prev_ip: str, prev_loc, curr_ts: datetime, curr_ip: str, curr_loc,
+                  geo: IPGeoResolver) -> Optional[dict]:
+        """Evidence dict if the hop prev -> curr is impossible travel, else None."""
+        evidence = {"prev_ip": prev_ip, "curr_ip": curr_ip, "prev_ts": prev_ts.isoformat(), "curr_ts": curr_ts.isoformat()}
+
+        if prev_loc and curr_loc:
+            speed = geo.speed_kmph(prev_loc, prev_ts, curr_loc, curr_ts)
+            if speed and speed > self.SPEED_THRESHOLD_KMPH:
+                evidence["speed_kmph"] = round(speed, 2)
+                evidence["prev_country"] = prev_loc[2]
+                evidence["curr_country"] = curr_loc[2]
+                return evidence
+            return None
+
+        # Fallback: ?????? /24 ???? ???? ?????
+        delta_min = abs((curr_ts - prev_ts).total_seconds())/60.0
+        if curr_ip and prev_ip and (not self._same24(prev_ip, curr_ip)) and delta_min <= self.FALLBACK_MINUTES:
+            evidence["delta_minutes"] = int(delta_min)
+            evidence["subnet_jump"] = True
+            return evidence
+        return None
+
     def run(self, uow: IUnitOfWork) -> List[AnomalyEntity]:
         geo = IPGeoResolver()
         out: List[AnomalyEntity] = []
@@ -46,30 +72,12 @@ class ImpossibleTravelRule(DetectionRule):
             for curr_ts, curr_ip in seq[1:]:
                 curr_loc = geo.locate(curr_ip)
 
-                flagged = False
-                evidence = {"prev_ip": prev_ip, "curr_ip": curr_ip, "prev_ts": prev_ts.isoformat(), "curr_ts": curr_ts.isoformat()}
-
-                if prev_loc and curr_loc:
-                    speed = geo.speed_kmph(prev_loc, prev_ts, curr_loc, curr_ts)
-                    if speed and speed > self.SPEED_THRESHOLD_KMPH:
-                        flagged = True
-                        evidence["speed_kmph"] = round(speed, 2)
-                        evidence["prev_country"] = prev_loc[2]
-                        evidence["curr_country"] = curr_loc[2]
-                else:
-                    # Fallback: ?????? /24 ???? ???? ?????
-                    delta_min = abs((curr_ts - prev_ts).total_seconds())/60.0
-                    if curr_ip and prev_ip and (not self._same24(prev_ip, curr_ip)) and delta_min <= self.FALLBACK_MINUTES:
-                        flagged = True
-                        evidence["delta_minutes"] = int(delta_min)
-                        evidence["subnet_jump"] = True
-
-                if flagged:
-                    score = 0.8  # ???? ??????
-                    risk  = 85.0 # ???? ?????? ???? ????? ????? ????????
+                evidence = self.check_hop(prev_ts, prev_ip, prev_loc, curr_ts, curr_ip, curr_loc, geo)
+
+                if evidence is not None:
                     out.append(AnomalyEntity(
                         id=None, user_id=user_id, anomaly_type_id=anom_type_id,
-                        score=score, risk=risk, confidence=0.75, status="open",
+                        score=self.SCORE, risk=self.RISK, confidence=self.CONFIDENCE, status="open",
                         detected_at=curr_ts, evidence=evidence
                     ))
 
@@ -0,0 +1,62 @@
+from datetime import datetime, timezone
+from typing import List
+import numpy as np
+from app.domain.rules.base import DetectionRule
+from app.core.uow import IUnitOfWork
+from app.domain.entities.anomaly import AnomalyEntity
+from app.domain.services.feature_builder import FeatureBuilder
+from app.domain.services.peer_groups import robust_zscores
+
+class PeerDeviationRule(DetectionRule):
+    """
+    Compares each user's 24h feature vector with the other users of the same
+    role (median/MAD robust z-scores, all users and features in one pass).
+    Only count/volume features are compared: an hour of day is not an amount
+    of activity, so a late login is not "unusually high". A feature counts
+    only when the user is also at least MIN_DEVIATION above the peer median,
+    so a few failed logins in a group that mostly has none are not an outlier.
+    """
+    name = "peer_deviation"
+
+    MIN_Z = 3.5             # Iglewicz-Hoaglin outlier cut-off
+    MIN_PEERS = 5
+    MIN_DEVIATION = 5.0     # events (or distinct values) above the peer median
+    MIN_SCALE = 1.0         # z-score denominator floor: one event
+    CONFIDENCE = 0.55
+    # feature columns that are not activity volumes
+    NON_VOLUME = ("last_login_hour",)
+
+    def score(self, z: float):
+        score = min(1.0, z / (2 * self.MIN_Z))
+        risk = round(100 * (0.6 * score + 0.4 * 0.5), 2)
+        return score, risk
+
+    def run(self, uow: IUnitOfWork) -> List[AnomalyEntity]:
+        out: List[AnomalyEntity] = []
+        user_ids, X, columns = FeatureBuilder(uow).build_matrix(hours=24)
+        if not len(user_ids):
+            return out
+        keep = [j for j, c in enumerate(columns) if c not in self.NON_VOLUME]
+        X, columns = X[:, keep], [columns[j] for j in keep]
+        roles = uow.users.role_codes(user_ids.tolist())
+        groups = np.array([roles.get(int(u), "employee") for u in user_ids])
+        Z, in_group = robust_zscores(X, groups, min_group=self.MIN_PEERS, min_scale=self.MIN_SCALE,
+                                     min_dev=self.MIN_DEVIATION)
+
+        # only unusually *high* activity is suspicious
+        zmax = Z.max(axis=1)
+        hit = np.flatnonzero(in_group & (zmax >= self.MIN_Z))
+        if not len(hit):
+            return out
+
+        anom_type_id = uow.anomalies.resolve_type_id(self.name)
+        now = datetime.now(timezone.utc)
+        for i in hit.tolist():
+            score, risk = self.score(float(zmax[i]))
+            flagged = {c: round(float(Z[i, j]), 2) for j, c in enumerate(columns) if Z[i, j] >= self.MIN_Z}
+            out.append(AnomalyEntity(
+                id=None, user_id=int(user_ids[i]), anomaly_type_id=anom_type_id,
+                score=score, risk=risk, confidence=self.CONFIDENCE, status="open",
+                detected_at=now, evidence={"peer_group": str(groups[i]), "z": flagged},
+            ))
+        return out
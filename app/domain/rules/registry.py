@@ -1,13 +1,23 @@
 from app.domain.rules.after_hours import AfterHoursRule
+from app.domain.rules.baseline_deviation import BaselineDeviationRule
 from app.domain.rules.failed_logins import FailedLoginsRule
 from app.domain.rules.impossible_travel import ImpossibleTravelRule
+from app.domain.rules.peer_deviation import PeerDeviationRule
+from app.domain.rules.threshold import load_threshold_rules
 
 ALL_RULES = {
   "after_hours": AfterHoursRule(),
   "failed_logins": FailedLoginsRule(),
   "impossible_travel": ImpossibleTravelRule(),
+  "baseline_deviation": BaselineDeviationRule(),
+  "peer_deviation": PeerDeviationRule(),
 }
 
+for _r in load_threshold_rules():
+    if _r.name in ALL_RULES:
+        raise ValueError(f"threshold rule '{_r.name}' clashes with a built-in rule")
+    ALL_RULES[_r.name] = _r
+
 def get_rules(enabled=None):
     if not enabled:
         return list(ALL_RULES.values())
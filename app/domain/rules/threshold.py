@@ -0,0 +1,161 @@
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.uow import IUnitOfWork
+from app.domain.entities.anomaly import AnomalyEntity
+from app.domain.rules.base import DetectionRule
+
+DEFINITIONS_PATH = settings.THRESHOLD_RULES_PATH or os.path.join(os.path.dirname(__file__), "definitions")
+
+GROUP_BY_COLUMNS = ("user_id", "source_ip", "activity_type_id")
+
+
+@dataclass(frozen=True)
+class ThresholdSpec:
+    """
+    Declarative count-threshold rule:
+
+      name: file_download_burst
+      activity_types: [file_download]   # optional, empty = every activity
+      hours_outside: [8, 18]            # optional, only count events outside this range
+      window_hours: 1
+      group_by: [user_id]               # user_id + optional source_ip / activity_type_id
+      threshold: 50                     # min events per group
+      score: {scale: 200}               # score = min(1, count / scale)
+      risk: {weight: 0.6, base: 0.5}    # risk = 100 * (weight*score + (1-weight)*base)
+      confidence: 0.6
+    """
+    name: str
+    window_hours: int
+    threshold: int
+    activity_types: Tuple[str, ...] = ()
+    hours_outside: Optional[Tuple[int, int]] = None
+    group_by: Tuple[str, ...] = ("user_id",)
+    score_scale: float = 10.0
+    risk_weight: float = 0.6
+    risk_base: float = 0.5
+    confidence: float = 0.6
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "ThresholdSpec":
+        try:
+            name = str(d["name"])
+            window_hours = int(d["window_hours"])
+            threshold = int(d["threshold"])
+        except KeyError as e:
+            raise ValueError(f"threshold rule missing field {e}: {d}")
+        group_by = tuple(d.get("group_by") or ("user_id",))
+        if "user_id" not in group_by or any(c not in GROUP_BY_COLUMNS for c in group_by):
+            raise ValueError(f"{name}: group_by must include user_id and only use {GROUP_BY_COLUMNS}")
+        if window_hours <= 0 or threshold <= 0:
+            raise ValueError(f"{name}: window_hours and threshold must be positive")
+        hours = d.get("hours_outside")
+        score = d.get("score") or {}
+        risk = d.get("risk") or {}
+        return cls(
+            name=name,
+            window_hours=window_hours,
+            threshold=threshold,
+            activity_types=tuple(str(x) for x in (d.get("activity_types") or ())),
+            hours_outside=(int(hours[0]), int(hours[1])) if hours else None,
+            group_by=group_by,
+            score_scale=float(score.get("scale", 10.0)),
+            risk_weight=float(risk.get("weight", 0.6)),
+            risk_base=float(risk.get("base", 0.5)),
+            confidence=float(d.get("confidence", 0.6)),
+        )
+
+    @property
+    def scan_key(self) -> Tuple[int, Tuple[str, ...]]:
+        # rules with the same window and grouping share one scan of `logs`
+        return (self.window_hours, self.group_by)
+
+    def score(self, cnt: int) -> Tuple[float, float]:
+        score = min(1.0, cnt / self.score_scale)
+        risk = round(100 * (self.risk_weight * score + (1 - self.risk_weight) * self.risk_base), 2)
+        return score, risk
+
+
+class ThresholdRule(DetectionRule):
+    def __init__(self, spec: ThresholdSpec):
+        self.spec = spec
+        self.name = spec.name
+
+    def run(self, uow: IUnitOfWork) -> List[AnomalyEntity]:
+        return run_threshold_rules(uow, [self])
+
+
+def run_threshold_rules(uow: IUnitOfWork, rules: Iterable[ThresholdRule]) -> List[AnomalyEntity]:
+    """Evaluate threshold rules with one aggregate query per distinct (window, group_by)."""
+    groups: Dict[Tuple[int, Tuple[str, ...]], List[ThresholdRule]] = {}
+    for r in rules:
+        groups.setdefault(r.spec.scan_key, []).append(r)
+
+    out: List[AnomalyEntity] = []
+    now = datetime.now(timezone.utc)
+    for (window_hours, group_by), members in groups.items():
+        metrics = []
+        for i, r in enumerate(members):
+            metrics.append({
+                "key": f"m{i}",
+                "threshold": r.spec.threshold,
+                "activity_type_ids": [uow.logs.resolve_activity_type_id(c) for c in r.spec.activity_types] or None,
+                "hours_outside": r.spec.hours_outside,
+            })
+        type_ids = {r.name: uow.anomalies.resolve_type_id(r.name) for r in members}
+
+        for values, counts in uow.logs.threshold_counts(window_hours, group_by, metrics):
+            group = dict(zip(group_by, values))
+            for m, r in zip(metrics, members):
+                cnt = counts[m["key"]]
+                if cnt < r.spec.threshold:
+                    continue
+                score, risk = r.spec.score(cnt)
+                evidence = {"count": cnt, "window_hours": window_hours, "threshold": r.spec.threshold}
+                evidence.update({k: v for k, v in group.items() if k != "user_id"})
+                out.append(AnomalyEntity(
+                    id=None, user_id=int(group["user_id"]), anomaly_type_id=type_ids[r.name],
+                    score=score, risk=risk, confidence=r.spec.confidence, status="open",
+                    detected_at=now, evidence=evidence
+                ))
+    return out
+
+
+def _read_definitions(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    if path.endswith((".yaml", ".yml")):
+        import yaml
+        data = yaml.safe_load(text)
+    else:
+        data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get("rules") or []
+    if not isinstance(data, list):
+        raise ValueError(f"{path}: expected a list of rules or {{rules: [...]}}")
+    return data
+
+
+def load_threshold_rules(path: str = DEFINITIONS_PATH) -> List[ThresholdRule]:
+    if not path or not os.path.exists(path):
+        return []
+    if os.path.isdir(path):
+        files = [os.path.join(path, f) for f in sorted(os.listdir(path))
+                 if f.endswith((".yaml", ".yml", ".json"))]
+    else:
+        files = [path]
+
+    rules: List[ThresholdRule] = []
+    seen = set()
+    for fp in files:
+        for d in _read_definitions(fp):
+            spec = ThresholdSpec.from_dict(d)
+            if spec.name in seen:
+                raise ValueError(f"duplicate threshold rule name: {spec.name}")
+            seen.add(spec.name)
+            rules.append(ThresholdRule(spec))
+    return rules
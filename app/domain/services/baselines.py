@@ -0,0 +1,112 @@
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from app.core.uow import IUnitOfWork
+from app.domain.entities.anomaly import AnomalyEntity
+from app.domain.entities.log import LogEntity
+
+_HOUR = timedelta(hours=1)
+
+
+def hour_bucket(ts: datetime) -> datetime:
+    ts = ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+class Baseline:
+    """
+    One user's behavioral baseline: Welford mean/variance of hourly event
+    counts, hour-of-day histogram and activity-type counts. Every update is
+    O(1); hours without events are merged in as a block of zeros.
+    """
+    __slots__ = ("user_id", "n", "mean", "m2", "cur_bucket", "cur_count",
+                 "hour_hist", "activity_counts", "last_alert_bucket")
+
+    def __init__(self, user_id: int, n: int = 0, mean: float = 0.0, m2: float = 0.0,
+                 cur_bucket: Optional[datetime] = None, cur_count: int = 0,
+                 hour_hist: Optional[List[int]] = None, activity_counts: Optional[Dict[str, int]] = None,
+                 last_alert_bucket: Optional[datetime] = None):
+        self.user_id = user_id
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+        self.cur_bucket = cur_bucket
+        self.cur_count = cur_count
+        self.hour_hist = list(hour_hist) if hour_hist else [0] * 24
+        self.activity_counts = dict(activity_counts or {})
+        self.last_alert_bucket = last_alert_bucket
+
+    def _merge(self, x: float, k: int = 1) -> None:
+        # Chan et al. merge of k identical samples x (their own M2 is 0)
+        if k <= 0:
+            return
+        n = self.n + k
+        delta = x - self.mean
+        self.mean += delta * k / n
+        self.m2 += delta * delta * self.n * k / n
+        self.n = n
+
+    def advance(self, bucket: datetime) -> None:
+        """Close the current hour and every empty hour before `bucket`."""
+        if self.cur_bucket is None or bucket <= self.cur_bucket:
+            return
+        self._merge(float(self.cur_count))
+        gap = int((bucket - self.cur_bucket) / _HOUR) - 1
+        self._merge(0.0, gap)
+        self.cur_bucket, self.cur_count = bucket, 0
+
+    def observe(self, ts: datetime, activity_code: str) -> None:
+        bucket = hour_bucket(ts)
+        if self.cur_bucket is None:
+            self.cur_bucket = bucket
+        self.advance(bucket)
+        if bucket == self.cur_bucket:
+            self.cur_count += 1
+        # late events (older than the open hour) only feed the histograms
+        self.hour_hist[bucket.hour] += 1
+        self.activity_counts[activity_code] = self.activity_counts.get(activity_code, 0) + 1
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    def zscore(self, count: float, min_std: float = 1.0) -> float:
+        return (count - self.mean) / max(self.std, min_std)
+
+    def hour_share(self, hour: int) -> float:
+        total = sum(self.hour_hist)
+        return self.hour_hist[hour] / total if total else 0.0
+
+    def top_activities(self, k: int = 3) -> List[Tuple[str, int]]:
+        return sorted(self.activity_counts.items(), key=lambda kv: -kv[1])[:k]
+
+
+class BaselineUpdater:
+    """
+    Ingest observer: collects one upload's events and, on flush, applies them
+    in timestamp order to the touched users' baselines in a single
+    read-modify-write (rows locked for the duration of the batch).
+    """
+
+    def __init__(self):
+        self._events: Dict[int, List[Tuple[datetime, str]]] = defaultdict(list)
+
+    def observe(self, uow: IUnitOfWork, log: LogEntity, activity_code: str) -> List[AnomalyEntity]:
+        self._events[log.user_id].append((log.ts, activity_code))
+        return []
+
+    def flush(self, uow: IUnitOfWork) -> List[AnomalyEntity]:
+        if not self._events:
+            return []
+        current = uow.baselines.get_many(self._events.keys(), for_update=True)
+        changed = []
+        for user_id, events in self._events.items():
+            b = current.get(user_id) or Baseline(user_id)
+            for ts, code in sorted(events, key=lambda e: hour_bucket(e[0])):
+                b.observe(ts, code)
+            changed.append(b)
+        uow.baselines.save_many(changed)
+        self._events.clear()
+        return []
@@ -1,64 +1,186 @@
 import os
-from typing import List
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterable, Iterator, List, Tuple
+from app.core.config import settings
 from app.core.uow import IUnitOfWork
 from app.domain.rules.registry import get_rules
+from app.domain.rules.threshold import ThresholdRule, run_threshold_rules
 from app.domain.entities.anomaly import AnomalyEntity
-from app.domain.services.feature_builder import FeatureBuilder
-from app.infra.models.catboost_detector import CatBoostDetector
-from app.infra.models.model_registry import pick_insider, pick_ueba
+from app.domain.services.feature_builder import FeatureBuilder, FEATURE_COLUMNS
+from app.infra.models.batch_scoring import score_chunks
+from app.infra.models.catboost_detector import FEATURE_SCHEMAS, CatBoostDetector, feature_schema_id
+from app.infra.models.ensemble import ENSEMBLE_NAME, ModelEnsemble
+from app.infra.models.model_registry import ModelPath, all_models, pick_insider, pick_ueba
+from app.infra.metrics.instruments import DETECTION_ANOMALIES, DETECTION_STAGE, timed
 
 class DetectionService:
-    def __init__(self, uow: IUnitOfWork):
+    def __init__(self, uow: IUnitOfWork, profiler=None):
         self.uow = uow
+        self.profiler = profiler
 
-    def _to_entities(self, preds: list[dict], anomaly_type_code: str) -> List[AnomalyEntity]:
+    @contextmanager
+    def _stage(self, name: str):
+        with timed(DETECTION_STAGE, (name,)), (self.profiler.stage(name) if self.profiler else nullcontext()):
+            yield
+
+    def _record(self, name: str, seconds: float) -> None:
+        """A stage timed outside this process (model predicts in INFER_WORKERS processes)."""
+        DETECTION_STAGE.observe(seconds, (name,))
+        if self.profiler:
+            self.profiler.record(name, seconds)
+
+    def _staged(self, name: str, items: Iterable) -> Iterator:
+        """Yield from `items`, producing each item inside `_stage(name)`."""
+        it = iter(items)
+        while True:
+            with self._stage(name):
+                item = next(it, None)
+            if item is None:
+                return
+            yield item
+
+    def _to_entities(self, user_ids, scores, risks, anomaly_type_code: str, evidence: dict) -> List[AnomalyEntity]:
         anom_type_id = self.uow.anomalies.resolve_type_id(anomaly_type_code)
-        out: List[AnomalyEntity] = []
         from datetime import datetime, timezone
         now = datetime.now(timezone.utc)
-        for p in preds:
-            out.append(AnomalyEntity(
+        return [
+            AnomalyEntity(
                 id=None,
-                user_id=int(p["user_id"]),
+                user_id=int(u),
                 anomaly_type_id=anom_type_id,
-                score=float(p["score"]),
-                risk=float(p["risk"]),
-                confidence=float(p.get("confidence", 0.8)),
+                score=float(p),
+                risk=float(r),
+                confidence=0.8,
                 status="open",
                 detected_at=now,
-                evidence=p.get("evidence", {})
-            ))
+                evidence=evidence,
+            )
+            for u, p, r in zip(user_ids.tolist(), scores.tolist(), risks.tolist())
+        ]
+
+    def _model_evidence(self, models: List[ModelPath], columns) -> Dict[str, dict]:
+        ev = {
+            mp.path: {"feature_schema": feature_schema_id(CatBoostDetector(mp.path).model_columns(columns)),
+                      "model_path": mp.path}
+            for mp in models
+        }
+        ev[ENSEMBLE_NAME] = {"model_paths": [mp.path for mp in models]}
+        # stored with the anomalies that reference them, so every worker (and later process) can decode them
+        self.uow.features.save_schemas({e["feature_schema"]: FEATURE_SCHEMAS[e["feature_schema"]]
+                                        for e in ev.values() if "feature_schema" in e})
+        return ev
+
+    def _scored_to_entities(self, user_ids, scored: Dict[str, tuple], models: List[ModelPath],
+                            emit: set[str], evidence: Dict[str, dict]) -> List[AnomalyEntity]:
+        names = {mp.path: mp.name for mp in models}
+        names[ENSEMBLE_NAME] = ENSEMBLE_NAME
+        out: List[AnomalyEntity] = []
+        for key, (scores, risks) in scored.items():
+            if key in emit:
+                ents = self._to_entities(user_ids, scores, risks, anomaly_type_code=names[key], evidence=evidence[key])
+                DETECTION_ANOMALIES.inc(len(ents), (names[key],))
+                out.extend(ents)
         return out
 
-    def run_all(self, enabled: list[str] | None = None) -> int:
+    def run_all(self, enabled: list[str] | None = None, dry_run: bool = False) -> int:
+        """
+        Run rules and models; returns the number of anomalies created
+        (or that would be created when `dry_run` skips persistence).
+        """
         created = 0
         anomalies: List[AnomalyEntity] = []
 
         # 1) rules ?????????
+        threshold_rules: List[ThresholdRule] = []
         for r in get_rules(enabled):
-            anomalies.extend(r.run(self.uow))
+            if isinstance(r, ThresholdRule):
+                threshold_rules.append(r)
+                continue
+            with self._stage(f"rule:{r.name}"):
+                found = list(r.run(self.uow))
+            DETECTION_ANOMALIES.inc(len(found), (r.name,))
+            anomalies.extend(found)
+        if threshold_rules:
+            with self._stage("rules:threshold"):
+                found = list(run_threshold_rules(self.uow, threshold_rules))
+            DETECTION_ANOMALIES.inc(len(found), ("threshold",))
+            anomalies.extend(found)
+
+        # 2) model-based: one shared feature matrix, every model scored in one ensemble pass
+        models, emit, combine = self._model_plan(enabled)
+        touched: set[int] = set()
+        streamed = 0
+        if models and settings.INFER_CHUNK_SIZE > 0:
+            streamed, touched = self._run_models_chunked(models, emit, combine, dry_run)
+        elif models:
+            with self._stage("features"):
+                fb = FeatureBuilder(self.uow)
+                user_ids, X, columns = fb.build_matrix(hours=24)
 
-        # 2) model-based
-        if enabled and any(x.startswith("model_") for x in enabled):
-            fb = FeatureBuilder(self.uow)
-            rows = fb.build_rows(hours=24)
+            scored = ModelEnsemble([mp.path for mp in models]).score(user_ids, X, columns, combine=combine, stage=self._stage)
+            anomalies.extend(self._scored_to_entities(user_ids, scored, models, emit, self._model_evidence(models, columns)))
 
-            for name in enabled:
-                if name == "model_ueba":
-                    mp = pick_ueba()
-                    if mp:
-                        det = CatBoostDetector(mp.path)
-                        preds = det.infer(rows)
-                        anomalies.extend(self._to_entities(preds, anomaly_type_code=mp.name))
-                if name == "model_insider":
-                    mp = pick_insider()
-                    if mp:
-                        det = CatBoostDetector(mp.path)
-                        preds = det.infer(rows)
-                        anomalies.extend(self._to_entities(preds, anomaly_type_code=mp.name))
+        if dry_run:
+            # discard everything the run staged (lookup ids are committed separately by LookupCache)
+            self.uow.rollback()
+            return len(anomalies) + streamed
 
         # persist
+        created += streamed
         if anomalies:
-            created += self.uow.anomalies.bulk_add(anomalies)
+            with self._stage("bulk_add"):
+                created += self.uow.anomalies.bulk_add(anomalies)
+            touched.update(a.user_id for a in anomalies)
+        if created:
+            with self._stage("risk_refresh"):
+                self.uow.users.refresh_risk(touched)
+            with self._stage("analytics_refresh"):
+                self.uow.analytics.refresh_anomaly_buckets(self.uow.anomalies.pop_touched_buckets())
+                self.uow.analytics.apply_group_deltas(self.uow.users.pop_group_deltas())
             self.uow.commit()
         return created
+
+    def _model_plan(self, enabled: list[str] | None) -> Tuple[List[ModelPath], set[str], bool]:
+        """
+        (models to score, result keys to persist, combine?). `model_ensemble`
+        scores every available model and emits only the combined risk unless the
+        individual models are enabled too.
+        """
+        enabled = enabled or []
+        explicit: List[ModelPath] = []
+        for name in enabled:
+            mp = pick_ueba() if name == "model_ueba" else pick_insider() if name == "model_insider" else None
+            if mp and all(m.path != mp.path for m in explicit):
+                explicit.append(mp)
+        combine = ENSEMBLE_NAME in enabled
+        models = list(explicit)
+        if combine:
+            models += [mp for mp in all_models() if all(m.path != mp.path for m in models)]
+        emit = {mp.path for mp in explicit}
+        if combine and models:
+            emit.add(ENSEMBLE_NAME)
+        return models, emit, combine
+
+    def _run_models_chunked(self, models: List[ModelPath], emit: set[str], combine: bool,
+                            dry_run: bool) -> Tuple[int, set[int]]:
+        """
+        Score the active population in user-id chunks (optionally in a process
+        pool) and persist each chunk's anomalies as soon as it is scored.
+        Stages (features, infer:<model>, bulk_add) add up over the chunks.
+        """
+        fb = FeatureBuilder(self.uow)
+        chunks = self._staged("features", fb.iter_matrices(hours=24, chunk_size=settings.INFER_CHUNK_SIZE))
+        evidence = self._model_evidence(models, FEATURE_COLUMNS)
+        count = 0
+        touched: set[int] = set()
+        paths = [mp.path for mp in models]
+        for user_ids, scored in score_chunks(paths, chunks, workers=settings.INFER_WORKERS, combine=combine,
+                                             stage=self._stage, record=self._record):
+            ents = self._scored_to_entities(user_ids, scored, models, emit, evidence)
+            if dry_run:
+                count += len(ents)
+            else:
+                with self._stage("bulk_add"):
+                    count += self.uow.anomalies.bulk_add(ents)
+                touched.update(user_ids.tolist())
+        return count, touched
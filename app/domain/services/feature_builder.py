@@ -1,14 +1,126 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple, Iterator
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from app.core.config import settings
 from app.core.uow import IUnitOfWork
+from app.domain.services.sketches import FEATURE_NAMES, RETENTION_DAYS, WINDOWS_DAYS, distinct_features
+
+# column order of the feature matrix (LogRepo.feature_window keys)
+FEATURE_COLUMNS = [
+    "login_success_count",
+    "login_failed_count",
+    "total_events",
+    "unique_ips_24h",
+    "after_hours_count",
+    "last_login_hour",
+    # HyperLogLog estimates from user_sketches
+    *FEATURE_NAMES.values(),
+]
+# bump whenever FEATURE_COLUMNS or their definitions change; stored rows are keyed by it
+FEATURE_VERSION = 2
+# window length the feature store is kept for
+STORE_WINDOW_HOURS = 24
+# how far back a stored window's features reach (the longest sketch window)
+STORE_REACH_HOURS = max(WINDOWS_DAYS) * 24
+
+def window_end(now: datetime | None = None, step_minutes: int | None = None) -> datetime:
+    """Current feature window end, aligned down to the store step (hour by default)."""
+    now = now or datetime.now(timezone.utc)
+    step = max(1, step_minutes or settings.FEATURE_STEP_MINUTES)
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    minutes = int((now - midnight).total_seconds() // 60)
+    return midnight + timedelta(minutes=minutes - minutes % step)
+
+def _to_matrix(feats: Dict[int, Dict]) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    n = len(feats)
+    user_ids = np.fromiter(feats.keys(), dtype=np.int64, count=n)
+    X = np.zeros((n, len(FEATURE_COLUMNS)), dtype=np.float64)
+    for i, rec in enumerate(feats.values()):
+        X[i] = [rec.get(c) or 0 for c in FEATURE_COLUMNS]
+    return user_ids, X, list(FEATURE_COLUMNS)
 
 class FeatureBuilder:
     def __init__(self, uow: IUnitOfWork):
         self.uow = uow
 
+    def _use_store(self, hours: int) -> bool:
+        return settings.FEATURE_STORE and hours == STORE_WINDOW_HOURS
+
+    def _compute(self, hours: int, user_id_range: Tuple[int, int] | None = None,
+                 end: datetime | None = None) -> Dict[int, Dict]:
+        feats = self.uow.logs.feature_window(hours=hours, user_id_range=user_id_range, end=end)
+        if feats:
+            distinct = distinct_features(self.uow, end or datetime.now(timezone.utc), user_id_range)
+            for uid, rec in feats.items():
+                rec.update(distinct.get(uid) or dict.fromkeys(FEATURE_NAMES.values(), 0))
+        return feats
+
+    def ensure_window(self, hours: int = STORE_WINDOW_HOURS, end: datetime | None = None) -> datetime:
+        """
+        Make sure user_features holds the window ending at `end` (default: the
+        current aligned window). Only a window not yet marked complete is
+        computed from logs, chunk by chunk, on a detached unit of work that
+        commits just the store rows: the caller's transaction (a detection
+        run, possibly a dry run) is never committed from here. Uploads that
+        reach into a stored window drop it (`invalidate`), so it is computed
+        again on the next run.
+        """
+        we = end or window_end()
+        if self.uow.features.is_complete(we, FEATURE_VERSION, hours):
+            return we
+        with self.uow.detached() as side:
+            side.features.lock_windows()
+            if side.features.is_complete(we, FEATURE_VERSION, hours):
+                return we
+            builder = FeatureBuilder(side)
+            ids = side.logs.active_user_ids(hours=hours, end=we)
+            step = settings.INFER_CHUNK_SIZE or len(ids) or 1
+            for i in range(0, len(ids), step):
+                chunk = ids[i:i + step]
+                feats = builder._compute(hours, (chunk[0], chunk[-1]), end=we)
+                side.features.upsert(we, FEATURE_VERSION, feats)
+            side.features.mark_complete(we, FEATURE_VERSION, hours, len(ids))
+            # once per window: drop sketches no feature window reaches any more
+            side.sketches.prune(we - timedelta(days=RETENTION_DAYS))
+        return we
+
+    def invalidate(self, since: datetime, until: datetime) -> int:
+        """Drop stored windows whose features could include logs timestamped in [since, until]."""
+        if not settings.FEATURE_STORE or since >= window_end():
+            # nothing stored yet ends after `since` (the current window is the newest)
+            return 0
+        return self.uow.features.invalidate(since, until, STORE_REACH_HOURS)
+
+    def _features(self, hours: int, user_id_range: Tuple[int, int] | None = None) -> Dict[int, Dict]:
+        if self._use_store(hours):
+            we = self.ensure_window(hours)
+            return self.uow.features.read_window(we, FEATURE_VERSION, user_id_range)
+        return self._compute(hours, user_id_range)
+
     def build_rows(self, hours:int=24) -> List[Dict[str, Any]]:
         """
         ????? list[dict] ??? user ???? user_id + ?????? ?????
         ???? ???? ????? ???????? ??????? ?? ????? ???????.
         """
-        feats = self.uow.logs.feature_window(hours=hours)
-        return list(feats.values())
+        return [{"user_id": uid, **f} for uid, f in self._features(hours).items()]
+
+    def build_matrix(self, hours:int=24, user_id_range: Tuple[int, int] | None = None) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """
+        (user_ids, X, columns): one float64 row per user in FEATURE_COLUMNS order,
+        ready for CatBoostDetector.infer_matrix.
+        """
+        return _to_matrix(self._features(hours, user_id_range))
+
+    def iter_matrices(self, hours:int=24, chunk_size:int=50_000) -> Iterator[Tuple[np.ndarray, np.ndarray, List[str]]]:
+        """build_matrix over consecutive user-id ranges of at most `chunk_size` active users."""
+        if self._use_store(hours):
+            we = self.ensure_window(hours)
+            ids = self.uow.features.user_ids(we, FEATURE_VERSION)
+            for i in range(0, len(ids), chunk_size):
+                chunk = ids[i:i + chunk_size]
+                yield _to_matrix(self.uow.features.read_window(we, FEATURE_VERSION, (chunk[0], chunk[-1])))
+            return
+        ids = self.uow.logs.active_user_ids(hours=hours)
+        for i in range(0, len(ids), chunk_size):
+            chunk = ids[i:i + chunk_size]
+            yield self.build_matrix(hours=hours, user_id_range=(chunk[0], chunk[-1]))
@@ -0,0 +1,22 @@
+from typing import List
+
+from app.domain.services.baselines import BaselineUpdater
+from app.domain.services.novelty import NoveltyTracker
+from app.domain.services.sketches import SketchUpdater
+from app.domain.services.stream_detector import get_stream_detector
+
+
+def ingest_observers() -> List[object]:
+    """
+    Per-upload observers of ingested logs. Each has
+    observe(uow, log, activity_code) -> anomalies, called per row, and
+    flush(uow) -> anomalies, called once after the rows are inserted.
+    """
+    observers: List[object] = []
+    stream = get_stream_detector()
+    if stream:
+        observers.append(stream.batch())
+    observers.append(BaselineUpdater())
+    observers.append(SketchUpdater())
+    observers.append(NoveltyTracker())
+    return observers
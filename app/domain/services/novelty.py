@@ -0,0 +1,109 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.uow import IUnitOfWork
+from app.domain.entities.anomaly import AnomalyEntity
+from app.domain.entities.log import LogEntity
+from app.domain.rules.first_seen_entity import FirstSeenEntityRule
+from app.infra.utils.bloom import ScalableBloomFilter
+from app.infra.utils.ipgeo import IPGeoResolver
+
+_GEO: Optional[IPGeoResolver] = None
+
+def _geo() -> IPGeoResolver:
+    global _GEO
+    if _GEO is None:
+        _GEO = IPGeoResolver()
+    return _GEO
+
+
+def _utc(ts: datetime) -> datetime:
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+class NoveltyTracker:
+    """
+    Ingest observer for first_seen_entity: keeps one Bloom filter per user and
+    attribute (user_novelty). On flush the batch's users' filters are loaded
+    in one query, every event is checked and added in timestamp order (O(1)
+    each) and the filters are written back.
+
+    Filters grow with the number of values (ScalableBloomFilter), so heavy
+    users don't saturate them. A stored filter whose false-positive rate is
+    over NOVELTY_BLOOM_MAX_FP (old fixed-size rows) would hide most new
+    values; it is started over and goes through the learning period again.
+    """
+
+    def __init__(self, learning_days: int | None = None):
+        self.rule = FirstSeenEntityRule()
+        days = settings.NOVELTY_LEARNING_DAYS if learning_days is None else learning_days
+        self.learning = timedelta(days=days)
+        self._events: Dict[int, List[Tuple[datetime, Optional[str], Optional[str]]]] = defaultdict(list)
+
+    def observe(self, uow: IUnitOfWork, log: LogEntity, activity_code: str) -> List[AnomalyEntity]:
+        device = self.rule.device(log.params)
+        if log.source_ip or device:
+            self._events[log.user_id].append((_utc(log.ts), log.source_ip or None, device))
+        return []
+
+    def _values(self, ip: Optional[str], device: Optional[str]):
+        if ip:
+            yield "ip", ip
+            prefix = self.rule.ip_prefix(ip)
+            if prefix:
+                yield "ip_prefix", prefix
+        if device:
+            yield "device", device
+
+    def flush(self, uow: IUnitOfWork) -> List[AnomalyEntity]:
+        if not self._events:
+            return []
+        stored = uow.novelty.get_many(self._events.keys(), for_update=True)
+        cap, fp = settings.NOVELTY_BLOOM_CAPACITY, settings.NOVELTY_BLOOM_FP
+        filters: Dict[Tuple[int, str], list] = {}
+        for key, (b, n, f) in stored.items():
+            bf = ScalableBloomFilter.from_bytes(b, cap, fp)
+            if bf.fp_rate() <= settings.NOVELTY_BLOOM_MAX_FP:
+                filters[key] = [bf, n, f]
+        out: List[AnomalyEntity] = []
+        anom_type_id = None
+
+        changed: set = set()
+
+        def _add(user_id: int, attr: str, value: str, ts: datetime) -> Tuple[bool, bool]:
+            """(new value?, alert?) - no alerts while the filter is in its learning period."""
+            key = (user_id, attr)
+            entry = filters.get(key)
+            if entry is None:
+                entry = filters[key] = [ScalableBloomFilter(cap, fp), 0, ts]
+            if not entry[0].add(value):
+                return False, False
+            entry[1] += 1
+            changed.add(key)
+            return True, ts - entry[2] >= self.learning
+
+        for user_id, events in self._events.items():
+            events.sort(key=lambda e: e[0])
+            for ts, ip, device in events:
+                novel: Dict[str, str] = {}
+                new_ip = False
+                for attr, value in self._values(ip, device):
+                    new, alert = _add(user_id, attr, value, ts)
+                    new_ip = new_ip or (new and attr == "ip")
+                    if alert:
+                        novel[attr] = value
+                # an IP already seen can't bring a new country; only geolocate new ones
+                if new_ip:
+                    loc = _geo().locate(ip)
+                    if loc and loc[2] and _add(user_id, "country", loc[2], ts)[1]:
+                        novel["country"] = loc[2]
+                if novel:
+                    if anom_type_id is None:
+                        anom_type_id = uow.anomalies.resolve_type_id(self.rule.name)
+                    out.append(self.rule.anomaly(user_id, anom_type_id, ts, novel))
+
+        uow.novelty.save_many({key: (filters[key][0].to_bytes(), *filters[key][1:]) for key in changed})
+        self._events.clear()
+        return out
@@ -0,0 +1,59 @@
+from typing import Tuple
+import numpy as np
+
+# scale so MAD estimates the standard deviation of normal data
+MAD_SCALE = 1.4826
+
+
+def _group_medians(V: np.ndarray, inv: np.ndarray, starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """
+    Per-group, per-column medians of V (rows already ordered by group):
+    each column is sorted within its group segments by one lexsort, then the
+    middle element(s) of every segment are picked with fancy indexing.
+    """
+    n, d = V.shape
+    lo = starts + (counts - 1) // 2
+    hi = starts + counts // 2
+    out = np.empty((len(counts), d), dtype=np.float64)
+    for j in range(d):
+        col = V[np.lexsort((V[:, j], inv)), j]
+        out[:, j] = (col[lo] + col[hi]) / 2
+    return out
+
+
+def robust_zscores(X: np.ndarray, groups: np.ndarray, min_group: int = 5, min_scale: float = 1.0,
+                   rel_scale: float = 0.1, min_dev: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Robust z-score of every user and feature against its peer group:
+    (x - median) / scale, computed for all groups at once, where scale is
+    MAD_SCALE * MAD floored at `min_scale` and at `rel_scale` * |group mean|.
+    Sparse count features (most of a group at 0) have MAD = 0; the floors keep
+    a handful of events from dividing by ~0, and deviations smaller than
+    `min_dev` get z = 0 however tight the group is.
+    Returns (Z, in_group) where rows of groups smaller than `min_group` get
+    z = 0 and in_group = False.
+    """
+    n = X.shape[0]
+    if n == 0:
+        return np.zeros_like(X, dtype=np.float64), np.zeros(0, dtype=bool)
+    _, inv, counts = np.unique(groups, return_inverse=True, return_counts=True)
+    order = np.argsort(inv, kind="stable")
+    Xs, inv_s = X[order].astype(np.float64, copy=False), inv[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    med = _group_medians(Xs, inv_s, starts, counts)
+    diff = Xs - med[inv_s]
+    mad = _group_medians(np.abs(diff), inv_s, starts, counts)
+    mean = np.add.reduceat(Xs, starts, axis=0) / counts[:, None]
+    scale = np.maximum(np.maximum(MAD_SCALE * mad, rel_scale * np.abs(mean)), min_scale)
+
+    Zs = diff / scale[inv_s]
+    Zs[np.abs(diff) < min_dev] = 0.0
+    ok = counts[inv_s] >= min_group
+    Zs[~ok] = 0.0
+
+    Z = np.empty_like(Zs)
+    Z[order] = Zs
+    in_group = np.empty(n, dtype=bool)
+    in_group[order] = ok
+    return Z, in_group
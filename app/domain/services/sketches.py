@@ -0,0 +1,110 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.core.uow import IUnitOfWork
+from app.domain.entities.anomaly import AnomalyEntity
+from app.domain.entities.log import LogEntity
+from app.domain.services.baselines import hour_bucket
+from app.infra.utils.hll import HyperLogLog
+
+# sketched attributes; "resource" comes from the first of these params keys
+ATTRS = ("ip", "resource")
+RESOURCE_KEYS = ("resource", "file", "path", "url", "object")
+# distinct-count windows exposed as features, in days
+WINDOWS_DAYS = (7, 30)
+# hourly sketches are only read at window edges, but those reach back WINDOWS_DAYS[-1] days
+RETENTION_DAYS = max(WINDOWS_DAYS) + 1
+_DAY = timedelta(days=1)
+
+FEATURE_NAMES = {
+    (attr, days): f"unique_{'ips' if attr == 'ip' else 'resources'}_{days}d"
+    for attr in ATTRS for days in WINDOWS_DAYS
+}
+
+
+def attr_value(log: LogEntity, attr: str) -> Optional[str]:
+    if attr == "ip":
+        return log.source_ip or None
+    params = log.params or {}
+    for k in RESOURCE_KEYS:
+        v = params.get(k)
+        if v:
+            return str(v)
+    return None
+
+
+def _day(ts: datetime) -> datetime:
+    return ts.replace(hour=0)
+
+
+class SketchUpdater:
+    """
+    Ingest observer: collects distinct values per (user, attr, hour) and per
+    (user, attr, day) for one upload, and on flush merges them into the stored
+    HyperLogLog sketches (one locked read-modify-write per batch).
+    """
+
+    def __init__(self):
+        self._values: Dict[Tuple[int, str, datetime, int], Set[str]] = defaultdict(set)
+
+    def observe(self, uow: IUnitOfWork, log: LogEntity, activity_code: str) -> List[AnomalyEntity]:
+        hour = hour_bucket(log.ts)
+        for attr in ATTRS:
+            v = attr_value(log, attr)
+            if v:
+                self._values[(log.user_id, attr, hour, 1)].add(v)
+                self._values[(log.user_id, attr, _day(hour), 24)].add(v)
+        return []
+
+    def flush(self, uow: IUnitOfWork) -> List[AnomalyEntity]:
+        if not self._values:
+            return []
+        stored = uow.sketches.get_many(self._values.keys(), for_update=True)
+        out = {}
+        for key, values in self._values.items():
+            raw = stored.get(key)
+            h = HyperLogLog.from_bytes(raw) if raw else HyperLogLog()
+            out[key] = h.update(values).to_bytes()
+        uow.sketches.save_many(out)
+        self._values.clear()
+        return []
+
+
+def distinct_features(uow: IUnitOfWork, end: datetime,
+                      user_id_range: Tuple[int, int] | None = None) -> Dict[int, Dict[str, int]]:
+    """
+    Estimated distinct ips/resources per user over the WINDOWS_DAYS windows
+    ending at `end` (hour aligned). Each window is the merge of its whole-day
+    sketches plus the hourly sketches of the partial days at both edges.
+    """
+    end = hour_bucket(end)
+    last_day = _day(end)
+    edges = {}
+    ranges = [(1, last_day, end)]
+    for days in WINDOWS_DAYS:
+        start = end - timedelta(days=days)
+        first_day = _day(start) + (_DAY if start != _day(start) else timedelta(0))
+        edges[days] = (start, first_day)
+        ranges.append((1, start, first_day))
+    ranges.append((24, edges[max(WINDOWS_DAYS)][1], last_day))
+
+    out: Dict[int, Dict[str, int]] = defaultdict(dict)
+    for attr in ATTRS:
+        rows = uow.sketches.in_ranges(attr, ranges, user_id_range)
+        by_user: Dict[int, list] = defaultdict(list)
+        for uid, bucket, span, raw in rows:
+            by_user[uid].append((bucket, span, raw))
+        for uid, pieces in by_user.items():
+            for days in WINDOWS_DAYS:
+                start, first_day = edges[days]
+                h = HyperLogLog()
+                for bucket, span, raw in pieces:
+                    if span == 24:
+                        take = first_day <= bucket < last_day
+                    else:
+                        take = start <= bucket < first_day or last_day <= bucket < end
+                    if take:
+                        h.merge(HyperLogLog.from_bytes(raw))
+                out[uid][FEATURE_NAMES[(attr, days)]] = len(h)
+    return out
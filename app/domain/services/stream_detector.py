@@ -0,0 +1,229 @@
+import threading
+from collections import OrderedDict, deque
+from functools import partial
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.core.uow import IUnitOfWork
+from app.domain.entities.anomaly import AnomalyEntity
+from app.domain.entities.log import LogEntity
+from app.domain.rules.failed_logins import FailedLoginsRule
+from app.domain.rules.impossible_travel import ImpossibleTravelRule
+from app.infra.utils.ipgeo import IPGeoResolver
+
+
+def _utc(ts: datetime) -> datetime:
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+class _UserState:
+    __slots__ = ("failed", "failed_alert_ts", "login_ts", "login_ip", "login_loc", "seen")
+
+    def __init__(self, ring_size: int):
+        self.failed: deque = deque(maxlen=ring_size)
+        self.failed_alert_ts: Optional[datetime] = None
+        self.login_ts: Optional[datetime] = None
+        self.login_ip: Optional[str] = None
+        self.login_loc = None
+        self.seen: float = 0.0
+
+    def copy(self, ring_size: int) -> "_UserState":
+        st = _UserState(ring_size)
+        st.failed.extend(self.failed)
+        st.failed_alert_ts = self.failed_alert_ts
+        st.login_ts, st.login_ip, st.login_loc = self.login_ts, self.login_ip, self.login_loc
+        return st
+
+    def merge(self, staged: "_UserState", new_failed: List[datetime], window: timedelta) -> None:
+        """
+        Fold a committed batch into this (current, shared) state: its new
+        failed-login timestamps join the window and the newer login wins, so
+        batches committed concurrently for one user don't overwrite each other.
+        """
+        if new_failed:
+            merged = sorted([*self.failed, *new_failed])
+            cutoff = merged[-1] - window
+            self.failed = deque((t for t in merged if t >= cutoff), maxlen=self.failed.maxlen)
+        if staged.failed_alert_ts is not None and (self.failed_alert_ts is None
+                                                   or staged.failed_alert_ts > self.failed_alert_ts):
+            self.failed_alert_ts = staged.failed_alert_ts
+        if staged.login_ts is not None and (self.login_ts is None or staged.login_ts > self.login_ts):
+            self.login_ts, self.login_ip, self.login_loc = staged.login_ts, staged.login_ip, staged.login_loc
+
+
+class StreamDetector:
+    """
+    Per-event evaluation of the failed_logins / impossible_travel rules.
+
+    Keeps a small sliding-window state per user (failed-login timestamps in a
+    ring buffer, last successful login) in an LRU map bounded by `max_users`;
+    users idle for longer than `idle_seconds` are evicted first.
+
+    Uploads evaluate against a `batch()`: copies of the states they touch,
+    merged into the shared map only when the upload's transaction commits,
+    so a failed or retried upload leaves no trace.
+    """
+
+    def __init__(self, max_users: int = 100_000, idle_seconds: int = 6 * 3600, ring_size: int = 32):
+        self.max_users = max_users
+        self.idle_seconds = idle_seconds
+        self.ring_size = ring_size
+        self.failed_rule = FailedLoginsRule()
+        self.travel_rule = ImpossibleTravelRule()
+        self.geo = IPGeoResolver()
+        self._states: "OrderedDict[int, _UserState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def _state(self, user_id: int, now: float) -> _UserState:
+        st = self._states.get(user_id)
+        if st is None:
+            st = _UserState(self.ring_size)
+            self._states[user_id] = st
+        else:
+            self._states.move_to_end(user_id)
+        st.seen = now
+        self._evict(now, user_id)
+        return st
+
+    def _evict(self, now: float, keep: int) -> None:
+        # oldest entries sit at the head: drop idle users, then enforce the cap
+        idle_before = now - self.idle_seconds
+        while self._states:
+            head_id, head = next(iter(self._states.items()))
+            if head_id == keep or (head.seen >= idle_before and len(self._states) <= self.max_users):
+                break
+            self._states.popitem(last=False)
+
+    def _staged_copy(self, user_id: int) -> _UserState:
+        with self._lock:
+            st = self._states.get(user_id)
+            return st.copy(self.ring_size) if st is not None else _UserState(self.ring_size)
+
+    def _apply(self, staged: Dict[int, _UserState], new_failed: Dict[int, List[datetime]]) -> None:
+        """Commit hook of a batch: its changes are merged into the current shared states."""
+        now = datetime.now(timezone.utc).timestamp()
+        window = timedelta(hours=self.failed_rule.WINDOW_HOURS)
+        with self._lock:
+            for user_id, st in staged.items():
+                cur = self._states.get(user_id)
+                if cur is None:
+                    self._states[user_id] = cur = st
+                else:
+                    cur.merge(st, new_failed.get(user_id, []), window)
+                    self._states.move_to_end(user_id)
+                cur.seen = now
+            if staged:
+                self._evict(now, next(reversed(self._states)))
+
+    # -------- per-event evaluation --------
+    def _on_failed(self, st: _UserState, user_id: int, ts: datetime, anom_type_id: int) -> Optional[AnomalyEntity]:
+        rule = self.failed_rule
+        window = timedelta(hours=rule.WINDOW_HOURS)
+        st.failed.append(ts)
+        cutoff = ts - window
+        while st.failed and st.failed[0] < cutoff:
+            st.failed.popleft()
+
+        cnt = len(st.failed)
+        if cnt < rule.MIN_THRESHOLD:
+            return None
+        # one alert per user per window
+        if st.failed_alert_ts is not None and ts - st.failed_alert_ts < window:
+            return None
+        st.failed_alert_ts = ts
+        score, risk = rule.score(cnt)
+        return AnomalyEntity(
+            id=None, user_id=user_id, anomaly_type_id=anom_type_id,
+            score=score, risk=risk, confidence=rule.CONFIDENCE, status="open",
+            detected_at=ts, evidence={"failed_logins_24h": cnt, "source": "stream"}
+        )
+
+    def _on_login(self, st: _UserState, user_id: int, ts: datetime, ip: str, anom_type_id: int) -> Optional[AnomalyEntity]:
+        rule = self.travel_rule
+        loc = self.geo.locate(ip)
+        evidence = None
+        if st.login_ts is not None:
+            if ts < st.login_ts:
+                # out-of-order event: the batch rule will pick it up
+                return None
+            evidence = rule.check_hop(st.login_ts, st.login_ip or "", st.login_loc, ts, ip, loc, self.geo)
+        st.login_ts, st.login_ip, st.login_loc = ts, ip, loc
+        if evidence is None:
+            return None
+        evidence["source"] = "stream"
+        return AnomalyEntity(
+            id=None, user_id=user_id, anomaly_type_id=anom_type_id,
+            score=rule.SCORE, risk=rule.RISK, confidence=rule.CONFIDENCE, status="open",
+            detected_at=ts, evidence=evidence
+        )
+
+    def batch(self) -> "StreamBatch":
+        return StreamBatch(self)
+
+    # -------- restart --------
+    def rebuild(self, uow: IUnitOfWork, since_hours: int = 48) -> int:
+        """Reload the window state from the recent login history in `logs`."""
+        now = datetime.now(timezone.utc).timestamp()
+        fail_since = min(since_hours, self.failed_rule.WINDOW_HOURS)
+        with self._lock:
+            self._states.clear()
+            for user_id, ts, _ip in uow.logs.recent_logins(since_hours=fail_since, max_per_user=10**9,
+                                                           activity_code="login_failed"):
+                self._state(user_id, now).failed.append(_utc(ts))
+            for user_id, ts, ip in uow.logs.recent_logins(since_hours=since_hours, max_per_user=10**9):
+                st = self._state(user_id, now)
+                st.login_ts, st.login_ip = _utc(ts), ip
+            for st in self._states.values():
+                if st.login_ip:
+                    st.login_loc = self.geo.locate(st.login_ip)
+            return len(self._states)
+
+
+class StreamBatch:
+    """Ingest observer for one upload; staged states reach the detector on commit."""
+
+    def __init__(self, detector: StreamDetector):
+        self.detector = detector
+        self._staged: Dict[int, _UserState] = {}
+        # failed logins this batch added, per user (the staged copies also hold the older ones)
+        self._failed: Dict[int, List[datetime]] = {}
+
+    def observe(self, uow: IUnitOfWork, log: LogEntity, activity_code: str) -> List[AnomalyEntity]:
+        if activity_code not in ("login_failed", "login_success"):
+            return []
+        d = self.detector
+        st = self._staged.get(log.user_id)
+        if st is None:
+            st = self._staged[log.user_id] = d._staged_copy(log.user_id)
+        ts = _utc(log.ts)
+        if activity_code == "login_failed":
+            self._failed.setdefault(log.user_id, []).append(ts)
+            a = d._on_failed(st, log.user_id, ts, uow.anomalies.resolve_type_id(d.failed_rule.name))
+        else:
+            a = d._on_login(st, log.user_id, ts, log.source_ip or "", uow.anomalies.resolve_type_id(d.travel_rule.name))
+        return [a] if a else []
+
+    def flush(self, uow: IUnitOfWork) -> List[AnomalyEntity]:
+        # alerts are raised per event; the states wait for the commit
+        if self._staged:
+            uow.on_commit(partial(self.detector._apply, self._staged, self._failed))
+        return []
+
+
+_DETECTOR: Optional[StreamDetector] = None
+
+def get_stream_detector() -> Optional[StreamDetector]:
+    global _DETECTOR
+    if not settings.STREAM_DETECTION:
+        return None
+    if _DETECTOR is None:
+        _DETECTOR = StreamDetector(
+            max_users=settings.STREAM_MAX_USERS,
+            idle_seconds=settings.STREAM_IDLE_SECONDS,
+            ring_size=settings.STREAM_FAILED_RING,
+        )
+    return _DETECTOR
@@ -0,0 +1,49 @@
+from typing import Dict, Optional, Sequence
+from app.core.config import settings
+from app.core.uow import IUnitOfWork
+
+# action -> column values it sets; "assign" takes its value from the request
+ACTIONS: Dict[str, Dict[str, str]] = {
+    "close": {"status": "closed"},
+    "reopen": {"status": "open"},
+    "assign": {},
+}
+
+class TriageService:
+    """
+    Closes, reopens or reassigns every anomaly matching an id list and/or a
+    filter with set-based UPDATEs of `chunk_size` rows. Each chunk is committed
+    together with the risk aggregates (users.risk_score / anomaly_count and
+    group_risk) of the users it touched, so they never disagree with the
+    anomalies they summarize and row locks are held for one chunk only.
+    """
+
+    def __init__(self, uow: IUnitOfWork, chunk_size: Optional[int] = None):
+        self.uow = uow
+        self.chunk_size = chunk_size or settings.TRIAGE_CHUNK_SIZE
+
+    def apply(self, action: str, ids: Optional[Sequence[int]] = None, assignee: Optional[str] = None,
+              **filters) -> dict:
+        values = dict(ACTIONS[action])
+        if action == "assign":
+            values["assignee"] = assignee
+        conds = self.uow.anomalies.triage_conditions(ids=ids, **filters)
+
+        updated, chunks, users, last_id = 0, 0, set(), 0
+        while True:
+            rows = self.uow.anomalies.update_chunk(conds, values, last_id, self.chunk_size)
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            touched = {user_id for _, user_id, _, _ in rows}
+            if "status" in values:
+                # only open anomalies count towards risk; anomaly buckets count every status
+                self.uow.users.refresh_risk(touched)
+                self.uow.analytics.apply_group_deltas(self.uow.users.pop_group_deltas())
+            self.uow.commit()
+            updated += len(rows)
+            chunks += 1
+            users |= touched
+            if len(rows) < self.chunk_size:
+                break
+        return {"action": action, "updated": updated, "users": len(users), "chunks": chunks}
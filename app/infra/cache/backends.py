@@ -0,0 +1,143 @@
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+
+class CacheBackend(ABC):
+    """Byte-string key/value store for cached responses plus the shared data-version counter."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]: ...
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: float) -> None: ...
+    @abstractmethod
+    def version(self) -> int: ...
+    @abstractmethod
+    def bump_version(self) -> int: ...
+    @abstractmethod
+    def clear(self) -> None: ...
+
+    def stats(self) -> dict:
+        return {"backend": type(self).__name__}
+
+
+class NullBackend(CacheBackend):
+    """Caching off: every lookup misses, nothing is stored."""
+
+    def __init__(self, reason: str = ""):
+        self.reason = reason
+
+    def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        pass
+
+    def version(self) -> int:
+        return 0
+
+    def bump_version(self) -> int:
+        return 0
+
+    def clear(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": "off", "reason": self.reason}
+
+
+class MemoryBackend(CacheBackend):
+    """
+    In-process LRU with per-entry TTL; also the stand-in for a shared backend.
+    Entries and the data version are per process: one worker's writes don't
+    invalidate another's entries, so it is only for a single worker (CACHE_URL=memory://).
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple[float, bytes]]" = OrderedDict()
+        self._version = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < now:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def version(self) -> int:
+        return self._version
+
+    def bump_version(self) -> int:
+        with self._lock:
+            self._version += 1
+            return self._version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"backend": "memory", "entries": len(self._data), "max_entries": self.max_entries,
+                    "hits": self.hits, "misses": self.misses, "data_version": self._version}
+
+
+class RedisBackend(CacheBackend):
+    """Shared across workers: entries and the data version live in Redis."""
+
+    VERSION_KEY = "ueba:data_version"
+    PREFIX = "ueba:resp:"
+
+    def __init__(self, url: str):
+        import redis  # type: ignore  # optional dependency
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.PREFIX + key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.client.set(self.PREFIX + key, value, px=max(1, int(ttl * 1000)))
+
+    def version(self) -> int:
+        return int(self.client.get(self.VERSION_KEY) or 0)
+
+    def bump_version(self) -> int:
+        return int(self.client.incr(self.VERSION_KEY))
+
+    def clear(self) -> None:
+        for k in self.client.scan_iter(self.PREFIX + "*"):
+            self.client.delete(k)
+
+    def stats(self) -> dict:
+        return {"backend": "redis", "data_version": self.version()}
+
+
+def pack_entry(version: int, etag: str, body: bytes) -> bytes:
+    head = json.dumps({"v": version, "etag": etag}).encode()
+    return len(head).to_bytes(4, "big") + head + body
+
+
+def unpack_entry(raw: bytes) -> tuple[int, str, bytes]:
+    n = int.from_bytes(raw[:4], "big")
+    head = json.loads(raw[4:4 + n])
+    return head["v"], head["etag"], raw[4 + n:]
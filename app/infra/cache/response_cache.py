@@ -0,0 +1,60 @@
+import logging
+import threading
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.infra.cache.backends import CacheBackend, MemoryBackend, NullBackend, RedisBackend
+
+log = logging.getLogger(__name__)
+
+# CACHE_URL that opts into the in-process cache (single worker only)
+MEMORY_URL = "memory://"
+
+_BACKEND: Optional[CacheBackend] = None
+_LOCK = threading.Lock()
+
+# session.info flag set by repository writes; the UoW bumps the data version when it commits them
+DIRTY_FLAG = "data_changed"
+
+
+def get_backend() -> CacheBackend:
+    global _BACKEND
+    if _BACKEND is None:
+        with _LOCK:
+            if _BACKEND is None:
+                backend: CacheBackend | None = None
+                if settings.CACHE_URL == MEMORY_URL:
+                    # per process: entries other workers' writes made stale would be served until their TTL
+                    backend = MemoryBackend(settings.CACHE_MAX_ENTRIES)
+                elif settings.CACHE_URL:
+                    try:
+                        backend = RedisBackend(settings.CACHE_URL)
+                    except Exception as e:
+                        log.error("Cache backend error: %s", e)
+                if backend is None:
+                    log.warning("Response cache off: set CACHE_URL=redis://... (or %s with a single worker)",
+                                MEMORY_URL)
+                    backend = NullBackend("no shared CACHE_URL" if not settings.CACHE_URL else "backend unavailable")
+                _BACKEND = backend
+    return _BACKEND
+
+
+def set_backend(backend: CacheBackend) -> None:
+    """Swap the backend (e.g. a MemoryBackend stand-in for the shared one)."""
+    global _BACKEND
+    with _LOCK:
+        _BACKEND = backend
+
+
+def mark_changed(db: Session) -> None:
+    db.info[DIRTY_FLAG] = True
+
+
+def bump_if_changed(db: Session) -> None:
+    if db.info.pop(DIRTY_FLAG, False):
+        try:
+            get_backend().bump_version()
+        except Exception as e:
+            log.error("Cache version bump error: %s", e)
@@ -1,6 +1,8 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from app.core.config import settings
+from app.infra.metrics.instruments import TimedQueuePool, instrument_engine
+from app.infra.db.slow_queries import install_slow_query_recorder
 
 class Base(DeclarativeBase):
     pass
@@ -10,6 +12,15 @@ engine = create_engine(
     pool_pre_ping=True,
     pool_size=5,
     max_overflow=10,
+    poolclass=TimedQueuePool if settings.METRICS_ENABLED else None,
+)
+if settings.METRICS_ENABLED:
+    instrument_engine(engine)
+install_slow_query_recorder(
+    engine, settings.SLOW_QUERY_MS,
+    explain_rate=settings.SLOW_QUERY_EXPLAIN_RATE,
+    capacity=settings.SLOW_QUERY_CAPACITY,
+    explain_timeout_ms=settings.SLOW_QUERY_EXPLAIN_TIMEOUT_MS,
 )
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
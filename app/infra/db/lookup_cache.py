@@ -0,0 +1,86 @@
+import threading
+from typing import Dict, Type
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.infra.db.models import ActivityType, AnomalyType, Role
+
+LOOKUP_MODELS = (ActivityType, AnomalyType, Role)
+
+
+class LookupCache:
+    """
+    Process-wide code -> id cache for the lookup tables (activity_types,
+    anomaly_types, roles). Lookup rows are never deleted, so cached ids stay
+    valid; misses are filled with INSERT .. ON CONFLICT DO NOTHING in their own
+    short transaction, which is safe across workers and never leaves the cache
+    pointing at a row rolled back with the caller's session.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, Dict[str, int]] = {m.__tablename__: {} for m in LOOKUP_MODELS}
+        self._codes: Dict[str, Dict[int, str]] = {m.__tablename__: {} for m in LOOKUP_MODELS}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def preload(self, engine: Engine) -> int:
+        loaded = 0
+        with engine.connect() as conn:
+            for model in LOOKUP_MODELS:
+                rows = conn.execute(select(model.code, model.id)).all()
+                with self._lock:
+                    self._ids[model.__tablename__].update({c: int(i) for c, i in rows})
+                    self._codes[model.__tablename__].update({int(i): c for c, i in rows})
+                loaded += len(rows)
+        return loaded
+
+    def id_for(self, db: Session, model: Type, code: str) -> int:
+        table = self._ids[model.__tablename__]
+        with self._lock:
+            at_id = table.get(code)
+            if at_id is not None:
+                self.hits += 1
+                return at_id
+            self.misses += 1
+
+        name = code.replace("_", " ").title()[:model.name.type.length]
+        with db.get_bind().begin() as conn:
+            at_id = conn.execute(
+                pg_insert(model)
+                .values(code=code, name=name)
+                .on_conflict_do_nothing(index_elements=["code"])
+                .returning(model.id)
+            ).scalar()
+            if at_id is None:
+                at_id = conn.execute(select(model.id).where(model.code == code)).scalar_one()
+        with self._lock:
+            table[code] = int(at_id)
+            self._codes[model.__tablename__][int(at_id)] = code
+        return int(at_id)
+
+    def code_for(self, model: Type, type_id: int) -> str | None:
+        """Reverse lookup from the cached rows."""
+        with self._lock:
+            return self._codes[model.__tablename__].get(type_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            for t in (*self._ids.values(), *self._codes.values()):
+                t.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else None,
+                "entries": {t: len(v) for t, v in self._ids.items()},
+            }
+
+
+lookup_cache = LookupCache()
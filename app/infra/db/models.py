@@ -1,6 +1,6 @@
 from sqlalchemy import (
     Column, Integer, String, DateTime, Float, Boolean, ForeignKey,
-    JSON, Index, UniqueConstraint, text
+    JSON, Index, UniqueConstraint, LargeBinary, SmallInteger, text
 )
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from datetime import datetime
@@ -42,6 +42,15 @@ class User(Base):
     logs = relationship("Log", back_populates="user")
     anomalies = relationship("Anomaly", back_populates="user")
 
+    __table_args__ = (
+        # keyset pagination of the users list (risk desc, id desc)
+        Index("ix_users_risk_score_id", "risk_score", "id"),
+        # substring search (ILIKE '%q%') via pg_trgm
+        Index("ix_users_username_trgm", "username", postgresql_using="gin", postgresql_ops={"username": "gin_trgm_ops"}),
+        Index("ix_users_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+        Index("ix_users_uid_trgm", "uid", postgresql_using="gin", postgresql_ops={"uid": "gin_trgm_ops"}),
+    )
+
 class Log(Base):
     __tablename__ = "logs"
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -71,6 +80,7 @@ class Anomaly(Base):
     risk: Mapped[float] = mapped_column(Float)
     confidence: Mapped[float] = mapped_column(Float)
     status: Mapped[str] = mapped_column(String(16), server_default=text("'open'"))
+    assignee: Mapped[str | None] = mapped_column(String(128))
     detected_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=text("now()"))
     evidence_json: Mapped[dict | None] = mapped_column(JSON)
 
@@ -80,4 +90,99 @@ class Anomaly(Base):
     __table_args__ = (
         Index("ix_anom_user_status", "user_id", "status"),
         Index("ix_anom_type_ts", "anomaly_type_id", "detected_at"),
+        # analytics bucket refresh scans anomalies by detection hour
+        Index("ix_anom_detected_at", "detected_at"),
     )
+
+# ===== Feature store =====
+class UserFeatures(Base):
+    __tablename__ = "user_features"
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    window_end: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    feature_version: Mapped[int] = mapped_column(Integer, primary_key=True)
+    features: Mapped[dict] = mapped_column(JSON, nullable=False)
+
+    __table_args__ = (
+        Index("ix_user_features_window", "window_end", "feature_version", "user_id"),
+    )
+
+class FeatureWindow(Base):
+    """Completion marker: every active user's row for this window/version is stored."""
+    __tablename__ = "feature_windows"
+    window_end: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    feature_version: Mapped[int] = mapped_column(Integer, primary_key=True)
+    window_hours: Mapped[int] = mapped_column(Integer, nullable=False)
+    user_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    computed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=text("now()"))
+
+class FeatureSchema(Base):
+    """Ordered model input columns behind the `feature_schema` id in anomaly evidence."""
+    __tablename__ = "feature_schemas"
+    id: Mapped[str] = mapped_column(String(12), primary_key=True)
+    columns: Mapped[list] = mapped_column(JSON, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=text("now()"))
+
+# ===== Behavioral baselines =====
+class UserBaseline(Base):
+    """Running per-user statistics, updated at ingest (see domain/services/baselines.py)."""
+    __tablename__ = "user_baselines"
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    # Welford over closed hourly event-count buckets (idle hours count as zeros)
+    n_hours: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    mean: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    m2: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    # hour currently being counted, not yet folded into the statistics
+    cur_bucket: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    cur_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    hour_hist: Mapped[list] = mapped_column(JSON, nullable=False)
+    activity_counts: Mapped[dict] = mapped_column(JSON, nullable=False)
+    last_alert_bucket: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=text("now()"))
+
+    __table_args__ = (
+        Index("ix_user_baselines_cur_bucket", "cur_bucket"),
+    )
+
+# ===== Distinct-count sketches =====
+class UserSketch(Base):
+    """HyperLogLog of one attribute's values for a user over an hour (span 1) or a day (span 24)."""
+    __tablename__ = "user_sketches"
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    attr: Mapped[str] = mapped_column(String(16), primary_key=True)
+    bucket_start: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    span_hours: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    sketch: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+    __table_args__ = (
+        Index("ix_user_sketches_bucket", "span_hours", "bucket_start"),
+    )
+
+# ===== Novelty index =====
+class UserNovelty(Base):
+    """Bloom filter of the values a user has used for one attribute (ip, ip_prefix, country, device)."""
+    __tablename__ = "user_novelty"
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    attr: Mapped[str] = mapped_column(String(16), primary_key=True)
+    bloom: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    n_items: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    first_seen_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+# ===== Analytics summaries =====
+class AnomalyCountHourly(Base):
+    """Anomalies per type and detection hour; buckets touched by a write are recomputed."""
+    __tablename__ = "anomaly_counts_hourly"
+    bucket: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    anomaly_type_id: Mapped[int] = mapped_column(ForeignKey("anomaly_types.id"), primary_key=True)
+    anomaly_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    risk_sum: Mapped[float] = mapped_column(Float, nullable=False)
+    max_risk: Mapped[float] = mapped_column(Float, nullable=False)
+
+class GroupRisk(Base):
+    """Risk aggregate per user group (role); writers add their users' risk changes to it."""
+    __tablename__ = "group_risk"
+    group_code: Mapped[str] = mapped_column(String(64), primary_key=True)
+    group_name: Mapped[str] = mapped_column(String(128), nullable=False)
+    user_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    risk_sum: Mapped[float] = mapped_column(Float, nullable=False)
+    high_risk_users: Mapped[int] = mapped_column(Integer, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=text("now()"))
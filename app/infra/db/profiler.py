@@ -0,0 +1,147 @@
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# the profiler of the request (thread / task) being profiled, if any
+_ACTIVE: ContextVar[Optional["QueryProfiler"]] = ContextVar("query_profiler", default=None)
+
+
+def profile_session(session: Session) -> None:
+    """Count `session`'s statements too, when a QueryProfiler is active in this context."""
+    prof = _ACTIVE.get()
+    if prof is not None:
+        prof.attach(session)
+
+
+class QueryProfiler:
+    """
+    Per-stage wall time, DB time, statement/row counts and peak Python memory
+    for one session. DB figures come from cursor-execute events on the engine,
+    filtered to the connection each profiled session holds in its current
+    transaction (re-bound on every begin, so statements after a commit still
+    count). Sessions opened while the profiler is active (e.g. the
+    feature-store session of `uow.detached()`) join via `profile_session`.
+
+        with QueryProfiler(session) as prof:
+            with prof.stage("features"): ...
+        prof.report()
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.engine = session.get_bind()
+        self.db_seconds = 0.0
+        self.statements = 0
+        self.rows = 0
+        self.stages: List[Dict[str, Any]] = []
+        self._by_name: Dict[str, Dict[str, Any]] = {}
+        self._conns: Dict[Session, Any] = {}
+        self._sessions: List[Session] = []
+        self._token = None
+        self._started_tracing = False
+        self._t0 = 0.0
+        self._wall = 0.0
+
+    # -------- engine hooks --------
+    def _mine(self, conn) -> bool:
+        return any(c is conn for c in self._conns.values())
+
+    def _began(self, session, transaction, connection):
+        self._conns[session] = connection
+
+    def _ended(self, session, transaction):
+        # the connection goes back to the pool: whoever checks it out next is not ours
+        if transaction.parent is None:
+            self._conns.pop(session, None)
+
+    def attach(self, session: Session) -> None:
+        event.listen(session, "after_begin", self._began)
+        event.listen(session, "after_transaction_end", self._ended)
+        self._sessions.append(session)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        if self._mine(conn):
+            conn.info["prof_t0"] = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        t0 = conn.info.pop("prof_t0", None)
+        if t0 is None or not self._mine(conn):
+            return
+        self.db_seconds += time.perf_counter() - t0
+        self.statements += 1
+        if cursor.description is not None and (cursor.rowcount or 0) > 0:
+            self.rows += cursor.rowcount
+
+    def __enter__(self) -> "QueryProfiler":
+        self.attach(self.session)
+        self._conns[self.session] = self.session.connection()
+        self._token = _ACTIVE.set(self)
+        event.listen(self.engine, "before_cursor_execute", self._before)
+        event.listen(self.engine, "after_cursor_execute", self._after)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._wall = time.perf_counter() - self._t0
+        event.remove(self.engine, "before_cursor_execute", self._before)
+        event.remove(self.engine, "after_cursor_execute", self._after)
+        for session in self._sessions:
+            event.remove(session, "after_begin", self._began)
+            event.remove(session, "after_transaction_end", self._ended)
+        self._sessions.clear()
+        self._conns.clear()
+        _ACTIVE.reset(self._token)
+        if self._started_tracing:
+            tracemalloc.stop()
+        return False
+
+    # -------- stages --------
+    def _add(self, name: str, wall: float, db: float = 0.0, statements: int = 0, rows: int = 0,
+             peak_kb: float = 0.0) -> None:
+        # a stage entered again (once per chunk in a chunked run) accumulates into its first entry
+        entry = self._by_name.get(name)
+        if entry is None:
+            entry = self._by_name[name] = {"stage": name, "calls": 0, "wall_ms": 0.0, "db_ms": 0.0,
+                                           "statements": 0, "rows": 0, "peak_mem_kb": 0.0}
+            self.stages.append(entry)
+        entry["calls"] += 1
+        entry["wall_ms"] = round(entry["wall_ms"] + wall * 1000, 2)
+        entry["db_ms"] = round(entry["db_ms"] + db * 1000, 2)
+        entry["statements"] += statements
+        entry["rows"] += rows
+        entry["peak_mem_kb"] = max(entry["peak_mem_kb"], round(peak_kb, 1))
+
+    @contextmanager
+    def stage(self, name: str):
+        db0, st0, rows0 = self.db_seconds, self.statements, self.rows
+        tracemalloc.reset_peak()
+        mem0 = tracemalloc.get_traced_memory()[0]
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - t0
+            peak = tracemalloc.get_traced_memory()[1]
+            self._add(name, wall, self.db_seconds - db0, self.statements - st0, self.rows - rows0,
+                      max(0, peak - mem0) / 1024)
+
+    def record(self, name: str, seconds: float) -> None:
+        """A stage timed elsewhere (e.g. a model's predict in a worker process): wall time only."""
+        self._add(name, seconds)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "wall_ms": round(self._wall * 1000, 2),
+            "db_ms": round(self.db_seconds * 1000, 2),
+            "statements": self.statements,
+            "rows": self.rows,
+            "stages": self.stages,
+        }
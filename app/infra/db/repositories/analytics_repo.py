@@ -0,0 +1,119 @@
+from typing import Dict, Iterable, List, Optional
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+from sqlalchemy import select, func, text, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY, FLOAT, INTEGER, TIMESTAMP
+
+from app.domain.repositories.base import IAnalyticsRepo
+from app.infra.db.models import AnomalyCountHourly, AnomalyType, GroupRisk
+from app.infra.db.repositories.user_repo import HIGH_RISK
+
+# one hour bucket per row of :buckets, recomputed from anomalies in that hour
+_REFRESH_BUCKETS = text("""
+    INSERT INTO anomaly_counts_hourly (bucket, anomaly_type_id, anomaly_count, risk_sum, max_risk)
+    SELECT b.bucket, a.anomaly_type_id, count(*), coalesce(sum(a.risk), 0), coalesce(max(a.risk), 0)
+    FROM unnest(:buckets) AS b(bucket)
+    JOIN anomalies a ON a.detected_at >= b.bucket AND a.detected_at < b.bucket + interval '1 hour'
+    GROUP BY b.bucket, a.anomaly_type_id
+    ON CONFLICT (bucket, anomaly_type_id) DO UPDATE
+       SET anomaly_count = EXCLUDED.anomaly_count,
+           risk_sum = EXCLUDED.risk_sum,
+           max_risk = EXCLUDED.max_risk
+""").bindparams(bindparam("buckets", type_=ARRAY(TIMESTAMP(timezone=True))))
+
+_GROUP_RECOMPUTE = """
+    INSERT INTO group_risk (group_code, group_name, user_count, risk_sum, high_risk_users, updated_at)
+    SELECT coalesce(r.code, 'employee') AS code, coalesce(max(r.name), 'Employee'),
+           count(*), coalesce(sum(u.risk_score), 0), count(*) FILTER (WHERE u.risk_score >= :high), now()
+    FROM users u LEFT JOIN roles r ON r.id = u.role_id
+    GROUP BY 1
+    ON CONFLICT (group_code) DO UPDATE
+       SET group_name = EXCLUDED.group_name,
+           user_count = EXCLUDED.user_count,
+           risk_sum = EXCLUDED.risk_sum,
+           high_risk_users = EXCLUDED.high_risk_users,
+           updated_at = EXCLUDED.updated_at
+"""
+# per-role deltas (rows of the unnested arrays) added to the stored group totals, groups in code order
+_GROUP_APPLY = text("""
+    INSERT INTO group_risk (group_code, group_name, user_count, risk_sum, high_risk_users, updated_at)
+    SELECT coalesce(r.code, 'employee'), coalesce(max(r.name), 'Employee'),
+           sum(d.users), sum(d.risk), sum(d.high), now()
+    FROM unnest(:role_ids, :users, :risks, :highs) AS d(role_id, users, risk, high)
+    LEFT JOIN roles r ON r.id = d.role_id
+    GROUP BY 1
+    ORDER BY 1
+    ON CONFLICT (group_code) DO UPDATE
+       SET user_count = group_risk.user_count + EXCLUDED.user_count,
+           risk_sum = group_risk.risk_sum + EXCLUDED.risk_sum,
+           high_risk_users = group_risk.high_risk_users + EXCLUDED.high_risk_users,
+           updated_at = EXCLUDED.updated_at
+""").bindparams(
+    bindparam("role_ids", type_=ARRAY(INTEGER)), bindparam("users", type_=ARRAY(INTEGER)),
+    bindparam("risks", type_=ARRAY(FLOAT)), bindparam("highs", type_=ARRAY(INTEGER)),
+)
+
+class AnalyticsRepo(IAnalyticsRepo):
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _lock(self, name: str) -> None:
+        # serialize refreshes until commit, so a refresh started after another
+        # transaction's refresh sees that transaction's rows and can't overwrite them
+        self.db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:n))"), {"n": name})
+
+    # -------- refresh --------
+    def refresh_anomaly_buckets(self, buckets: Iterable[datetime]) -> int:
+        buckets = sorted(set(buckets))
+        if not buckets:
+            return 0
+        self._lock("anomaly_counts_hourly")
+        self.db.execute(_REFRESH_BUCKETS, {"buckets": buckets})
+        return len(buckets)
+
+    def refresh_group_risk(self) -> None:
+        """Recompute every group (role) from users, e.g. after a full risk refresh."""
+        # waits for transactions that already applied deltas (so their users are read here) and
+        # holds back later ones until commit (their deltas then add to the recomputed totals)
+        self.db.execute(text("LOCK TABLE group_risk IN EXCLUSIVE MODE"))
+        self.db.execute(text(_GROUP_RECOMPUTE), {"high": HIGH_RISK})
+
+    def apply_group_deltas(self, deltas: Dict[Optional[int], List[float]]) -> None:
+        """
+        Add UserRepo.pop_group_deltas() (role_id -> [users, risk_sum,
+        high_risk_users] changes) to group_risk: one upsert of the touched
+        groups, no scan of users. Commutative, so concurrent writers only
+        wait for each other's group rows, which are locked from here to commit.
+        """
+        deltas = {r: d for r, d in deltas.items() if any(d)}
+        if not deltas:
+            return
+        roles = list(deltas)
+        self.db.execute(_GROUP_APPLY, {
+            "role_ids": roles,
+            "users": [int(deltas[r][0]) for r in roles],
+            "risks": [float(deltas[r][1]) for r in roles],
+            "highs": [int(deltas[r][2]) for r in roles],
+        })
+
+    # -------- reads --------
+    def anomaly_type_counts(self, start: datetime, end: datetime) -> List[Dict]:
+        """Per-type totals over [start, end): a primary-key range scan of the hourly buckets."""
+        q = (
+            select(AnomalyType.code, AnomalyType.name, func.sum(AnomalyCountHourly.anomaly_count))
+            .join(AnomalyType, AnomalyType.id == AnomalyCountHourly.anomaly_type_id)
+            .where(AnomalyCountHourly.bucket >= start, AnomalyCountHourly.bucket < end)
+            .group_by(AnomalyType.code, AnomalyType.name)
+            .order_by(func.sum(AnomalyCountHourly.anomaly_count).desc())
+        )
+        return [{"type": c, "label": n, "count": int(cnt)} for c, n, cnt in self.db.execute(q)]
+
+    def group_risk(self) -> List[Dict]:
+        q = select(GroupRisk).order_by((GroupRisk.risk_sum / func.nullif(GroupRisk.user_count, 0)).desc())
+        return [
+            {"group_code": g.group_code, "group_name": g.group_name, "user_count": g.user_count,
+             "average_risk_score": round(g.risk_sum / g.user_count, 2) if g.user_count else 0.0,
+             "high_risk_users": g.high_risk_users}
+            for g in self.db.execute(q).scalars()
+        ]
@@ -1,12 +1,17 @@
 from __future__ import annotations
-from typing import Iterable, Dict, Any, List, Optional, Union
+from typing import Iterable, Dict, Any, List, Optional, Sequence, Tuple, Union
 from datetime import datetime, timezone
 
 from sqlalchemy.orm import Session
-from sqlalchemy import select, update
+from sqlalchemy import select, update, or_, Select
 
 from app.domain.repositories.base import IAnomalyRepo
-from app.infra.db.models import Anomaly, AnomalyType
+from app.infra.db.models import Anomaly, AnomalyType, User
+from app.infra.db.lookup_cache import lookup_cache
+from app.domain.services.baselines import hour_bucket
+from app.infra.cache.response_cache import mark_changed
+from app.infra.feed.anomaly_feed import queue_event
+from app.infra.metrics.instruments import INGEST_FLUSH, INGEST_ROWS, timed
 
 # ????? ????????? ????????? ?? AnomalyEntity ??????? ?????? ???
 try:
@@ -19,18 +24,29 @@ RowType = Union[Dict[str, Any], "AnomalyEntity"]
 class AnomalyRepo(IAnomalyRepo):
     def __init__(self, db: Session):
         self.db = db
+        # detection hours written through this repo, for the analytics summary refresh
+        self.touched_buckets: set[datetime] = set()
+        self._type_codes: Dict[int, Optional[str]] = {}
+
+    def pop_touched_buckets(self) -> set[datetime]:
+        out, self.touched_buckets = self.touched_buckets, set()
+        return out
+
+    # -------- live feed --------
+    def _feed_event(self, kind: str, *, id: Optional[int], user_id: int, type_id: int, risk: float,
+                    score: Optional[float] = None, status: str, detected_at: Optional[datetime] = None) -> None:
+        if type_id not in self._type_codes:
+            self._type_codes[type_id] = lookup_cache.code_for(AnomalyType, type_id)
+        code = self._type_codes[type_id]
+        queue_event(self.db, kind, code, lambda: {
+            "event": kind, "id": id, "user_id": user_id,
+            "type": code, "risk": risk, "score": score,
+            "status": status, "detected_at": detected_at.isoformat() if detected_at else None,
+        })
 
     # -------- Lookup helpers --------
     def resolve_anomaly_type_id(self, code: str) -> int:
-        at = self.db.execute(
-            select(AnomalyType).where(AnomalyType.code == code)
-        ).scalar_one_or_none()
-        if at:
-            return at.id
-        at = AnomalyType(code=code, name=code.replace("_", " ").title())
-        self.db.add(at)
-        self.db.flush()
-        return at.id
+        return lookup_cache.id_for(self.db, AnomalyType, code)
 
     # ????? ?????? ??? interface
     def resolve_type_id(self, code: str) -> int:
@@ -62,6 +78,10 @@ class AnomalyRepo(IAnomalyRepo):
         )
         self.db.add(anom)
         self.db.flush()
+        self.touched_buckets.add(hour_bucket(anom.detected_at))
+        mark_changed(self.db)
+        self._feed_event("created", id=anom.id, user_id=user_id, type_id=at_id, risk=risk, score=score,
+                         status=status, detected_at=anom.detected_at)
         return anom.id
 
     # -------- coercion helper --------
@@ -69,12 +89,13 @@ class AnomalyRepo(IAnomalyRepo):
         """
         ????? ???? dict ?? AnomalyEntity ??? dict ????? ?????.
         ???????? ???????:
-          user_id, anomaly_type, score, risk, confidence, status, detected_at, evidence
+          user_id, anomaly_type, anomaly_type_id, score, risk, confidence, status, detected_at, evidence
         """
         if isinstance(r, dict):
             return {
                 "user_id": r.get("user_id"),
                 "anomaly_type": r.get("anomaly_type") or r.get("type") or "model_ueba",
+                "anomaly_type_id": r.get("anomaly_type_id"),
                 "score": r.get("score", 0.0),
                 "risk": r.get("risk", 0.0),
                 "confidence": r.get("confidence", 0.0),
@@ -88,6 +109,7 @@ class AnomalyRepo(IAnomalyRepo):
         return {
             "user_id": int(get(r, "user_id", default=0)),
             "anomaly_type": get(r, "type_code", "anomaly_type", "type", default="model_ueba"),
+            "anomaly_type_id": get(r, "anomaly_type_id", default=None),
             "score": float(get(r, "score", default=0.0) or 0.0),
             "risk": float(get(r, "risk", default=0.0) or 0.0),
             "confidence": float(get(r, "confidence", default=0.0) or 0.0),
@@ -105,15 +127,17 @@ class AnomalyRepo(IAnomalyRepo):
         for raw in rows:
             r = self._coerce_row(raw)
             uid = int(r["user_id"])
-            tcode = str(r.get("anomaly_type") or "model_ueba")
-
-            if tcode not in type_cache:
-                type_cache[tcode] = self.resolve_anomaly_type_id(tcode)
+            type_id = r.get("anomaly_type_id")
+            if type_id is None:
+                tcode = str(r.get("anomaly_type") or "model_ueba")
+                if tcode not in type_cache:
+                    type_cache[tcode] = self.resolve_anomaly_type_id(tcode)
+                type_id = type_cache[tcode]
 
             objs.append(
                 Anomaly(
                     user_id=uid,
-                    anomaly_type_id=type_cache[tcode],
+                    anomaly_type_id=int(type_id),
                     score=float(r.get("score", 0.0)),
                     risk=float(r.get("risk", 0.0)),
                     confidence=float(r.get("confidence", 0.0)),
@@ -124,15 +148,95 @@ class AnomalyRepo(IAnomalyRepo):
             )
 
         if objs:
-            self.db.bulk_save_objects(objs)
+            with timed(INGEST_FLUSH, ("anomalies",)):
+                self.db.bulk_save_objects(objs)
+            INGEST_ROWS.inc(len(objs), ("anomalies",))
+            self.touched_buckets.update(hour_bucket(o.detected_at) for o in objs)
+            mark_changed(self.db)
+            # bulk_save_objects does not fetch ids; clients re-read the listing for them
+            for o in objs:
+                self._feed_event("created", id=None, user_id=o.user_id, type_id=o.anomaly_type_id, risk=o.risk,
+                                 score=o.score, status=o.status, detected_at=o.detected_at)
         return len(objs)
 
     # -------- status update --------
     def set_status(self, anomaly_id: int, status: str = "closed") -> bool:
-        res = self.db.execute(
+        rows = self.db.execute(
             update(Anomaly)
             .where(Anomaly.id == anomaly_id)
             .values(status=status)
-        )
+            .returning(Anomaly.id, Anomaly.user_id, Anomaly.anomaly_type_id, Anomaly.risk)
+        ).all()
         self.db.flush()
-        return (res.rowcount or 0) > 0
+        for aid, uid, type_id, risk in rows:
+            self._feed_event("updated", id=aid, user_id=uid, type_id=type_id, risk=risk, status=status)
+        if rows:
+            mark_changed(self.db)
+        return len(rows) > 0
+
+    # -------- bulk triage --------
+    def triage_conditions(self, *, ids: Optional[Sequence[int]] = None, type_code: Optional[str] = None,
+                          uid: Optional[str] = None, since: Optional[datetime] = None,
+                          until: Optional[datetime] = None, max_risk: Optional[float] = None,
+                          status: Optional[str] = None) -> list:
+        conds = []
+        if ids is not None:
+            conds.append(Anomaly.id.in_(sorted({int(i) for i in ids})))
+        if type_code:
+            # subquery rather than resolve_anomaly_type_id: an unknown code must not create a type
+            conds.append(Anomaly.anomaly_type_id.in_(select(AnomalyType.id).where(AnomalyType.code == type_code)))
+        if uid:
+            conds.append(Anomaly.user_id.in_(select(User.id).where(User.uid == uid)))
+        if since:
+            conds.append(Anomaly.detected_at >= since)
+        if until:
+            conds.append(Anomaly.detected_at < until)
+        if max_risk is not None:
+            conds.append(Anomaly.risk < max_risk)
+        if status:
+            conds.append(Anomaly.status == status)
+        return conds
+
+    def update_chunk(self, conds: list, values: Dict[str, Any], after_id: int = 0,
+                     limit: int = 5000) -> List[Tuple[int, int, int, float]]:
+        """
+        One set-based UPDATE of the next `limit` rows (by id, after `after_id`)
+        that match `conds` and differ from `values`.
+        Returns (id, user_id, anomaly_type_id, risk) of the changed rows.
+        """
+        differs = or_(*(getattr(Anomaly, k).is_distinct_from(v) for k, v in values.items()))
+        picked = (
+            select(Anomaly.id)
+            .where(*conds, differs, Anomaly.id > after_id)
+            .order_by(Anomaly.id)
+            .limit(limit)
+        )
+        rows = self.db.execute(
+            update(Anomaly)
+            .where(Anomaly.id.in_(picked.scalar_subquery()))
+            .values(**values)
+            .returning(Anomaly.id, Anomaly.user_id, Anomaly.anomaly_type_id, Anomaly.risk, Anomaly.status)
+            .execution_options(synchronize_session=False)
+        ).all()
+        for aid, uid, type_id, risk, status in rows:
+            self._feed_event("updated", id=aid, user_id=uid, type_id=type_id, risk=risk, status=status)
+        if rows:
+            mark_changed(self.db)
+        return sorted((int(a), int(u), int(t), float(r)) for a, u, t, r, _ in rows)
+
+    # -------- export --------
+    EXPORT_COLUMNS = ["id", "uid", "type", "score", "risk", "confidence", "status", "assignee", "detected_at",
+                      "evidence"]
+
+    def export_query(self, status: Optional[str] = None) -> Select:
+        """Plain column rows (no ORM objects) in EXPORT_COLUMNS order; same filters as the listing."""
+        q = (
+            select(Anomaly.id, User.uid, AnomalyType.code, Anomaly.score, Anomaly.risk, Anomaly.confidence,
+                   Anomaly.status, Anomaly.assignee, Anomaly.detected_at, Anomaly.evidence_json)
+            .join(User, Anomaly.user_id == User.id)
+            .join(AnomalyType, Anomaly.anomaly_type_id == AnomalyType.id)
+            .order_by(Anomaly.detected_at.desc())
+        )
+        if status:
+            q = q.where(Anomaly.status == status)
+        return q
@@ -0,0 +1,71 @@
+from typing import Dict, Iterable, List, Tuple
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+from sqlalchemy import select, update, func, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.domain.repositories.base import IBaselineRepo
+from app.domain.services.baselines import Baseline
+from app.infra.db.models import UserBaseline
+
+def _to_baseline(r: UserBaseline) -> Baseline:
+    return Baseline(
+        r.user_id, n=r.n_hours, mean=r.mean, m2=r.m2, cur_bucket=r.cur_bucket, cur_count=r.cur_count,
+        hour_hist=r.hour_hist, activity_counts=r.activity_counts, last_alert_bucket=r.last_alert_bucket,
+    )
+
+class BaselineRepo(IBaselineRepo):
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_many(self, user_ids: Iterable[int], for_update: bool = False) -> Dict[int, Baseline]:
+        ids = sorted(set(int(u) for u in user_ids))
+        if not ids:
+            return {}
+        q = select(UserBaseline).where(UserBaseline.user_id.in_(ids))
+        if for_update:
+            # sorted ids -> consistent lock order between concurrent uploads
+            q = q.order_by(UserBaseline.user_id).with_for_update()
+        return {r.user_id: _to_baseline(r) for r in self.db.execute(q).scalars()}
+
+    def save_many(self, baselines: Iterable[Baseline]) -> int:
+        rows = [
+            {"user_id": b.user_id, "n_hours": b.n, "mean": b.mean, "m2": b.m2,
+             "cur_bucket": b.cur_bucket, "cur_count": b.cur_count,
+             "hour_hist": b.hour_hist, "activity_counts": b.activity_counts}
+            for b in baselines
+        ]
+        if not rows:
+            return 0
+        stmt = pg_insert(UserBaseline).values(rows)
+        self.db.execute(stmt.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={c: stmt.excluded[c] for c in rows[0] if c != "user_id"} | {"updated_at": func.now()},
+        ))
+        return len(rows)
+
+    def deviating(self, since: datetime, min_hours: int, min_z: float,
+                  min_std: float = 1.0) -> List[Tuple[Baseline, float]]:
+        """Users whose open hour (at or after `since`) deviates >= min_z, one alert per hour."""
+        std = func.greatest(func.sqrt(UserBaseline.m2 / func.nullif(UserBaseline.n_hours - 1, 0)), min_std)
+        z = ((UserBaseline.cur_count - UserBaseline.mean) / std).label("z")
+        q = (
+            select(UserBaseline, z)
+            .where(
+                UserBaseline.cur_bucket >= since,
+                UserBaseline.n_hours >= min_hours,
+                or_(UserBaseline.last_alert_bucket.is_(None), UserBaseline.last_alert_bucket < UserBaseline.cur_bucket),
+                z >= min_z,
+            )
+        )
+        return [(_to_baseline(r), float(zv)) for r, zv in self.db.execute(q).all()]
+
+    def mark_alerted(self, user_ids: Iterable[int]) -> None:
+        ids = list(user_ids)
+        if ids:
+            self.db.execute(
+                update(UserBaseline)
+                .where(UserBaseline.user_id.in_(ids))
+                .values(last_alert_bucket=UserBaseline.cur_bucket)
+            )
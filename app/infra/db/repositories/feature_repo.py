@@ -0,0 +1,127 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+from sqlalchemy import select, delete, func, text, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.domain.repositories.base import IFeatureRepo
+from app.infra.db.models import UserFeatures, FeatureWindow, FeatureSchema
+
+_UPSERT_BATCH = 5000
+
+class FeatureStoreRepo(IFeatureRepo):
+    """user_features: one JSON feature row per (user, window_end, feature_version)."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def is_complete(self, window_end: datetime, version: int, window_hours: int) -> bool:
+        return self.db.execute(
+            select(FeatureWindow.window_end).where(
+                FeatureWindow.window_end == window_end,
+                FeatureWindow.feature_version == version,
+                FeatureWindow.window_hours == window_hours,
+            )
+        ).first() is not None
+
+    def lock_windows(self) -> None:
+        # held until commit: a window is materialized and invalidated one transaction at a time,
+        # so a window computed from logs an upload is still writing can't be committed after it
+        self.db.execute(text("SELECT pg_advisory_xact_lock(hashtext('feature_windows'))"))
+
+    def invalidate(self, since: datetime, until: datetime, reach_hours: int) -> int:
+        """
+        Drop the stored windows (and their user_features rows) whose inputs
+        include [since, until]: window_end > since and window_end - max(window
+        hours, reach_hours) <= until. Returns the number of windows dropped.
+        """
+        self.lock_windows()
+        reach = func.make_interval(0, 0, 0, 0, func.greatest(FeatureWindow.window_hours, reach_hours))
+        hit = (FeatureWindow.window_end > since, FeatureWindow.window_end - reach <= until)
+        stale = select(FeatureWindow.window_end, FeatureWindow.feature_version).where(*hit)
+        self.db.execute(delete(UserFeatures).where(
+            tuple_(UserFeatures.window_end, UserFeatures.feature_version).in_(stale)
+        ))
+        return self.db.execute(delete(FeatureWindow).where(*hit)).rowcount or 0
+
+    def upsert(self, window_end: datetime, version: int, feats: Dict[int, Dict]) -> int:
+        rows = [
+            {"user_id": int(uid), "window_end": window_end, "feature_version": version,
+             "features": {k: v for k, v in f.items() if k != "user_id"}}
+            for uid, f in feats.items()
+        ]
+        for i in range(0, len(rows), _UPSERT_BATCH):
+            stmt = pg_insert(UserFeatures).values(rows[i:i + _UPSERT_BATCH])
+            self.db.execute(stmt.on_conflict_do_update(
+                index_elements=["user_id", "window_end", "feature_version"],
+                set_={"features": stmt.excluded.features},
+            ))
+        return len(rows)
+
+    def mark_complete(self, window_end: datetime, version: int, window_hours: int, user_count: int) -> None:
+        stmt = pg_insert(FeatureWindow).values(
+            window_end=window_end, feature_version=version, window_hours=window_hours, user_count=user_count,
+        )
+        self.db.execute(stmt.on_conflict_do_update(
+            index_elements=["window_end", "feature_version"],
+            set_={"window_hours": stmt.excluded.window_hours, "user_count": stmt.excluded.user_count,
+                  "computed_at": func.now()},
+        ))
+
+    def user_ids(self, window_end: datetime, version: int) -> List[int]:
+        q = (
+            select(UserFeatures.user_id)
+            .where(UserFeatures.window_end == window_end, UserFeatures.feature_version == version)
+            .order_by(UserFeatures.user_id)
+        )
+        return [int(u) for u in self.db.execute(q).scalars()]
+
+    def read_window(self, window_end: datetime, version: int,
+                    user_id_range: Tuple[int, int] | None = None) -> Dict[int, Dict]:
+        q = select(UserFeatures.user_id, UserFeatures.features).where(
+            UserFeatures.window_end == window_end, UserFeatures.feature_version == version,
+        )
+        if user_id_range is not None:
+            q = q.where(UserFeatures.user_id.between(*user_id_range))
+        return {int(u): f for u, f in self.db.execute(q.order_by(UserFeatures.user_id))}
+
+    def windows(self, version: int | None = None, limit: int = 100) -> List[Dict]:
+        q = select(FeatureWindow).order_by(FeatureWindow.window_end.desc()).limit(limit)
+        if version is not None:
+            q = q.where(FeatureWindow.feature_version == version)
+        return [
+            {"window_end": w.window_end.isoformat(), "feature_version": w.feature_version,
+             "window_hours": w.window_hours, "user_count": w.user_count,
+             "computed_at": w.computed_at.isoformat() if w.computed_at else None}
+            for w in self.db.execute(q).scalars()
+        ]
+
+    def iter_as_of(self, as_of: datetime, version: int, user_ids: Iterable[int] | None = None,
+                   batch: int = 5000) -> Iterator[Tuple[int, datetime, Dict]]:
+        """
+        Point-in-time snapshot: each user's latest row with window_end <= as_of
+        (no feature computed after `as_of` leaks into a training set).
+        """
+        q = (
+            select(UserFeatures.user_id, UserFeatures.window_end, UserFeatures.features)
+            .distinct(UserFeatures.user_id)
+            .where(UserFeatures.feature_version == version, UserFeatures.window_end <= as_of)
+            .order_by(UserFeatures.user_id, UserFeatures.window_end.desc())
+        )
+        if user_ids is not None:
+            q = q.where(UserFeatures.user_id.in_(list(user_ids)))
+        for u, we, f in self.db.execute(q.execution_options(yield_per=batch)):
+            yield int(u), we, f
+
+    # -------- feature schemas --------
+    def save_schemas(self, schemas: Dict[str, List[str]]) -> None:
+        """Idempotent: ids are content hashes of the column list."""
+        if not schemas:
+            return
+        stmt = pg_insert(FeatureSchema).values([{"id": sid, "columns": list(cols)} for sid, cols in schemas.items()])
+        self.db.execute(stmt.on_conflict_do_nothing(index_elements=["id"]))
+
+    def get_schema(self, schema_id: str) -> Optional[List[str]]:
+        cols = self.db.execute(select(FeatureSchema.columns).where(FeatureSchema.id == schema_id)).scalar()
+        return list(cols) if cols is not None else None
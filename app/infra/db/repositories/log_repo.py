@@ -1,26 +1,21 @@
-from typing import Iterable, List, Tuple, Dict
+from typing import Iterable, List, Tuple, Dict, Sequence, Any
 from datetime import datetime, timedelta, timezone
 from sqlalchemy.orm import Session
-from sqlalchemy import select, func, and_, or_, case  # << ??? ????? case
+from sqlalchemy import select, func, and_, or_, case, Select  # << ??? ????? case
 
 from app.domain.repositories.base import ILogRepo
 from app.domain.entities.log import LogEntity
-from app.infra.db.models import Log, ActivityType
+from app.infra.db.models import Log, ActivityType, User
+from app.infra.db.lookup_cache import lookup_cache
+from app.infra.cache.response_cache import mark_changed
+from app.infra.metrics.instruments import INGEST_FLUSH, INGEST_ROWS, timed
 
 class LogRepo(ILogRepo):
     def __init__(self, db: Session):
         self.db = db
 
     def resolve_activity_type_id(self, code: str) -> int:
-        at = self.db.execute(
-            select(ActivityType).where(ActivityType.code == code)
-        ).scalar_one_or_none()
-        if at:
-            return at.id
-        at = ActivityType(code=code, name=code.replace("_", " ").title())
-        self.db.add(at)
-        self.db.flush()
-        return at.id
+        return lookup_cache.id_for(self.db, ActivityType, code)
 
     def bulk_add(self, rows: Iterable[LogEntity]) -> int:
         objs = []
@@ -36,7 +31,10 @@ class LogRepo(ILogRepo):
                 is_night=r.is_night
             ))
         if objs:
-            self.db.bulk_save_objects(objs)
+            with timed(INGEST_FLUSH, ("logs",)):
+                self.db.bulk_save_objects(objs)
+            INGEST_ROWS.inc(len(objs), ("logs",))
+            mark_changed(self.db)
         return len(objs)
 
     def after_hours_counts(self, open_start: int = 8, open_end: int = 18) -> List[Tuple[int, int]]:
@@ -58,9 +56,47 @@ class LogRepo(ILogRepo):
         )
         return [(int(uid), int(cnt)) for uid, cnt in q.all()]
 
-    def recent_logins(self, since_hours: int = 48, max_per_user: int = 500) -> List[Tuple[int, datetime, str]]:
+    def threshold_counts(self, window_hours: int, group_by: Sequence[str],
+                         metrics: Sequence[Dict[str, Any]]) -> List[Tuple[tuple, Dict[str, int]]]:
+        """
+        One aggregate scan of `logs` for several count thresholds that share the
+        same window and group-by. Each metric is a dict:
+          key, threshold, activity_type_ids (list|None), hours_outside ((start, end)|None)
+        Returns (group values, {key: count}) for groups where any metric hits its threshold.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=window_hours)
+        cols = [getattr(Log, c) for c in group_by]
+
+        sums, having = [], []
+        type_ids: set = set()
+        all_typed = True
+        for m in metrics:
+            conds = []
+            if m.get("activity_type_ids"):
+                conds.append(Log.activity_type_id.in_(m["activity_type_ids"]))
+                type_ids.update(m["activity_type_ids"])
+            else:
+                all_typed = False
+            if m.get("hours_outside"):
+                start, end = m["hours_outside"]
+                conds.append(or_(Log.hour < start, Log.hour > end))
+            expr = func.sum(case((and_(*conds), 1), else_=0)) if conds else func.count(Log.id)
+            sums.append(expr.label(m["key"]))
+            having.append(expr >= m["threshold"])
+
+        q = self.db.query(*cols, *sums).filter(Log.ts >= cutoff)
+        if all_typed and type_ids:
+            q = q.filter(Log.activity_type_id.in_(sorted(type_ids)))
+        q = q.group_by(*cols).having(or_(*having))
+
+        n = len(cols)
+        keys = [m["key"] for m in metrics]
+        return [(tuple(row[:n]), {k: int(v or 0) for k, v in zip(keys, row[n:])}) for row in q.all()]
+
+    def recent_logins(self, since_hours: int = 48, max_per_user: int = 500,
+                      activity_code: str = "login_success") -> List[Tuple[int, datetime, str]]:
         cutoff = datetime.now(timezone.utc) - timedelta(hours=since_hours)
-        at_id = self.resolve_activity_type_id("login_success")
+        at_id = self.resolve_activity_type_id(activity_code)
         q = (
             self.db.query(Log.user_id, Log.ts, Log.source_ip)
             .filter(and_(Log.activity_type_id == at_id, Log.ts >= cutoff))
@@ -76,8 +112,26 @@ class LogRepo(ILogRepo):
                 per[uid] = c + 1
         return out
 
-    def feature_window(self, hours: int = 24) -> Dict[int, Dict]:
-        cutoff = datetime.now(timezone.utc) - timedelta(hours=hours)
+    def active_user_ids(self, hours: int = 24, end: datetime | None = None) -> List[int]:
+        end = end or datetime.now(timezone.utc)
+        cutoff = end - timedelta(hours=hours)
+        q = (
+            self.db.query(Log.user_id)
+            .filter(Log.ts >= cutoff, Log.ts < end)
+            .distinct()
+            .order_by(Log.user_id.asc())
+        )
+        return [int(uid) for (uid,) in q.all()]
+
+    def feature_window(self, hours: int = 24, user_id_range: Tuple[int, int] | None = None,
+                       end: datetime | None = None) -> Dict[int, Dict]:
+        """Per-user features over [end - hours, end); `end` defaults to now."""
+        cutoff = (end or datetime.now(timezone.utc)) - timedelta(hours=hours)
+        scope = [Log.ts >= cutoff]
+        if end is not None:
+            scope.append(Log.ts < end)
+        if user_id_range:
+            scope.append(Log.user_id.between(*user_id_range))
         at_login_s = self.resolve_activity_type_id("login_success")
         at_login_f = self.resolve_activity_type_id("login_failed")
 
@@ -94,7 +148,7 @@ class LogRepo(ILogRepo):
                 func.sum(login_f_expr).label("login_failed_count"),
                 func.count(Log.id).label("total_events"),
             )
-            .filter(Log.ts >= cutoff)
+            .filter(*scope)
             .group_by(Log.user_id)
         )
         for uid, succ, fail, total in q_counts.all():
@@ -107,7 +161,7 @@ class LogRepo(ILogRepo):
 
         q_ips = (
             self.db.query(Log.user_id, func.count(func.distinct(Log.source_ip)).label("unique_ips_24h"))
-            .filter(and_(Log.ts >= cutoff, Log.source_ip.isnot(None)))
+            .filter(*scope, Log.source_ip.isnot(None))
             .group_by(Log.user_id)
         )
         for uid, u in q_ips.all():
@@ -116,7 +170,7 @@ class LogRepo(ILogRepo):
 
         q_after = (
             self.db.query(Log.user_id, func.count(Log.id).label("after_hours_count"))
-            .filter(and_(Log.ts >= cutoff, or_(Log.hour < 8, Log.hour > 18)))
+            .filter(*scope, or_(Log.hour < 8, Log.hour > 18))
             .group_by(Log.user_id)
         )
         for uid, c in q_after.all():
@@ -125,7 +179,7 @@ class LogRepo(ILogRepo):
 
         q_last = (
             self.db.query(Log.user_id, func.max(Log.hour))
-            .filter(and_(Log.ts >= cutoff, Log.activity_type_id == at_login_s))
+            .filter(*scope, Log.activity_type_id == at_login_s)
             .group_by(Log.user_id)
         )
         for uid, h in q_last.all():
@@ -138,3 +192,24 @@ class LogRepo(ILogRepo):
             v.setdefault("last_login_hour", 0)
 
         return base
+
+    # -------- export --------
+    EXPORT_COLUMNS = ["id", "uid", "ts", "activity_type", "source_ip", "hour", "params"]
+
+    def export_query(self, uid: str | None = None, activity_type: str | None = None,
+                     since: datetime | None = None, until: datetime | None = None) -> Select:
+        q = (
+            select(Log.id, User.uid, Log.ts, ActivityType.code, Log.source_ip, Log.hour, Log.params_json)
+            .join(User, Log.user_id == User.id)
+            .join(ActivityType, Log.activity_type_id == ActivityType.id)
+            .order_by(Log.ts)
+        )
+        if uid:
+            q = q.where(User.uid == uid)
+        if activity_type:
+            q = q.where(ActivityType.code == activity_type)
+        if since:
+            q = q.where(Log.ts >= since)
+        if until:
+            q = q.where(Log.ts < until)
+        return q
@@ -0,0 +1,43 @@
+from typing import Dict, Iterable, Tuple
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.domain.repositories.base import INoveltyRepo
+from app.infra.db.models import UserNovelty
+
+# (user_id, attr) -> (bloom bytes, n_items, first_seen_at)
+NoveltyRows = Dict[Tuple[int, str], Tuple[bytes, int, datetime]]
+
+class NoveltyRepo(INoveltyRepo):
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_many(self, user_ids: Iterable[int], for_update: bool = False) -> NoveltyRows:
+        ids = sorted(set(int(u) for u in user_ids))
+        if not ids:
+            return {}
+        q = select(UserNovelty).where(UserNovelty.user_id.in_(ids))
+        if for_update:
+            q = q.order_by(UserNovelty.user_id, UserNovelty.attr).with_for_update()
+        return {
+            (r.user_id, r.attr): (bytes(r.bloom), r.n_items, r.first_seen_at)
+            for r in self.db.execute(q).scalars()
+        }
+
+    def save_many(self, rows: NoveltyRows) -> int:
+        values = [
+            {"user_id": u, "attr": a, "bloom": b, "n_items": n, "first_seen_at": f}
+            for (u, a), (b, n, f) in rows.items()
+        ]
+        for i in range(0, len(values), 5000):
+            stmt = pg_insert(UserNovelty).values(values[i:i + 5000])
+            self.db.execute(stmt.on_conflict_do_update(
+                index_elements=["user_id", "attr"],
+                # first_seen_at changes when a saturated filter is started over
+                set_={"bloom": stmt.excluded.bloom, "n_items": stmt.excluded.n_items,
+                      "first_seen_at": stmt.excluded.first_seen_at},
+            ))
+        return len(values)
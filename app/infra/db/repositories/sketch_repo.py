@@ -0,0 +1,56 @@
+from typing import Dict, Iterable, List, Tuple
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+from sqlalchemy import select, delete, tuple_, and_, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.domain.repositories.base import ISketchRepo
+from app.infra.db.models import UserSketch
+
+SketchKey = Tuple[int, str, datetime, int]      # user_id, attr, bucket_start, span_hours
+
+class SketchRepo(ISketchRepo):
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_many(self, keys: Iterable[SketchKey], for_update: bool = False) -> Dict[SketchKey, bytes]:
+        keys = sorted(set(keys))
+        if not keys:
+            return {}
+        cols = (UserSketch.user_id, UserSketch.attr, UserSketch.bucket_start, UserSketch.span_hours)
+        q = select(*cols, UserSketch.sketch).where(tuple_(*cols).in_(keys))
+        if for_update:
+            q = q.order_by(*cols).with_for_update()
+        return {(int(u), a, b, int(s)): bytes(sk) for u, a, b, s, sk in self.db.execute(q)}
+
+    def save_many(self, sketches: Dict[SketchKey, bytes]) -> int:
+        rows = [
+            {"user_id": u, "attr": a, "bucket_start": b, "span_hours": s, "sketch": sk}
+            for (u, a, b, s), sk in sketches.items()
+        ]
+        for i in range(0, len(rows), 5000):
+            stmt = pg_insert(UserSketch).values(rows[i:i + 5000])
+            self.db.execute(stmt.on_conflict_do_update(
+                index_elements=["user_id", "attr", "bucket_start", "span_hours"],
+                set_={"sketch": stmt.excluded.sketch},
+            ))
+        return len(rows)
+
+    def in_ranges(self, attr: str, ranges: List[Tuple[int, datetime, datetime]],
+                  user_id_range: Tuple[int, int] | None = None) -> List[Tuple[int, datetime, int, bytes]]:
+        """(user_id, bucket_start, span_hours, sketch) for buckets of span s starting in [lo, hi)."""
+        if not ranges:
+            return []
+        q = select(UserSketch.user_id, UserSketch.bucket_start, UserSketch.span_hours, UserSketch.sketch).where(
+            UserSketch.attr == attr,
+            or_(*[and_(UserSketch.span_hours == s, UserSketch.bucket_start >= lo, UserSketch.bucket_start < hi)
+                  for s, lo, hi in ranges]),
+        )
+        if user_id_range is not None:
+            q = q.where(UserSketch.user_id.between(*user_id_range))
+        return [(int(u), b, int(s), bytes(sk)) for u, b, s, sk in self.db.execute(q)]
+
+    def prune(self, before: datetime) -> int:
+        res = self.db.execute(delete(UserSketch).where(UserSketch.bucket_start < before))
+        return res.rowcount or 0
@@ -1,12 +1,52 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import select, update, func, text, case, or_, tuple_
+from app.core.config import settings
 from app.domain.repositories.base import IUserRepo
 from app.domain.entities.user import UserEntity
-from app.infra.db.models import User, Role
+from app.infra.db.models import User, Role, Log, Anomaly, ActivityType
+from app.infra.db.lookup_cache import lookup_cache
+from app.infra.cache.response_cache import mark_changed
+
+# status shown in the users list, derived from risk_score (highest first)
+RISK_STATUSES = (("high_risk", 80.0), ("investigating", 50.0))
+NORMAL_STATUS = "normal"
+
+def _status_expr():
+    return case(*[(User.risk_score >= lo, name) for name, lo in RISK_STATUSES], else_=NORMAL_STATUS)
+
+def risk_status(risk: float) -> str:
+    for name, lo in RISK_STATUSES:
+        if (risk or 0) >= lo:
+            return name
+    return NORMAL_STATUS
+
+def _like_escape(q: str) -> str:
+    return q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+HIGH_RISK = dict(RISK_STATUSES)["high_risk"]
 
 class UserRepo(IUserRepo):
     def __init__(self, db: Session):
         self.db = db
+        # role_id -> [users, risk_sum, high_risk_users] changes not yet applied to group_risk
+        self.group_deltas: Dict[Optional[int], List[float]] = {}
+
+    def _group_delta(self, role_id: Optional[int], users: int, old: float, new: float) -> None:
+        d = self.group_deltas.setdefault(role_id, [0, 0.0, 0])
+        d[0] += users
+        d[1] += (new or 0) - (old or 0)
+        d[2] += ((new or 0) >= HIGH_RISK) - ((old or 0) >= HIGH_RISK)
+
+    def pop_group_deltas(self) -> Dict[Optional[int], List[float]]:
+        out, self.group_deltas = self.group_deltas, {}
+        return out
+
+    def _lock_risk(self, ids: List[int]) -> Dict[int, Tuple[Optional[int], float]]:
+        # row locks in id order: the scores read here are the ones the UPDATE replaces
+        q = select(User.id, User.role_id, User.risk_score).where(User.id.in_(ids)).order_by(User.id).with_for_update()
+        return {uid: (role_id, risk or 0.0) for uid, role_id, risk in self.db.execute(q)}
 
     def get_by_id(self, id: int) -> UserEntity | None:
         u = self.db.get(User, id)
@@ -25,9 +65,11 @@ class UserRepo(IUserRepo):
                           created_at=u.created_at)
 
     def add(self, e: UserEntity) -> UserEntity:
-        role = self.db.execute(select(Role).where(Role.code == (e.role or "employee"))).scalar_one_or_none()
-        u = User(uid=e.uid, username=e.username, email=e.email, role=role)
+        role_id = lookup_cache.id_for(self.db, Role, e.role or "employee")
+        u = User(uid=e.uid, username=e.username, email=e.email, role_id=role_id)
         self.db.add(u); self.db.flush()
+        self._group_delta(role_id, 1, 0.0, 0.0)
+        mark_changed(self.db)
         e.id = u.id
         return e
 
@@ -40,11 +82,73 @@ class UserRepo(IUserRepo):
         })
 
     def bump_user_risk(self, user_id: int, risk: float):
-        u = self.db.get(User, user_id)
-        if not u: return
-        if risk > (u.risk_score or 0):
-            u.risk_score = risk
-        u.anomaly_count = (u.anomaly_count or 0) + 1
+        old = self._lock_risk([user_id])
+        new = self.db.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(
+                risk_score=func.greatest(func.coalesce(User.risk_score, 0), risk),
+                anomaly_count=func.coalesce(User.anomaly_count, 0) + 1,
+            )
+            .returning(User.risk_score)
+        ).scalar()
+        if user_id in old:
+            role_id, before = old[user_id]
+            self._group_delta(role_id, 0, before, new)
+
+    def refresh_risk(self, user_ids: Optional[Iterable[int]] = None,
+                     half_life_hours: Optional[float] = None) -> int:
+        """
+        Recompute risk_score (max open-anomaly risk, optionally time-decayed) and
+        anomaly_count (open anomalies) in one set-based UPDATE.
+        `user_ids=None` refreshes every user that has open anomalies or a stale score.
+        Changes to given users are queued for group_risk (`pop_group_deltas`); after
+        `user_ids=None` recompute it with AnalyticsRepo.refresh_group_risk().
+        """
+        if half_life_hours is None:
+            half_life_hours = settings.RISK_HALF_LIFE_HOURS
+        params = {}
+        old: Dict[int, Tuple[Optional[int], float]] = {}
+        if half_life_hours and half_life_hours > 0:
+            risk_expr = ("a.risk * power(0.5, GREATEST(0, EXTRACT(EPOCH FROM (now() - a.detected_at)))"
+                         " / 3600.0 / :half_life)")
+            params["half_life"] = float(half_life_hours)
+        else:
+            risk_expr = "a.risk"
+
+        if user_ids is None:
+            scope = ("u2.risk_score > 0 OR u2.anomaly_count > 0 OR EXISTS "
+                     "(SELECT 1 FROM anomalies x WHERE x.user_id = u2.id AND x.status = 'open')")
+        else:
+            ids = sorted({int(i) for i in user_ids})
+            if not ids:
+                return 0
+            scope = "u2.id = ANY(:ids)"
+            params["ids"] = ids
+            old = self._lock_risk(ids)
+
+        res = self.db.execute(text(f"""
+            UPDATE users u
+               SET risk_score = agg.max_risk,
+                   anomaly_count = agg.cnt
+              FROM (SELECT u2.id AS user_id,
+                           COALESCE(round(CAST(max({risk_expr}) AS numeric), 2), 0) AS max_risk,
+                           count(a.id) AS cnt
+                      FROM users u2
+                      LEFT JOIN anomalies a ON a.user_id = u2.id AND a.status = 'open'
+                     WHERE {scope}
+                     GROUP BY u2.id) agg
+             WHERE u.id = agg.user_id
+               AND (u.risk_score IS DISTINCT FROM agg.max_risk OR u.anomaly_count IS DISTINCT FROM agg.cnt)
+            RETURNING u.id, u.risk_score
+        """), params).all()
+        if user_ids is not None:
+            for uid, risk in res:
+                role_id, before = old[uid]
+                self._group_delta(role_id, 0, before, risk)
+        if res:
+            mark_changed(self.db)
+        return len(res)
 
     def top_by_risk(self, limit:int=100, min_risk:float=0):
         rows = (self.db.query(User)
@@ -60,3 +164,101 @@ class UserRepo(IUserRepo):
                 created_at=u.created_at
             ))
         return out
+
+    def role_codes(self, user_ids: Iterable[int]) -> Dict[int, str]:
+        """user id -> role code ("employee" when unset), one range scan over the ids' span."""
+        ids = list(user_ids)
+        if not ids:
+            return {}
+        q = (
+            select(User.id, Role.code)
+            .outerjoin(Role, Role.id == User.role_id)
+            .where(User.id.between(min(ids), max(ids)))
+        )
+        return {int(uid): code or "employee" for uid, code in self.db.execute(q)}
+
+    # -------- users list --------
+    def _list_filters(self, status: str | None, role: str | None, search: str | None) -> list:
+        conds = []
+        if status:
+            bounds = [lo for _, lo in RISK_STATUSES]
+            if status == NORMAL_STATUS:
+                conds.append(User.risk_score < min(bounds))
+            else:
+                names = [n for n, _ in RISK_STATUSES]
+                i = names.index(status)
+                conds.append(User.risk_score >= bounds[i])
+                if i > 0:
+                    conds.append(User.risk_score < bounds[i - 1])
+        if role:
+            role_ids = select(Role.id).where(or_(Role.code == role, func.lower(Role.name) == role.lower()))
+            cond = User.role_id.in_(role_ids)
+            conds.append(or_(cond, User.role_id.is_(None)) if role == "employee" else cond)
+        if search:
+            pat = f"%{_like_escape(search)}%"
+            conds.append(or_(User.username.ilike(pat), User.email.ilike(pat), User.uid.ilike(pat)))
+        return conds
+
+    def list_page(self, status: str | None = None, role: str | None = None, search: str | None = None,
+                  limit: int = 10, after: Tuple[float, int] | None = None, offset: int = 0) -> List[Dict]:
+        """
+        One page ordered by (risk_score desc, id desc). `after` is the keyset
+        cursor (risk_score, id) of the previous page's last row; without it
+        `offset` is used.
+        """
+        q = (
+            select(User.id, User.uid, User.username, User.email, User.risk_score, Role.code, Role.name)
+            .outerjoin(Role, Role.id == User.role_id)
+            .where(*self._list_filters(status, role, search))
+            .order_by(User.risk_score.desc(), User.id.desc())
+            .limit(limit)
+        )
+        if after is not None:
+            q = q.where(tuple_(User.risk_score, User.id) < tuple_(*after))
+        elif offset:
+            q = q.offset(offset)
+        return [
+            {"id": i, "uid": uid, "username": un, "email": em, "risk_score": float(r or 0),
+             "status": risk_status(r), "role_code": rc or "employee", "role_name": rn or "Employee"}
+            for i, uid, un, em, r, rc, rn in self.db.execute(q)
+        ]
+
+    def count_filtered(self, status: str | None = None, role: str | None = None, search: str | None = None) -> int:
+        q = select(func.count()).select_from(User).where(*self._list_filters(status, role, search))
+        return int(self.db.execute(q).scalar() or 0)
+
+    def status_counts(self) -> Dict[str, int]:
+        st = _status_expr().label("status")
+        rows = self.db.execute(select(st, func.count()).group_by(st)).all()
+        out = {name: 0 for name in (NORMAL_STATUS, *[n for n, _ in reversed(RISK_STATUSES)])}
+        out.update({s: int(c) for s, c in rows})
+        return out
+
+    def page_activity(self, user_ids: List[int]) -> Dict[int, Dict]:
+        """Last successful login and anomaly counts (today / last 7 days) for one page of users."""
+        out: Dict[int, Dict] = {u: {"last_login": None, "last_ip": None, "today": 0, "week": 0} for u in user_ids}
+        if not user_ids:
+            return out
+        login_id = lookup_cache.id_for(self.db, ActivityType, "login_success")
+        q_login = (
+            select(Log.user_id, Log.ts, Log.source_ip)
+            .distinct(Log.user_id)
+            .where(Log.user_id.in_(user_ids), Log.activity_type_id == login_id)
+            .order_by(Log.user_id, Log.ts.desc())
+        )
+        for uid, ts, ip in self.db.execute(q_login):
+            out[uid]["last_login"], out[uid]["last_ip"] = ts, ip
+
+        now = datetime.now(timezone.utc)
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        week = now - timedelta(days=7)
+        q_anom = (
+            select(Anomaly.user_id,
+                   func.count().filter(Anomaly.detected_at >= today),
+                   func.count())
+            .where(Anomaly.user_id.in_(user_ids), Anomaly.detected_at >= week)
+            .group_by(Anomaly.user_id)
+        )
+        for uid, t, w in self.db.execute(q_anom):
+            out[uid]["today"], out[uid]["week"] = int(t), int(w)
+        return out
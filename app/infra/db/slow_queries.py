@@ -0,0 +1,206 @@
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_REPO_PREFIX = "app.infra.db.repositories."
+_SKIP = "slowq_skip"
+_MAX_TEXT = 4000
+# reads that lock rows, take advisory locks or have side effects: EXPLAIN ANALYZE on a second
+# connection would wait on the original transaction's locks and then take them itself
+_UNSAFE_READ = re.compile(
+    r"\bFOR\s+(?:NO\s+KEY\s+)?UPDATE\b|\bFOR\s+(?:KEY\s+)?SHARE\b"
+    r"|\bpg_(?:try_)?advisory|\bpg_notify\b|\bnextval\b|\bsetval\b",
+    re.IGNORECASE,
+)
+# data-modifying statements inside a WITH
+_WRITE = re.compile(r"\b(?:INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+
+
+def _caller_tag() -> str:
+    """
+    `Class.method` of the innermost repository frame on the stack, else the
+    innermost app frame outside this module (routers / services issuing SQL).
+    Only called for statements over the threshold.
+    """
+    f = sys._getframe(2)
+    fallback = None
+    while f is not None:
+        mod = f.f_globals.get("__name__", "")
+        if mod.startswith(_REPO_PREFIX):
+            owner = f.f_locals.get("self")
+            name = type(owner).__name__ if owner is not None else mod[len(_REPO_PREFIX):]
+            return f"{name}.{f.f_code.co_name}"
+        if fallback is None and mod.startswith("app.") and mod != __name__ and not mod.startswith("app.infra.metrics"):
+            fallback = f"{mod.rsplit('.', 1)[-1]}.{f.f_code.co_name}"
+        f = f.f_back
+    return fallback or "unknown"
+
+
+def _short(value, limit: int = _MAX_TEXT) -> str:
+    s = value if isinstance(value, str) else repr(value)
+    return s if len(s) <= limit else s[:limit] + f"... ({len(s)} chars)"
+
+
+class SlowQueryRecorder:
+    """
+    Records statements slower than `threshold_ms` into a ring buffer of
+    `capacity` entries, tagged with the repository method that issued them.
+    A sample (`explain_rate`) of slow read statements is re-run with
+    EXPLAIN (ANALYZE, BUFFERS) by one background thread on its own connection
+    (rolled back, under `explain_timeout_ms`); while it is busy further
+    samples are skipped, so the request path never waits for a plan. Reads
+    that lock (FOR UPDATE/SHARE, advisory locks) or write (data-modifying
+    CTEs) only get a plain EXPLAIN, which plans without executing.
+    """
+
+    def __init__(self, engine: Engine, threshold_ms: float, explain_rate: float = 0.1,
+                 capacity: int = 200, explain_timeout_ms: int = 30000):
+        self.engine = engine
+        self.threshold = threshold_ms / 1000.0
+        self.explain_rate = explain_rate
+        self.explain_timeout_ms = int(explain_timeout_ms)
+        self._entries: deque = deque(maxlen=capacity)
+        self._by_tag: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._explains: queue.Queue = queue.Queue(maxsize=1)
+        self._worker: Optional[threading.Thread] = None
+        self.recorded = 0
+        self.explained = 0
+        self.explain_skipped = 0
+
+    # -------- engine hooks --------
+    def install(self) -> None:
+        event.listen(self.engine, "before_cursor_execute", self._before)
+        event.listen(self.engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info["slowq_t0"] = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        t0 = conn.info.pop("slowq_t0", None)
+        if t0 is None:
+            return
+        elapsed = time.perf_counter() - t0
+        if elapsed < self.threshold or conn.info.get(_SKIP):
+            return
+        tag = _caller_tag()
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "tag": tag,
+            "ms": round(elapsed * 1000, 2),
+            "rows": cursor.rowcount,
+            "statement": _short(statement),
+            "parameters": _short(parameters, 1000) if not executemany else f"executemany ({len(parameters)} sets)",
+            "plan": None,
+        }
+        with self._lock:
+            self._entries.append(entry)
+            agg = self._by_tag.setdefault(tag, [0, 0.0, 0.0])
+            agg[0] += 1
+            agg[1] += elapsed
+            agg[2] = max(agg[2], elapsed)
+            self.recorded += 1
+        mode = None if executemany else self._explain_mode(statement)
+        if mode and random.random() < self.explain_rate:
+            self._queue_explain(entry, statement, parameters, mode)
+
+    # -------- EXPLAIN --------
+    @staticmethod
+    def _explain_mode(statement: str) -> Optional[str]:
+        """
+        "analyze" for plain reads (EXPLAIN ANALYZE executes the statement),
+        "plan" (EXPLAIN without executing) for locking or side-effecting reads
+        and data-modifying CTEs, None for anything else.
+        """
+        head = statement.lstrip()[:6].upper()
+        if not (head.startswith("SELECT") or head.startswith("WITH")):
+            return None
+        if _UNSAFE_READ.search(statement) or (head.startswith("WITH") and _WRITE.search(statement)):
+            return "plan"
+        return "analyze"
+
+    def _queue_explain(self, entry: dict, statement: str, parameters, mode: str) -> None:
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._explain_loop, name="slow-query-explain", daemon=True)
+                    self._worker.start()
+        try:
+            self._explains.put_nowait((entry, statement, parameters, mode))
+        except queue.Full:
+            self.explain_skipped += 1
+
+    def _explain_loop(self) -> None:
+        while True:
+            entry, statement, parameters, mode = self._explains.get()
+            try:
+                entry["plan"] = self._explain(statement, parameters, mode)
+                entry["plan_analyzed"] = mode == "analyze"
+                self.explained += 1
+            except Exception as e:
+                entry["plan"] = {"error": str(e)[:300]}
+
+    def _explain(self, statement: str, parameters, mode: str):
+        with self.engine.connect() as conn:
+            conn.info[_SKIP] = True
+            try:
+                conn.exec_driver_sql(f"SET LOCAL statement_timeout = {self.explain_timeout_ms}")
+                options = "ANALYZE, BUFFERS, FORMAT JSON" if mode == "analyze" else "FORMAT JSON"
+                plan = conn.exec_driver_sql(f"EXPLAIN ({options}) " + statement,
+                                            parameters if parameters else ()).scalar()
+            finally:
+                conn.rollback()
+                conn.info.pop(_SKIP, None)
+        return plan
+
+    # -------- reads --------
+    def entries(self, tag: Optional[str] = None, limit: int = 50) -> List[dict]:
+        with self._lock:
+            items = [e for e in reversed(self._entries) if tag is None or e["tag"] == tag]
+        return items[:limit]
+
+    def summary(self) -> dict:
+        with self._lock:
+            by_tag = {
+                t: {"count": n, "total_ms": round(total * 1000, 1), "max_ms": round(mx * 1000, 1)}
+                for t, (n, total, mx) in sorted(self._by_tag.items(), key=lambda kv: -kv[1][1])
+            }
+            return {
+                "threshold_ms": round(self.threshold * 1000, 1),
+                "explain_rate": self.explain_rate,
+                "recorded": self.recorded,
+                "buffered": len(self._entries),
+                "explained": self.explained,
+                "explain_skipped": self.explain_skipped,
+                "by_tag": by_tag,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_tag.clear()
+
+
+_RECORDER: Optional[SlowQueryRecorder] = None
+
+
+def install_slow_query_recorder(engine: Engine, threshold_ms: float, **kwargs) -> Optional[SlowQueryRecorder]:
+    global _RECORDER
+    if threshold_ms <= 0:
+        return None
+    _RECORDER = SlowQueryRecorder(engine, threshold_ms, **kwargs)
+    _RECORDER.install()
+    return _RECORDER
+
+
+def get_recorder() -> Optional[SlowQueryRecorder]:
+    return _RECORDER
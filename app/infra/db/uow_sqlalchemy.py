@@ -1,9 +1,17 @@
 from contextlib import AbstractContextManager
 from sqlalchemy.orm import Session
 from app.core.uow import IUnitOfWork
+from app.infra.cache.response_cache import DIRTY_FLAG, bump_if_changed
+from app.infra.feed import anomaly_feed
+from app.infra.db.profiler import profile_session
 from app.infra.db.repositories.user_repo import UserRepo
 from app.infra.db.repositories.log_repo import LogRepo
 from app.infra.db.repositories.anomaly_repo import AnomalyRepo
+from app.infra.db.repositories.feature_repo import FeatureStoreRepo
+from app.infra.db.repositories.baseline_repo import BaselineRepo
+from app.infra.db.repositories.sketch_repo import SketchRepo
+from app.infra.db.repositories.novelty_repo import NoveltyRepo
+from app.infra.db.repositories.analytics_repo import AnalyticsRepo
 
 class SQLAlchemyUoW(IUnitOfWork, AbstractContextManager):
     def __init__(self, session: Session):
@@ -11,11 +19,41 @@ class SQLAlchemyUoW(IUnitOfWork, AbstractContextManager):
         self.users = UserRepo(session)
         self.logs = LogRepo(session)
         self.anomalies = AnomalyRepo(session)
+        self.features = FeatureStoreRepo(session)
+        self.baselines = BaselineRepo(session)
+        self.sketches = SketchRepo(session)
+        self.novelty = NoveltyRepo(session)
+        self.analytics = AnalyticsRepo(session)
+        self._on_commit = []
 
     def __exit__(self, exc_type, exc, tb):
         if exc: self.rollback()
         else: self.commit()
         self._session.close()
 
-    def commit(self): self._session.commit()
-    def rollback(self): self._session.rollback()
+    def commit(self):
+        anomaly_feed.before_commit(self._session)
+        self._session.commit()
+        # invalidate cached read responses once the writes are visible
+        bump_if_changed(self._session)
+        anomaly_feed.after_commit(self._session)
+        callbacks, self._on_commit = self._on_commit, []
+        for fn in callbacks:
+            try:
+                fn()
+            except Exception as e:
+                print("Commit hook error:", e)
+
+    def rollback(self):
+        self._session.rollback()
+        self._session.info.pop(DIRTY_FLAG, None)
+        anomaly_feed.discard(self._session)
+        self._on_commit = []
+
+    def on_commit(self, fn):
+        self._on_commit.append(fn)
+
+    def detached(self):
+        session = Session(bind=self._session.get_bind(), autoflush=False)
+        profile_session(session)
+        return SQLAlchemyUoW(session)
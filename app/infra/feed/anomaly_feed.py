@@ -0,0 +1,160 @@
+import asyncio
+import json
+import select
+import threading
+from collections import Counter
+from typing import Callable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.infra.feed.broker import FeedBroker
+
+# session.info key for events staged by repository writes; the UoW publishes them on commit
+PENDING_EVENTS = "feed_events"
+CHANNEL = "ueba_anomaly_feed"
+# NOTIFY payloads must stay under 8000 bytes
+_MAX_PAYLOAD = 7000
+
+_BROKER = FeedBroker(settings.FEED_QUEUE_SIZE, settings.FEED_MAX_CLIENTS)
+_LISTENER: Optional[threading.Thread] = None
+_STOP = threading.Event()
+
+
+def get_broker() -> FeedBroker:
+    return _BROKER
+
+
+def _enabled() -> bool:
+    return settings.FEED_BACKEND in ("memory", "pg")
+
+
+class PendingFeed:
+    """
+    Events staged by one transaction. Past FEED_MAX_EVENTS_PER_COMMIT only
+    per-kind / per-type counts are kept and the commit publishes one summary
+    event, so a chunked model run over the whole population holds O(1) here.
+    """
+    __slots__ = ("limit", "events", "total", "kinds", "types")
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.events: Optional[List[dict]] = []
+        self.total = 0
+        self.kinds: Counter = Counter()
+        self.types: Counter = Counter()
+
+    def add(self, kind: str, type_code: Optional[str], build: Callable[[], dict]) -> None:
+        self.total += 1
+        self.kinds[kind] += 1
+        if type_code:
+            self.types[type_code] += 1
+        if self.events is not None:
+            if self.total <= self.limit:
+                self.events.append(build())
+            else:
+                self.events = None
+
+    def drain(self) -> List[dict]:
+        if self.events is not None:
+            return self.events
+        # a large commit (model run, big upload) becomes one summary event
+        return [{"event": "bulk", "created": self.kinds.get("created", 0), "updated": self.kinds.get("updated", 0),
+                 "types": dict(self.types)}]
+
+
+def queue_event(db: Session, kind: str, type_code: Optional[str], build: Callable[[], dict]) -> None:
+    """Stage an event for the commit; `build` is only called while events are kept individually."""
+    if _enabled():
+        pending = db.info.get(PENDING_EVENTS)
+        if pending is None:
+            pending = db.info[PENDING_EVENTS] = PendingFeed(settings.FEED_MAX_EVENTS_PER_COMMIT)
+        pending.add(kind, type_code, build)
+
+
+def _payloads(events: List[dict]) -> List[str]:
+    out, batch, size = [], [], 2
+    for e in events:
+        s = json.dumps(e, default=str, separators=(",", ":"))
+        if batch and size + len(s) + 1 > _MAX_PAYLOAD:
+            out.append("[" + ",".join(batch) + "]")
+            batch, size = [], 2
+        batch.append(s)
+        size += len(s) + 1
+    if batch:
+        out.append("[" + ",".join(batch) + "]")
+    return out
+
+
+def before_commit(db: Session) -> None:
+    """pg backend: NOTIFY inside the transaction, so listeners only hear committed writes."""
+    if settings.FEED_BACKEND != "pg":
+        return
+    pending = db.info.pop(PENDING_EVENTS, None)
+    if pending is None or not pending.total:
+        return
+    for payload in _payloads(pending.drain()):
+        db.execute(text("SELECT pg_notify(:ch, :payload)"), {"ch": CHANNEL, "payload": payload})
+
+
+def after_commit(db: Session) -> None:
+    """memory backend: hand the committed events to this worker's broker."""
+    pending = db.info.pop(PENDING_EVENTS, None)
+    if pending is not None and pending.total and settings.FEED_BACKEND == "memory":
+        _BROKER.publish(pending.drain())
+
+
+def discard(db: Session) -> None:
+    db.info.pop(PENDING_EVENTS, None)
+
+
+def _listen(dsn: str) -> None:
+    """One LISTEN connection per worker; reconnects after errors until stopped."""
+    import psycopg2
+    import psycopg2.extensions
+
+    while not _STOP.is_set():
+        conn = None
+        try:
+            conn = psycopg2.connect(dsn)
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            conn.cursor().execute(f"LISTEN {CHANNEL}")
+            while not _STOP.is_set():
+                if select.select([conn], [], [], 5.0) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    note = conn.notifies.pop(0)
+                    try:
+                        _BROKER.publish(json.loads(note.payload))
+                    except ValueError as e:
+                        print("Anomaly feed payload error:", e)
+        except Exception as e:
+            print("Anomaly feed listener error:", e)
+            _STOP.wait(5.0)
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+
+def start_feed(loop: asyncio.AbstractEventLoop, engine) -> None:
+    global _LISTENER
+    if not _enabled():
+        return
+    _BROKER.bind(loop)
+    if settings.FEED_BACKEND == "pg" and _LISTENER is None:
+        _STOP.clear()
+        dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        _LISTENER = threading.Thread(target=_listen, args=(dsn,), name="anomaly-feed-listener", daemon=True)
+        _LISTENER.start()
+
+
+def stop_feed() -> None:
+    global _LISTENER
+    _BROKER.bind(None)
+    _STOP.set()
+    _LISTENER = None
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+
+
+class Subscription:
+    """
+    One connected client: its filters and a bounded queue. The queue is only
+    touched on the event loop; when it is full the oldest event is dropped and
+    counted, so a slow client never holds events (or memory) for the others.
+    """
+
+    def __init__(self, maxsize: int, types: Optional[Set[str]] = None, min_risk: float = 0.0,
+                 user_id: Optional[int] = None):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.types = types or None
+        self.min_risk = min_risk
+        self.user_id = user_id
+        self.dropped = 0
+
+    def matches(self, ev: dict) -> bool:
+        # summary events ("bulk") carry no single type/risk/user and always pass
+        if ev.get("event") == "bulk":
+            return True
+        if self.types and ev.get("type") not in self.types:
+            return False
+        if self.min_risk and (ev.get("risk") or 0.0) < self.min_risk:
+            return False
+        if self.user_id is not None and ev.get("user_id") != self.user_id:
+            return False
+        return True
+
+    def offer(self, ev: dict) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(ev)
+
+    def take_dropped(self) -> int:
+        n, self.dropped = self.dropped, 0
+        return n
+
+
+class FeedBroker:
+    """
+    In-process fan-out of anomaly events to the SSE clients of this worker.
+    `publish` may be called from any thread (request handlers run in the
+    threadpool, the LISTEN loop in its own thread); delivery is scheduled on
+    the event loop the broker was bound to at startup.
+    """
+
+    def __init__(self, queue_size: int, max_clients: int):
+        self.queue_size = queue_size
+        self.max_clients = max_clients
+        self._subs: Set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    def bind(self, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        self._loop = loop
+
+    def subscribe(self, **filters) -> Optional[Subscription]:
+        """None when the worker already serves `max_clients` streams."""
+        with self._lock:
+            if len(self._subs) >= self.max_clients:
+                return None
+            sub = Subscription(self.queue_size, **filters)
+            self._subs.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            self._subs.discard(sub)
+
+    def publish(self, events: Iterable[dict]) -> None:
+        events = list(events)
+        loop = self._loop
+        if not events or loop is None or loop.is_closed():
+            return
+        self.published += len(events)
+        try:
+            loop.call_soon_threadsafe(self._fanout, events)
+        except RuntimeError:
+            # loop closed between the check and the call (shutdown)
+            pass
+
+    def _fanout(self, events: List[dict]) -> None:
+        with self._lock:
+            subs = list(self._subs)
+        for sub in subs:
+            before = sub.dropped
+            for ev in events:
+                if sub.matches(ev):
+                    sub.offer(ev)
+                    self.delivered += 1
+            self.dropped += sub.dropped - before
+
+    def stats(self) -> Dict:
+        with self._lock:
+            clients = len(self._subs)
+        return {
+            "running": self.running,
+            "clients": clients,
+            "max_clients": self.max_clients,
+            "queue_size": self.queue_size,
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
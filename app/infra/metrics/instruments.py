@@ -0,0 +1,94 @@
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from app.infra.metrics.registry import Registry
+
+REGISTRY = Registry()
+
+# -------- HTTP --------
+HTTP_LATENCY = REGISTRY.histogram(
+    "ueba_http_request_duration_seconds",
+    "Time until the response headers are sent, by route template",
+    ("method", "route", "status"),
+)
+
+# -------- DB --------
+DB_POOL_WAIT = REGISTRY.histogram(
+    "ueba_db_pool_checkout_seconds",
+    "Time to get a connection from the pool (waiting for a free one or opening a new one)",
+)
+DB_STATEMENT = REGISTRY.histogram(
+    "ueba_db_statement_duration_seconds",
+    "Cursor execute time by statement type",
+    ("operation",),
+)
+
+# -------- ingest --------
+INGEST_ROWS = REGISTRY.counter("ueba_ingest_rows_total", "Rows written by bulk_add", ("table",))
+INGEST_FLUSH = REGISTRY.histogram("ueba_ingest_flush_duration_seconds", "bulk_add batch write time", ("table",))
+INGEST_UPLOAD = REGISTRY.histogram("ueba_ingest_upload_duration_seconds", "Whole /data/upload-logs request time")
+INGEST_RATE = REGISTRY.gauge("ueba_ingest_last_upload_rows_per_second", "Rows per second of the last upload")
+
+# -------- detection --------
+DETECTION_STAGE = REGISTRY.histogram(
+    "ueba_detection_stage_duration_seconds",
+    "DetectionService stage time (rule:<name>, features, infer:<model>, bulk_add, ...)",
+    ("stage",),
+)
+DETECTION_ANOMALIES = REGISTRY.counter(
+    "ueba_detection_anomalies_total",
+    "Anomalies produced by detection runs (dry runs included), by rule or model",
+    ("source",),
+)
+
+
+@contextmanager
+def timed(histogram, labels: tuple = ()):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - t0, labels)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records checkout time; `recreate()` keeps the class."""
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - t0)
+
+
+def _operation(statement: str) -> str:
+    head = statement.lstrip()[:8].split(None, 1)
+    return head[0].upper() if head else "OTHER"
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Statement timing from cursor events and pool gauges read at scrape time."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["metrics_t0"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        t0 = conn.info.pop("metrics_t0", None)
+        if t0 is not None:
+            DB_STATEMENT.observe(time.perf_counter() - t0, (_operation(statement),))
+
+    def pool_stats():
+        pool = engine.pool
+        if not isinstance(pool, QueuePool):
+            return []
+        return [(("in_use",), pool.checkedout()), (("idle",), pool.checkedin()),
+                (("overflow",), max(0, pool.overflow())), (("size",), pool.size())]
+
+    REGISTRY.gauge("ueba_db_pool_connections", "Pool connections by state", ("state",), fn=pool_stats)
@@ -0,0 +1,110 @@
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.infra.models.catboost_detector import CatBoostDetector, _MODEL_CACHE
+from app.infra.models.ensemble import ModelEnsemble
+
+Chunk = Tuple[np.ndarray, np.ndarray, List[str]]          # user_ids, X, columns
+Scored = Tuple[np.ndarray, Dict[str, Tuple[np.ndarray, np.ndarray]]]   # user_ids, path|ensemble -> (scores, risks)
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_WORKERS = 0
+_POOL_LOCK = threading.Lock()
+
+
+def _init_worker(paths: Sequence[str]) -> None:
+    # each worker process deserializes every model once and keeps it in its own _MODEL_CACHE
+    for p in paths:
+        CatBoostDetector(p).load(warm_up=True)
+
+
+def _score_chunk(models: Sequence[Tuple[str, Tuple[int, int]]], user_ids: np.ndarray, X: np.ndarray,
+                 columns: List[str], combine: bool = False, stage=None) -> Scored:
+    for path, version in models:
+        entry = _MODEL_CACHE.get(path)
+        if entry is None or entry.version != version:
+            CatBoostDetector(path).reload_if_changed()
+    return user_ids, ModelEnsemble([p for p, _ in models]).score(user_ids, X, columns, combine=combine, stage=stage)
+
+
+def _score_chunk_timed(models: Sequence[Tuple[str, Tuple[int, int]]], user_ids: np.ndarray, X: np.ndarray,
+                       columns: List[str], combine: bool = False) -> Tuple[np.ndarray, dict, Dict[str, float]]:
+    """_score_chunk in a pool worker: also returns stage name -> seconds for the parent to record."""
+    timings: Dict[str, float] = {}
+
+    @contextmanager
+    def clock(name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - t0
+
+    user_ids, scored = _score_chunk(models, user_ids, X, columns, combine, stage=clock)
+    return user_ids, scored, timings
+
+
+def get_pool(workers: int, paths: Sequence[str]) -> ProcessPoolExecutor:
+    """Process pool shared across detection runs (spawned, so no forked DB connections/threads)."""
+    global _POOL, _POOL_WORKERS
+    with _POOL_LOCK:
+        if _POOL is None or _POOL_WORKERS != workers:
+            if _POOL is not None:
+                _POOL.shutdown(wait=False)
+            _POOL = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(list(paths),),
+            )
+            _POOL_WORKERS = workers
+        return _POOL
+
+
+def shutdown_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=True)
+            _POOL = None
+
+
+def score_chunks(paths: Sequence[str], chunks: Iterable[Chunk], workers: int = 0, combine: bool = False,
+                 stage=None, record: Optional[Callable[[str, float], None]] = None) -> Iterator[Scored]:
+    """
+    Score feature chunks with every model in `paths` (one ensemble pass per
+    chunk), yielding per-chunk results in chunk order. workers=0 scores
+    in-process; otherwise chunks go to the process pool with at most 2*workers
+    in flight, so only a bounded number of chunks is held in memory at once.
+    In-process, `stage(name)` wraps each model's predict as in ModelEnsemble.score;
+    with a pool, the workers time each predict and `record(name, seconds)` gets
+    those timings as each chunk's result arrives.
+    """
+    models = [(p, CatBoostDetector(p)._entry().version) for p in paths]
+    if workers <= 0:
+        for user_ids, X, columns in chunks:
+            yield _score_chunk(models, user_ids, X, columns, combine, stage=stage)
+        return
+
+    def result(fut: Future) -> Scored:
+        user_ids, scored, timings = fut.result()
+        if record:
+            for name, seconds in timings.items():
+                record(name, seconds)
+        return user_ids, scored
+
+    pool: Executor = get_pool(workers, paths)
+    pending: "deque[Future]" = deque()
+    for user_ids, X, columns in chunks:
+        pending.append(pool.submit(_score_chunk_timed, models, user_ids, X, columns, combine))
+        if len(pending) >= 2 * workers:
+            yield result(pending.popleft())
+    while pending:
+        yield result(pending.popleft())
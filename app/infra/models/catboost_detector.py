@@ -1,9 +1,61 @@
 import os
-from typing import Iterable, Dict, Any, List, Tuple
-import pandas as pd
+import hashlib
+import threading
+from typing import Iterable, Dict, Any, List, Tuple, Sequence
+import numpy as np
 
-# ???: path -> (kind, model, expected_feature_names or None)
-_MODEL_CACHE: dict[str, Tuple[str, object, List[str] | None]] = {}
+class LoadedModel:
+    """One deserialized model plus its file version; replaced as a whole on reload."""
+    __slots__ = ("kind", "model", "expected", "version", "align")
+
+    def __init__(self, kind: str, model: object, expected: List[str] | None, version: Tuple[int, int]):
+        self.kind = kind
+        self.model = model
+        self.expected = expected
+        self.version = version
+        # source columns -> index of each expected column in the source matrix (-1 = missing)
+        self.align: dict[Tuple[str, ...], np.ndarray | None] = {}
+
+# ???: path -> LoadedModel; entries are swapped atomically, never mutated
+_MODEL_CACHE: dict[str, LoadedModel] = {}
+_LOAD_LOCK = threading.Lock()
+# feature-schema id -> ordered column list, referenced from anomaly evidence
+FEATURE_SCHEMAS: dict[str, List[str]] = {}
+
+def file_version(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+def feature_schema_id(columns: Sequence[str]) -> str:
+    sid = hashlib.sha1("\x1f".join(columns).encode()).hexdigest()[:12]
+    if sid not in FEATURE_SCHEMAS:
+        FEATURE_SCHEMAS[sid] = list(columns)
+    return sid
+
+def _frame(X: np.ndarray, columns: Sequence[str]):
+    # pandas only for sklearn pipelines that select columns by name; imported on first use
+    # so API workers that never score a .pkl model don't load it
+    import pandas as pd
+    return pd.DataFrame(X, columns=list(columns))
+
+def rows_to_matrix(rows: Iterable[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """list of per-user dicts -> (user_ids, float matrix, columns); bool -> int, missing/None -> 0"""
+    batch = list(rows)
+    columns: List[str] = []
+    seen = set()
+    for r in batch:
+        if "user_id" not in r:
+            raise RuntimeError("feature rows must include 'user_id'")
+        for k in r:
+            if k != "user_id" and k not in seen:
+                seen.add(k)
+                columns.append(k)
+    user_ids = np.fromiter((int(r["user_id"]) for r in batch), dtype=np.int64, count=len(batch))
+    X = np.zeros((len(batch), len(columns)), dtype=np.float64)
+    for j, c in enumerate(columns):
+        X[:, j] = [float(r.get(c) or 0) for r in batch]
+    np.nan_to_num(X, copy=False)
+    return user_ids, X, columns
 
 class CatBoostDetector:
     name = "model_generic"
@@ -11,9 +63,8 @@ class CatBoostDetector:
     def __init__(self, path: str):
         self.model_path = path
 
-    def load(self):
-        if self.model_path in _MODEL_CACHE:
-            return
+    def _load_entry(self) -> LoadedModel:
+        version = file_version(self.model_path)
         ext = (self.model_path or "").lower()
         if ext.endswith(".cbm"):
             from catboost import CatBoostClassifier
@@ -26,64 +77,118 @@ class CatBoostDetector:
                 expected = list(getattr(m, "feature_names_", None) or []) or None
             except Exception:
                 expected = None
-            _MODEL_CACHE[self.model_path] = ("cb", m, expected)
+            return LoadedModel("cb", m, expected, version)
         elif ext.endswith(".pkl"):
             import joblib
             m = joblib.load(self.model_path)
             # Pipelines ?? ?????? ??????? ?? ???????? ??? ????? expected
-            _MODEL_CACHE[self.model_path] = ("sk", m, None)
+            names = getattr(m, "feature_names_in_", None)
+            if names is None:
+                names = getattr(m, "feature_names_", None)
+            expected = [str(c) for c in names] if names is not None and len(names) else None
+            return LoadedModel("sk", m, expected, version)
         else:
             raise RuntimeError(f"Unsupported model type: {self.model_path}")
 
-    def _align_features(self, X: pd.DataFrame, expected: List[str] | None) -> pd.DataFrame:
-        # ???? ????? bool ??? int ????? NaN
-        for col in X.columns:
-            if X[col].dtype == "bool":
-                X[col] = X[col].astype(int)
-        X = X.fillna(0)
+    def _warm_up(self, entry: LoadedModel) -> None:
+        # first predict pays for lazy native initialisation; do it off the request path
+        cols = entry.expected or []
+        if not cols:
+            return
+        X = np.zeros((1, len(cols)), dtype=np.float64)
+        if entry.kind == "sk":
+            X = _frame(X, cols)
+        entry.model.predict_proba(X)
 
-        if expected:
-            # reindex: ???? ??????? ???????? ???????? ????? ??????? ????? ????? ???????
-            X = X.reindex(columns=expected, fill_value=0)
-        return X
+    def load(self, warm_up: bool = False):
+        if self.model_path in _MODEL_CACHE:
+            return
+        with _LOAD_LOCK:
+            if self.model_path in _MODEL_CACHE:
+                return
+            entry = self._load_entry()
+            if warm_up:
+                self._warm_up(entry)
+            _MODEL_CACHE[self.model_path] = entry
 
-    def infer(self, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        if self.model_path not in _MODEL_CACHE:
-            self.load()
+    def reload_if_changed(self) -> bool:
+        """
+        Load a new version of the model file and swap it in. Inference already
+        running keeps the entry it started with.
+        """
+        current = _MODEL_CACHE.get(self.model_path)
+        if current is None:
+            self.load(warm_up=True)
+            return True
+        if file_version(self.model_path) == current.version:
+            return False
+        entry = self._load_entry()
+        self._warm_up(entry)
+        _MODEL_CACHE[self.model_path] = entry
+        return True
 
-        kind, model, expected = _MODEL_CACHE[self.model_path]
-        batch = list(rows)
-        if not batch:
-            return []
+    def _entry(self) -> LoadedModel:
+        entry = _MODEL_CACHE.get(self.model_path)
+        if entry is None:
+            self.load()
+            entry = _MODEL_CACHE[self.model_path]
+        return entry
 
-        X = pd.DataFrame(batch)
-        if "user_id" not in X.columns:
-            raise RuntimeError("feature rows must include 'user_id'")
+    def model_columns(self, columns: Sequence[str]) -> List[str]:
+        """Columns the model actually sees for a source matrix with `columns`."""
+        expected = self._entry().expected
+        return list(expected) if expected else list(columns)
 
-        user_ids = X["user_id"].tolist()
-        X = X.drop(columns=["user_id"])
-
-        # ?????? ??????? ????? ?????? ??????? (?? ?????)
-        X = self._align_features(X, expected)
-
-        # inference
-        if kind == "cb":
-            probs = model.predict_proba(X)[:, 1]
-        else:  # sklearn pipeline
-            probs = model.predict_proba(X)[:, 1]
-
-        out = []
-        for uid, p in zip(user_ids, probs):
-            p = float(p)
-            risk = round(100 * (0.7 * p + 0.3), 2)
-            out.append({
-                "user_id": int(uid),
-                "score": p,
-                "risk": risk,
-                "confidence": 0.8,
-                "evidence": {
-                    "features_used": list(X.columns),
-                    "model_path": self.model_path
-                }
-            })
+    def _align_matrix(self, entry: LoadedModel, X: np.ndarray, columns: Sequence[str]) -> np.ndarray:
+        key = tuple(columns)
+        if key not in entry.align:
+            if not entry.expected or list(columns) == entry.expected:
+                entry.align[key] = None
+            else:
+                pos = {c: i for i, c in enumerate(columns)}
+                entry.align[key] = np.array([pos.get(c, -1) for c in entry.expected], dtype=np.intp)
+        idx = entry.align[key]
+        if idx is None:
+            return X
+        # ???? ??????? ???????? ???????? ????? ??????? ????? ????? ???????
+        out = np.zeros((X.shape[0], len(idx)), dtype=X.dtype)
+        have = idx >= 0
+        out[:, have] = X[:, idx[have]]
         return out
+
+    def infer_matrix(self, X, user_ids: np.ndarray, columns: Sequence[str] | None = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Score a ready feature matrix (rows aligned with `user_ids`, columns named
+        by `columns`) or a catboost Pool already built in model column order.
+        Returns (user_ids, scores, risks) arrays.
+        """
+        entry = self._entry()
+        if len(user_ids) == 0:
+            empty = np.zeros(0, dtype=np.float64)
+            return np.asarray(user_ids, dtype=np.int64), empty, empty
+
+        if isinstance(X, np.ndarray):
+            if columns is None:
+                raise RuntimeError("columns are required for a matrix input")
+            X = self._align_matrix(entry, X, columns)
+            if entry.kind == "sk":
+                # sklearn pipelines may select columns by name
+                X = _frame(X, entry.expected or columns)
+
+        probs = np.asarray(entry.model.predict_proba(X)[:, 1], dtype=np.float64)
+        risks = np.round(100 * (0.7 * probs + 0.3), 2)
+        return np.asarray(user_ids, dtype=np.int64), probs, risks
+
+    def infer(self, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        user_ids, X, columns = rows_to_matrix(rows)
+        if not len(user_ids):
+            return []
+        uids, probs, risks = self.infer_matrix(X, user_ids, columns)
+        evidence = {
+            "feature_schema": feature_schema_id(self.model_columns(columns)),
+            "model_path": self.model_path,
+        }
+        return [
+            {"user_id": int(u), "score": float(p), "risk": float(r), "confidence": 0.8, "evidence": evidence}
+            for u, p, r in zip(uids, probs, risks)
+        ]
@@ -0,0 +1,89 @@
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.infra.models.catboost_detector import CatBoostDetector, LoadedModel, feature_schema_id
+
+ENSEMBLE_NAME = "model_ensemble"
+
+# (model versions, source columns) -> (layout, source index per layout column, per-model slice)
+_LAYOUT_CACHE: dict = {}
+
+
+def _block(layout: List[str], cols: List[str]) -> slice | None:
+    n = len(cols)
+    for start in range(len(layout) - n + 1):
+        if layout[start:start + n] == cols:
+            return slice(start, start + n)
+    return None
+
+
+def _plan(entries: Sequence[LoadedModel], columns: Sequence[str]):
+    """
+    Lay out one shared matrix in which every model's expected columns form a
+    contiguous block (e.g. insider = ueba columns + extras share a prefix), so
+    each model reads a zero-copy column slice of it.
+    """
+    layout: List[str] = []
+    for e in entries:
+        cols = e.expected or list(columns)
+        if _block(layout, cols) is not None:
+            continue
+        # reuse the longest tail of the layout that prefixes this model's columns
+        overlap = next((k for k in range(min(len(layout), len(cols)), 0, -1) if layout[-k:] == cols[:k]), 0)
+        layout.extend(cols[overlap:])
+    pos = {c: i for i, c in enumerate(columns)}
+    src = np.array([pos.get(c, -1) for c in layout], dtype=np.intp)
+    slices = [_block(layout, e.expected or list(columns)) for e in entries]
+    return layout, src, slices
+
+
+class ModelEnsemble:
+    """
+    Scores several models over one feature matrix in a single pass: the shared
+    matrix is built once and each model reads its aligned column view of it.
+    """
+
+    def __init__(self, paths: Sequence[str]):
+        self.paths = list(paths)
+        self.detectors = [CatBoostDetector(p) for p in self.paths]
+
+    def schema_ids(self, columns: Sequence[str]) -> Dict[str, str]:
+        return {d.model_path: feature_schema_id(d.model_columns(columns)) for d in self.detectors}
+
+    def score(self, user_ids: np.ndarray, X: np.ndarray, columns: Sequence[str], combine: bool = False,
+              stage: Optional[Callable[[str], object]] = None) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """
+        path -> (scores, risks); plus ENSEMBLE_NAME (mean probability) when
+        `combine`. `stage(name)` optionally wraps each model's predict (profiling).
+        """
+        stage = stage or (lambda name: nullcontext())
+        entries = [d._entry() for d in self.detectors]
+        key = (tuple((d.model_path, e.version) for d, e in zip(self.detectors, entries)), tuple(columns))
+        plan = _LAYOUT_CACHE.get(key)
+        if plan is None:
+            plan = _LAYOUT_CACHE[key] = _plan(entries, columns)
+        layout, src, slices = plan
+
+        if len(layout) == len(columns) and np.array_equal(src, np.arange(len(columns))):
+            U = X
+        else:
+            U = np.zeros((X.shape[0], len(layout)), dtype=np.float64)
+            have = src >= 0
+            U[:, have] = X[:, src[have]]
+
+        out: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        probs_all = []
+        for d, e, sl in zip(self.detectors, entries, slices):
+            cols = e.expected or list(columns)
+            view = U[:, sl]
+            with stage(f"infer:{d.model_path}"):
+                _, probs, risks = d.infer_matrix(view, user_ids, cols)
+            out[d.model_path] = (probs, risks)
+            probs_all.append(probs)
+
+        if combine and probs_all:
+            p = np.mean(probs_all, axis=0)
+            out[ENSEMBLE_NAME] = (p, np.round(100 * (0.7 * p + 0.3), 2))
+        return out
@@ -1,6 +1,6 @@
 import os
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, List
 
 @dataclass
 class ModelPath:
@@ -25,3 +25,6 @@ def pick_ueba() -> Optional[ModelPath]:
     if _exists(cbm):
         return ModelPath("model_ueba", cbm, "cbm")
     return None
+
+def all_models() -> List[ModelPath]:
+    return [mp for mp in (pick_ueba(), pick_insider()) if mp]
@@ -0,0 +1,65 @@
+import threading
+from typing import Dict, List, Optional
+
+from app.infra.models.catboost_detector import CatBoostDetector, _MODEL_CACHE
+from app.infra.models.model_registry import all_models
+
+
+def preload_models() -> List[str]:
+    """Load and warm every model the registry can find (worker startup)."""
+    loaded = []
+    for mp in all_models():
+        CatBoostDetector(mp.path).load(warm_up=True)
+        loaded.append(mp.path)
+    return loaded
+
+
+def reload_changed_models() -> List[str]:
+    """Reload models whose file changed (or that appeared) since they were loaded."""
+    return [mp.path for mp in all_models() if CatBoostDetector(mp.path).reload_if_changed()]
+
+
+def model_status() -> List[Dict]:
+    out = []
+    for mp in all_models():
+        entry = _MODEL_CACHE.get(mp.path)
+        out.append({
+            "name": mp.name,
+            "path": mp.path,
+            "loaded": entry is not None,
+            "version": list(entry.version) if entry else None,
+            "features": len(entry.expected or []) if entry else None,
+        })
+    return out
+
+
+class ModelWatcher(threading.Thread):
+    """Polls model files and hot-swaps new versions in the background."""
+
+    def __init__(self, interval_seconds: float):
+        super().__init__(name="model-watcher", daemon=True)
+        self.interval = interval_seconds
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.wait(self.interval):
+            try:
+                reloaded = reload_changed_models()
+                if reloaded:
+                    print("Models reloaded:", reloaded)
+            except Exception as e:
+                print("Model reload error:", e)
+
+    def stop(self):
+        self._halt.set()
+
+
+_WATCHER: Optional[ModelWatcher] = None
+
+def start_model_watcher(interval_seconds: float) -> Optional[ModelWatcher]:
+    global _WATCHER
+    if interval_seconds <= 0 or _WATCHER is not None:
+        return _WATCHER
+    _WATCHER = ModelWatcher(interval_seconds)
+    _WATCHER.start()
+    return _WATCHER
@@ -0,0 +1,145 @@
+import hashlib
+import math
+import struct
+from typing import List
+
+_HEADER = struct.Struct(">HB")      # m in bytes, k
+# scalable format: b"\0\0" (never a valid legacy m), version, layer count; then per layer m bytes, k, count
+_SCALABLE = struct.Struct(">2sBB")
+_LAYER = struct.Struct(">IBI")
+_MAGIC = b"\0\0"
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter with double hashing. `add` reports whether the
+    value was (probably) new; false positives only ever make a value look
+    already seen, never the other way round.
+    """
+    __slots__ = ("m", "k", "bits")
+
+    def __init__(self, m_bits: int = 2048, k: int = 4, bits: bytearray | None = None):
+        if m_bits % 8:
+            raise ValueError("m_bits must be a multiple of 8")
+        self.m = m_bits
+        self.k = k
+        self.bits = bits if bits is not None else bytearray(m_bits // 8)
+
+    def _positions(self, value: str):
+        d = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(d[:8], "big")
+        h2 = int.from_bytes(d[8:], "big") | 1
+        return [(h1 + i * h2) % self.m for i in range(self.k)]
+
+    def __contains__(self, value: str) -> bool:
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(value))
+
+    def add(self, value: str) -> bool:
+        new = False
+        bits = self.bits
+        for p in self._positions(value):
+            byte, mask = p >> 3, 1 << (p & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                new = True
+        return new
+
+    @classmethod
+    def for_capacity(cls, n: int, fp: float) -> "BloomFilter":
+        """Optimal size for `n` values at false-positive rate `fp`."""
+        m = max(64, math.ceil(-n * math.log(fp) / math.log(2) ** 2))
+        m += -m % 8
+        return cls(m, max(1, round(m / n * math.log(2))))
+
+    def fill_ratio(self) -> float:
+        return sum(bin(b).count("1") for b in self.bits) / self.m
+
+    def fp_rate(self) -> float:
+        """Current false-positive probability from the share of set bits."""
+        return self.fill_ratio() ** self.k
+
+    def estimated_count(self) -> int:
+        fill = self.fill_ratio()
+        if fill >= 1.0:
+            return self.m
+        return round(-self.m / self.k * math.log(1 - fill))
+
+    def to_bytes(self) -> bytes:
+        return _HEADER.pack(self.m // 8, self.k) + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "BloomFilter":
+        size, k = _HEADER.unpack_from(raw)
+        return cls(size * 8, k, bytearray(raw[_HEADER.size:_HEADER.size + size]))
+
+
+class ScalableBloomFilter:
+    """
+    Growing Bloom filter: a chain of BloomFilter layers. The first one is sized
+    for `capacity` values at `fp`; when a layer holds its capacity a new one
+    with twice the capacity and half the false-positive rate is added, so the
+    overall rate stays below 2 * fp however many values a user accumulates.
+    """
+    __slots__ = ("capacity", "fp", "layers", "counts")
+
+    GROWTH = 2
+    TIGHTENING = 0.5
+
+    def __init__(self, capacity: int = 256, fp: float = 0.01):
+        self.capacity = capacity
+        self.fp = fp
+        self.layers: List[BloomFilter] = []
+        self.counts: List[int] = []
+
+    def _layer_capacity(self, i: int) -> int:
+        return self.capacity * self.GROWTH ** i
+
+    def _grow(self) -> None:
+        i = len(self.layers)
+        self.layers.append(BloomFilter.for_capacity(self._layer_capacity(i), self.fp * self.TIGHTENING ** i))
+        self.counts.append(0)
+
+    def __contains__(self, value: str) -> bool:
+        return any(value in layer for layer in self.layers)
+
+    def add(self, value: str) -> bool:
+        if value in self:
+            return False
+        if not self.layers or self.counts[-1] >= self._layer_capacity(len(self.layers) - 1):
+            self._grow()
+        self.layers[-1].add(value)
+        self.counts[-1] += 1
+        return True
+
+    def fp_rate(self) -> float:
+        miss = 1.0
+        for layer in self.layers:
+            miss *= 1 - layer.fp_rate()
+        return 1 - miss
+
+    def to_bytes(self) -> bytes:
+        out = [_SCALABLE.pack(_MAGIC, 1, len(self.layers))]
+        for layer, n in zip(self.layers, self.counts):
+            out.append(_LAYER.pack(layer.m // 8, layer.k, n))
+            out.append(bytes(layer.bits))
+        return b"".join(out)
+
+    @classmethod
+    def from_bytes(cls, raw: bytes, capacity: int = 256, fp: float = 0.01) -> "ScalableBloomFilter":
+        sbf = cls(capacity, fp)
+        if raw[:2] != _MAGIC:
+            # legacy fixed-size filter: becomes the first layer, its count estimated from the fill
+            layer = BloomFilter.from_bytes(raw)
+            sbf.layers.append(layer)
+            sbf.counts.append(max(layer.estimated_count(), capacity))
+            return sbf
+        _, _version, n_layers = _SCALABLE.unpack_from(raw)
+        pos = _SCALABLE.size
+        for _ in range(n_layers):
+            size, k, n = _LAYER.unpack_from(raw, pos)
+            pos += _LAYER.size
+            sbf.layers.append(BloomFilter(size * 8, k, bytearray(raw[pos:pos + size])))
+            sbf.counts.append(n)
+            pos += size
+        return sbf
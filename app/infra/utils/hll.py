@@ -0,0 +1,109 @@
+import hashlib
+import math
+import struct
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+_SPARSE, _DENSE = 0, 1
+_PAIR = struct.Struct(">HB")
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """
+    Mergeable distinct-count sketch (2**p one-byte registers, ~1.04/sqrt(2**p)
+    relative error). Small sketches are kept sparse as (register, rank) pairs
+    and switch to the dense register array once that is no larger, so a
+    user-hour with a handful of values serializes to a few bytes.
+    """
+    __slots__ = ("p", "m", "_sparse", "_dense")
+
+    def __init__(self, p: int = 10):
+        if not 4 <= p <= 16:
+            raise ValueError("p must be between 4 and 16")
+        self.p = p
+        self.m = 1 << p
+        self._sparse: Optional[Dict[int, int]] = {}
+        self._dense: Optional[np.ndarray] = None
+
+    # -------- updates --------
+    def _set(self, idx: int, rank: int) -> None:
+        if self._dense is not None:
+            if rank > self._dense[idx]:
+                self._dense[idx] = rank
+            return
+        if rank > self._sparse.get(idx, 0):
+            self._sparse[idx] = rank
+            if len(self._sparse) * _PAIR.size >= self.m:
+                self._densify()
+
+    def _densify(self) -> None:
+        regs = np.zeros(self.m, dtype=np.uint8)
+        if self._sparse:
+            idx = np.fromiter(self._sparse.keys(), dtype=np.intp, count=len(self._sparse))
+            regs[idx] = np.fromiter(self._sparse.values(), dtype=np.uint8, count=len(self._sparse))
+        self._dense, self._sparse = regs, None
+
+    def add(self, value: str) -> None:
+        h = _hash64(value)
+        bits = 64 - self.p
+        rest = h & ((1 << bits) - 1)
+        self._set(h >> bits, bits - rest.bit_length() + 1)
+
+    def update(self, values: Iterable[str]) -> "HyperLogLog":
+        for v in values:
+            self.add(v)
+        return self
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.p != self.p:
+            raise ValueError("cannot merge sketches with different precision")
+        if other._dense is not None:
+            if self._dense is None:
+                self._densify()
+            np.maximum(self._dense, other._dense, out=self._dense)
+        else:
+            for idx, rank in other._sparse.items():
+                self._set(idx, rank)
+        return self
+
+    # -------- estimate --------
+    def count(self) -> float:
+        m = self.m
+        if self._dense is not None:
+            regs = self._dense
+        else:
+            regs = np.zeros(m, dtype=np.uint8)
+            if self._sparse:
+                regs[list(self._sparse)] = list(self._sparse.values())
+        zeros = int(np.count_nonzero(regs == 0))
+        alpha = 0.7213 / (1 + 1.079 / m)
+        est = alpha * m * m / float(np.sum(np.ldexp(1.0, -regs.astype(np.int32))))
+        if est <= 2.5 * m and zeros:
+            # linear counting is far more accurate for small cardinalities
+            est = m * math.log(m / zeros)
+        return est
+
+    def __len__(self) -> int:
+        return int(round(self.count()))
+
+    # -------- bytes --------
+    def to_bytes(self) -> bytes:
+        if self._dense is not None:
+            return bytes((_DENSE, self.p)) + self._dense.tobytes()
+        return bytes((_SPARSE, self.p)) + b"".join(_PAIR.pack(i, r) for i, r in sorted(self._sparse.items()))
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "HyperLogLog":
+        mode, p = raw[0], raw[1]
+        h = cls(p)
+        body = memoryview(raw)[2:]
+        if mode == _DENSE:
+            h._dense, h._sparse = np.frombuffer(body, dtype=np.uint8).copy(), None
+        else:
+            h._sparse = {i: r for i, r in _PAIR.iter_unpack(body)}
+        return h
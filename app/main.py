@@ -1,12 +1,21 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import os
 
 from app.api.routers.system import router as system_router
 from app.api.routers.data import router as data_router
-from app.api.routers.detection import router as detection_router
 from app.api.routers.anomalies import router as anomalies_router
+from app.api.routers.logs import router as logs_router
 from app.api.routers.users import router as users_router
+from app.domain.services.stream_detector import get_stream_detector
+from app.infra.db.database import SessionLocal, engine
+from app.infra.db.lookup_cache import lookup_cache
+from app.infra.feed.anomaly_feed import start_feed, stop_feed
+from app.core.auth_supabase import init_jwks, stop_jwks
+from app.core.config import settings
+from app.infra.db.uow_sqlalchemy import SQLAlchemyUoW
+from app.api.metrics import MetricsMiddleware, metrics_response
 
 app = FastAPI(title="UEBA API", version="0.1.0")
 
@@ -21,21 +30,88 @@ app.add_middleware(
     allow_headers=['*'],  # مهم لـ Authorization
 )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return metrics_response()
+
+@app.on_event("startup")
+def _preload_lookups():
+    try:
+        lookup_cache.preload(engine)
+    except Exception as e:
+        print("Lookup preload error:", e)
+
+@app.on_event("startup")
+def _preload_models():
+    if not (settings.MODEL_PRELOAD and settings.SERVES_DETECTION):
+        return
+    # catboost / joblib (and the model registry) load here, not at import time
+    from app.infra.models.preload import preload_models, start_model_watcher
+    try:
+        preload_models()
+    except Exception as e:
+        print("Model preload error:", e)
+    start_model_watcher(settings.MODEL_WATCH_SECONDS)
+
+@app.on_event("startup")
+def _rebuild_stream_state():
+    stream = get_stream_detector() if settings.SERVES_API else None
+    if not stream:
+        return
+    try:
+        with SQLAlchemyUoW(SessionLocal()) as uow:
+            stream.rebuild(uow)
+    except Exception as e:
+        print("Stream state rebuild error:", e)
+
+@app.on_event("startup")
+def _load_jwks():
+    if not settings.SUPABASE_JWKS_URL:
+        return
+    try:
+        init_jwks()
+    except Exception as e:
+        print("JWKS load error:", e)
+
+@app.on_event("shutdown")
+def _stop_jwks():
+    stop_jwks()
+
+@app.on_event("startup")
+async def _start_anomaly_feed():
+    try:
+        start_feed(asyncio.get_running_loop(), engine)
+    except Exception as e:
+        print("Anomaly feed start error:", e)
+
+@app.on_event("shutdown")
+def _stop_anomaly_feed():
+    stop_feed()
+
 app.include_router(system_router,     prefix="/api/v1")
-app.include_router(data_router,       prefix="/api/v1")
-app.include_router(detection_router,  prefix="/api/v1")
-app.include_router(anomalies_router,  prefix="/api/v1")
-app.include_router(users_router,      prefix="/api/v1")
+if settings.SERVES_API:
+    app.include_router(data_router,       prefix="/api/v1")
+    app.include_router(anomalies_router,  prefix="/api/v1")
+    app.include_router(logs_router,       prefix="/api/v1")
+    app.include_router(users_router,      prefix="/api/v1")
+if settings.SERVES_DETECTION:
+    # imported only here so "api" workers never load the detection service and model code
+    from app.api.routers.detection import router as detection_router
+    app.include_router(detection_router,  prefix="/api/v1")
 
 
 
 
 # === UEBA demo routers (users, analytics) ===
-try:
-    from app.api.routers.users import router as users_router
-    from app.api.routers.analytics import router as analytics_router
-    app.include_router(users_router)
-    app.include_router(analytics_router)
-except Exception as e:
-    # ??? ????? ???? ?? ?? ImportError
-    print("Router include error:", e)
+if settings.SERVES_API:
+    try:
+        from app.api.routers.users import router as users_router
+        from app.api.routers.analytics import router as analytics_router
+        app.include_router(users_router)
+        app.include_router(analytics_router)
+    except Exception as e:
+        # ??? ????? ???? ?? ?? ImportError
+        print("Router include error:", e)
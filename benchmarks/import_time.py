@@ -0,0 +1,112 @@
+"""
+Cold-start guard for API workers: imports `app.main` in fresh interpreters with
+`-X importtime` and checks the import time, the peak RSS and that the heavy ML
+libraries stay unloaded.
+
+    python benchmarks/import_time.py                  # APP_ROLE=api, default budgets
+    python benchmarks/import_time.py --role all --max-ms 2500 --max-rss-mb 300
+    python benchmarks/import_time.py --save           # also write benchmarks/results/import_time_<role>.json
+
+Exits with status 1 when a budget is exceeded or a forbidden module was imported.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+RESULTS = ROOT / "benchmarks" / "results"
+
+# must not be imported by an API worker at startup
+FORBIDDEN = ("pandas", "catboost", "joblib", "geoip2", "sklearn", "pyarrow")
+
+_CHILD = """
+import json, resource, sys
+import app.main
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+# ru_maxrss is KiB on Linux, bytes on macOS
+rss_mb = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+print(json.dumps({"rss_mb": rss_mb, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (FORBIDDEN,)
+
+
+def _parse_importtime(stderr: str):
+    """-> (total µs of the top-level imports, {top-level package: cumulative µs})"""
+    total, packages = 0, {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            cumulative = int(cumulative)
+        except ValueError:
+            continue  # header line
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        name = name.strip()
+        if depth == 0:
+            total += cumulative
+        top = name.split(".")[0]
+        packages[top] = max(packages.get(top, 0), cumulative)
+    return total, packages
+
+
+def run_once(role: str):
+    env = dict(os.environ, APP_ROLE=role, MODEL_PRELOAD="0")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _CHILD], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+    child = json.loads(proc.stdout.strip().splitlines()[-1])
+    total_us, packages = _parse_importtime(proc.stderr)
+    return total_us / 1000.0, child["rss_mb"], child["loaded"], packages
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--role", default="api", choices=("api", "detection", "all"))
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--max-ms", type=float, default=1200.0, help="budget for the median import time")
+    ap.add_argument("--max-rss-mb", type=float, default=120.0, help="budget for the median peak RSS")
+    ap.add_argument("--top", type=int, default=10, help="slowest top-level packages to report")
+    ap.add_argument("--save", action="store_true")
+    args = ap.parse_args(argv)
+
+    runs = [run_once(args.role) for _ in range(args.runs)]
+    ms = statistics.median(r[0] for r in runs)
+    rss = statistics.median(r[1] for r in runs)
+    loaded = sorted({m for r in runs for m in r[2]})
+    packages = runs[-1][3]
+    slowest = sorted(packages.items(), key=lambda kv: -kv[1])[:args.top]
+
+    result = {
+        "role": args.role,
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import_ms": round(ms, 1),
+        "import_ms_runs": [round(r[0], 1) for r in runs],
+        "rss_mb": round(rss, 1),
+        "forbidden_loaded": loaded if args.role == "api" else [],
+        "slowest_packages_ms": {k: round(v / 1000.0, 1) for k, v in slowest},
+        "budget": {"max_ms": args.max_ms, "max_rss_mb": args.max_rss_mb},
+    }
+    failures = []
+    if ms > args.max_ms:
+        failures.append(f"import time {ms:.0f} ms > {args.max_ms:.0f} ms")
+    if rss > args.max_rss_mb:
+        failures.append(f"peak RSS {rss:.0f} MB > {args.max_rss_mb:.0f} MB")
+    if result["forbidden_loaded"]:
+        failures.append("API worker imported " + ", ".join(result["forbidden_loaded"]))
+    result["ok"] = not failures
+
+    print(json.dumps(result, indent=2))
+    if args.save:
+        RESULTS.mkdir(parents=True, exist_ok=True)
+        (RESULTS / f"import_time_{args.role}.json").write_text(json.dumps(result, indent=2) + "\n")
+    for f in failures:
+        print("FAIL:", f, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,336 @@
+"""
+Benchmark suite over synthetic logs (benchmarks/synth.py) at fixed scales.
+
+    python benchmarks/suite.py --scale small --only infer               # no database needed
+    python benchmarks/suite.py --scale small --allow-writes --save       # full suite against DATABASE_URL
+    python benchmarks/suite.py --scale medium --allow-writes --compare benchmarks/results/medium-baseline.json
+
+Benchmarks: ingest (/data/upload-logs handler), log_bulk_add (LogRepo.bulk_add),
+feature_window, rule:<name> for every registered rule, infer:<model>
+(CatBoostDetector.infer) and anomaly_bulk_add (AnomalyRepo.bulk_add).
+
+Everything except `infer` writes to the database in DATABASE_URL: point it at
+a scratch database (migrated with `alembic upgrade head`) and pass
+--allow-writes. Data is generated to end at the current hour so the
+time-windowed rules and features see it. log_bulk_add and anomaly_bulk_add
+are rolled back; ingested logs stay.
+
+Results (seconds, rows, rows/s per benchmark plus the environment) are
+printed as JSON, written to benchmarks/results/<scale>-<UTC timestamp>.json
+with --save, and checked against an earlier result with --compare: exit
+status 1 when any benchmark's rows/s dropped by more than --max-regression.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+RESULTS = ROOT / "benchmarks" / "results"
+sys.path.insert(0, str(ROOT))
+
+from synth import SynthConfig, COLUMNS, generate, to_csv_lines  # noqa: E402
+
+SCALES = {
+    # users, days, mean events per user per weekday (~0.1M / ~3M / ~80M events)
+    "small": dict(users=1_000, days=7, events_per_day=20),
+    "medium": dict(users=10_000, days=14, events_per_day=30),
+    "large": dict(users=100_000, days=30, events_per_day=33),
+}
+ATTACKS_PER_1K_USERS = {"brute_force": 2, "impossible_travel": 2, "exfiltration": 1, "new_device": 2}
+DB_BENCHMARKS = ("ingest", "log_bulk_add", "feature_window", "rules", "anomaly_bulk_add")
+ALL_BENCHMARKS = DB_BENCHMARKS + ("infer",)
+
+
+def scale_config(scale: str, seed: int, end: datetime) -> SynthConfig:
+    s = SCALES[scale]
+    per_k = max(1, s["users"] // 1000)
+    return SynthConfig(
+        users=s["users"], days=s["days"], events_per_day=s["events_per_day"], end=end.date(), seed=seed,
+        attacks={k: v * per_k for k, v in ATTACKS_PER_1K_USERS.items()},
+    )
+
+
+class Timings:
+    def __init__(self):
+        self.results = {}
+
+    def record(self, name: str, seconds: float, rows: int, **extra) -> None:
+        self.results[name] = {
+            "seconds": round(seconds, 4),
+            "rows": int(rows),
+            "rows_per_s": round(rows / seconds, 1) if seconds > 0 else None,
+            **extra,
+        }
+        print(f"  {name:<32} {seconds:9.3f}s  {rows:>11,} rows", file=sys.stderr)
+
+    def best_of(self, name: str, repeat: int, fn) -> None:
+        """Runs fn() -> rows `repeat` times and records the fastest run."""
+        best, rows = None, 0
+        for _ in range(max(1, repeat)):
+            t0 = time.perf_counter()
+            rows = fn()
+            dt = time.perf_counter() - t0
+            best = dt if best is None else min(best, dt)
+        self.record(name, best, rows, repeat=repeat)
+
+
+# -------- database benchmarks --------
+def _uow():
+    from app.infra.db.database import SessionLocal
+    from app.infra.db.uow_sqlalchemy import SQLAlchemyUoW
+    return SQLAlchemyUoW(SessionLocal())
+
+
+def bench_ingest(t: Timings, cfg: SynthConfig, until: datetime, upload_rows: int) -> None:
+    from starlette.datastructures import UploadFile
+    from app.api.routers.data import upload_logs
+
+    header = ",".join(COLUMNS) + "\n"
+    total, elapsed, uploads = 0, 0.0, 0
+
+    def post(chunk):
+        nonlocal total, elapsed, uploads
+        body = (header + to_csv_lines(chunk)).encode()
+        uow = _uow()
+        try:
+            t0 = time.perf_counter()
+            asyncio.run(upload_logs(UploadFile(io.BytesIO(body), filename="bench.csv"), uow))
+            elapsed += time.perf_counter() - t0
+        finally:
+            uow._session.close()
+        total += len(chunk)
+        uploads += 1
+
+    # generated days run to midnight; nothing later than `cutoff` (the current hour) is uploaded
+    cutoff = (cfg.end - timedelta(days=1)).isoformat()
+    cutoff = f"{cutoff}T{until:%H:%M:%S}Z"
+    pending = []
+    for day in generate(cfg):
+        pending.extend(r for r in day if r[1] < cutoff)
+        while len(pending) >= upload_rows:
+            post(pending[:upload_rows])
+            del pending[:upload_rows]
+    if pending:
+        post(pending)
+    t.record("ingest", elapsed, total, uploads=uploads, upload_rows=upload_rows)
+
+
+def bench_log_bulk_add(t: Timings, cfg: SynthConfig, rows: int, repeat: int) -> None:
+    from app.domain.entities.log import LogEntity
+    from app.api.routers.data import _parse_ts
+
+    uow = _uow()
+    try:
+        users = {}
+        sample = []
+        # a different seed: same shape, not a copy of the ingested rows
+        for day in generate(SynthConfig(**{**cfg.__dict__, "seed": cfg.seed + 1, "attacks": {}})):
+            sample.extend(day[:rows - len(sample)])
+            if len(sample) >= rows:
+                break
+        at_ids = {}
+        entities = []
+        for r in sample:
+            row = dict(zip(COLUMNS, r))
+            if row["uid"] not in users:
+                u = uow.users.get_by_uid(row["uid"])
+                if u is None:
+                    continue
+                users[row["uid"]] = u.id
+            code = row["activity_type"]
+            if code not in at_ids:
+                at_ids[code] = uow.logs.resolve_activity_type_id(code)
+            ts = _parse_ts(row["timestamp"])
+            entities.append(LogEntity(id=None, user_id=users[row["uid"]], ts=ts, activity_type_id=at_ids[code],
+                                      source_ip=row["source_ip"], params=row, hour=ts.hour))
+        if not entities:
+            raise SystemExit("log_bulk_add needs users: run the ingest benchmark first")
+        uow.commit()  # lookup rows created on first use
+
+        def run():
+            n = uow.logs.bulk_add(entities)
+            uow._session.flush()
+            uow.rollback()
+            return n
+
+        t.best_of("log_bulk_add", repeat, run)
+    finally:
+        uow._session.close()
+
+
+def bench_feature_window(t: Timings, end: datetime, repeat: int) -> None:
+    uow = _uow()
+    try:
+        t.best_of("feature_window", repeat, lambda: len(uow.logs.feature_window(hours=24, end=end)))
+    finally:
+        uow.rollback()
+        uow._session.close()
+
+
+def bench_rules(t: Timings, repeat: int) -> None:
+    from app.domain.rules.registry import ALL_RULES
+
+    for name, rule in ALL_RULES.items():
+        uow = _uow()
+        try:
+            t.best_of(f"rule:{name}", repeat, lambda: len(list(rule.run(uow))))
+        finally:
+            uow.rollback()
+            uow._session.close()
+
+
+def bench_anomaly_bulk_add(t: Timings, rows: int, repeat: int, seed: int) -> None:
+    from app.infra.db.models import User
+
+    uow = _uow()
+    try:
+        user_ids = [uid for (uid,) in uow._session.query(User.id).limit(10_000).all()]
+        if not user_ids:
+            raise SystemExit("anomaly_bulk_add needs users: run the ingest benchmark first")
+        rng = np.random.default_rng([seed, 9])
+        now = datetime.now(timezone.utc)
+        picks = rng.choice(user_ids, size=rows).tolist()
+        scores = rng.random(rows).tolist()
+        anomalies = [
+            {"user_id": u, "anomaly_type": "model_ueba", "score": s, "risk": round(30 + 70 * s, 2),
+             "confidence": 0.8, "detected_at": now - timedelta(minutes=i % 1440), "evidence": {"bench": True}}
+            for i, (u, s) in enumerate(zip(picks, scores))
+        ]
+
+        def run():
+            n = uow.anomalies.bulk_add(anomalies)
+            uow._session.flush()
+            uow.rollback()
+            return n
+
+        t.best_of("anomaly_bulk_add", repeat, run)
+    finally:
+        uow._session.close()
+
+
+# -------- model benchmarks (no database) --------
+def bench_infer(t: Timings, users: int, repeat: int, seed: int) -> None:
+    from app.domain.services.feature_builder import FEATURE_COLUMNS
+    from app.infra.models.catboost_detector import CatBoostDetector
+    from app.infra.models.model_registry import all_models
+
+    models = all_models()
+    if not models:
+        print("  infer: no model files found, skipped", file=sys.stderr)
+        return
+    rng = np.random.default_rng([seed, 8])
+    X = rng.poisson(5, size=(users, len(FEATURE_COLUMNS))).astype(np.float64)
+    rows = [{"user_id": i + 1, **dict(zip(FEATURE_COLUMNS, x))} for i, x in enumerate(X.tolist())]
+    for mp in models:
+        det = CatBoostDetector(mp.path)
+        det.load(warm_up=True)
+        t.best_of(f"infer:{mp.name}", repeat, lambda: len(det.infer(rows)))
+
+
+# -------- results --------
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "git_commit": commit,
+        "numpy": np.__version__,
+    }
+
+
+def compare(current: dict, baseline: dict, max_regression: float) -> list:
+    """Names of benchmarks whose rows/s fell by more than `max_regression`."""
+    regressed = []
+    for name, cur in current["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not old or not old.get("rows_per_s") or not cur.get("rows_per_s"):
+            continue
+        change = cur["rows_per_s"] / old["rows_per_s"] - 1
+        flag = change < -max_regression
+        print(f"  {name:<32} {old['rows_per_s']:>12,.0f} -> {cur['rows_per_s']:>12,.0f} rows/s  "
+              f"{change:+7.1%}{'  REGRESSION' if flag else ''}", file=sys.stderr)
+        if flag:
+            regressed.append(name)
+    return regressed
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scale", choices=sorted(SCALES), default="small")
+    ap.add_argument("--only", default="", help=f"comma-separated subset of {', '.join(ALL_BENCHMARKS)}")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--repeat", type=int, default=3, help="runs per benchmark (fastest kept); ingest runs once")
+    ap.add_argument("--upload-rows", type=int, default=50_000, help="rows per upload-logs call")
+    ap.add_argument("--bulk-rows", type=int, default=50_000, help="rows per bulk_add benchmark")
+    ap.add_argument("--allow-writes", action="store_true", help="required for the database benchmarks")
+    ap.add_argument("--save", action="store_true", help="write benchmarks/results/<scale>-<timestamp>.json")
+    ap.add_argument("--compare", help="earlier result file to check against")
+    ap.add_argument("--max-regression", type=float, default=0.2, help="allowed rows/s drop (0.2 = 20%%)")
+    args = ap.parse_args(argv)
+
+    selected = [b.strip() for b in args.only.split(",") if b.strip()] or list(ALL_BENCHMARKS)
+    unknown = set(selected) - set(ALL_BENCHMARKS)
+    if unknown:
+        ap.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+    if any(b in DB_BENCHMARKS for b in selected) and not args.allow_writes:
+        ap.error("database benchmarks write to DATABASE_URL; pass --allow-writes (scratch database only) "
+                 "or --only infer")
+
+    # data ends at the top of the next hour: rule and feature windows are relative to now
+    end = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    cfg = scale_config(args.scale, args.seed, end + timedelta(days=1))
+    t = Timings()
+    print(f"scale={args.scale} users={cfg.users} days={cfg.days} events/day={cfg.events_per_day}", file=sys.stderr)
+
+    if "ingest" in selected:
+        bench_ingest(t, cfg, end, args.upload_rows)
+    if "log_bulk_add" in selected:
+        bench_log_bulk_add(t, cfg, args.bulk_rows, args.repeat)
+    if "feature_window" in selected:
+        bench_feature_window(t, end, args.repeat)
+    if "rules" in selected:
+        bench_rules(t, args.repeat)
+    if "infer" in selected:
+        bench_infer(t, cfg.users, args.repeat, args.seed)
+    if "anomaly_bulk_add" in selected:
+        bench_anomaly_bulk_add(t, args.bulk_rows, args.repeat, args.seed)
+
+    report = {
+        "scale": args.scale,
+        "at": datetime.now(timezone.utc).isoformat(),
+        "config": {**SCALES[args.scale], "seed": args.seed, "repeat": args.repeat, "benchmarks": selected},
+        "environment": environment(),
+        "results": t.results,
+    }
+    print(json.dumps(report, indent=1))
+    if args.save:
+        RESULTS.mkdir(parents=True, exist_ok=True)
+        path = RESULTS / f"{args.scale}-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
+        path.write_text(json.dumps(report, indent=1) + "\n")
+        print(f"saved {path.relative_to(ROOT)}", file=sys.stderr)
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if baseline.get("scale") != args.scale:
+            print(f"warning: comparing scale {args.scale} against {baseline.get('scale')}", file=sys.stderr)
+        if compare(report, baseline, args.max_regression):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,298 @@
+"""
+Deterministic synthetic activity logs in the upload format
+(uid, timestamp, activity_type, source_ip, username, email + resource, device params).
+
+    python benchmarks/synth.py --users 10000 --days 14 --events-per-day 30 --out logs.csv
+    python benchmarks/synth.py --users 100000 --days 30 --events-per-day 33 --format parquet --out logs.parquet
+    python benchmarks/synth.py --attacks brute_force=20,impossible_travel=10,exfiltration=5,new_device=10 ...
+
+The same arguments always produce the same file. Rows are generated one day
+at a time (sorted by time within the day) and streamed to the writer, so 100M
+events need memory for one day only. Injected attacks are listed in a
+`<out>.truth.json` sidecar for detection-quality checks.
+"""
+import argparse
+import json
+import sys
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+COLUMNS = ["uid", "timestamp", "activity_type", "source_ip", "username", "email", "resource", "device"]
+
+DEFAULT_MIX = {
+    "login_success": 0.20,
+    "login_failed": 0.02,
+    "logout": 0.10,
+    "file_access": 0.36,
+    "file_download": 0.08,
+    "email_send": 0.16,
+    "vpn_connect": 0.075,
+    "privilege_change": 0.005,
+}
+# activities that carry a `resource` param
+RESOURCE_ACTIVITIES = {"file_access", "file_download"}
+ATTACKS = ("brute_force", "impossible_travel", "exfiltration", "new_device")
+# "HH:MM:SS" for every second of the day; formatting timestamps is a lookup
+_CLOCK = [f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in range(86400)]
+
+
+@dataclass
+class SynthConfig:
+    users: int = 1000
+    days: int = 7
+    events_per_day: float = 20.0
+    end: date = date(2026, 1, 1)
+    seed: int = 42
+    mix: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_MIX))
+    after_hours_ratio: float = 0.05
+    ip_churn: float = 0.02
+    weekend_factor: float = 0.2
+    attacks: Dict[str, int] = field(default_factory=dict)
+    max_events: int = 0
+
+    @property
+    def start(self) -> date:
+        return self.end - timedelta(days=self.days)
+
+
+class _Population:
+    """Per-user constants: activity level, home /24, devices, resource share."""
+
+    def __init__(self, cfg: SynthConfig):
+        rng = np.random.default_rng([cfg.seed, 0])
+        n = cfg.users
+        self.weight = rng.lognormal(0.0, 0.6, n)
+        self.weight /= self.weight.mean()
+        self.uid = [f"u{i:07d}" for i in range(n)]
+        self.username = [f"user{i}" for i in range(n)]
+        self.email = [f"user{i}@corp.example" for i in range(n)]
+        # home network 10.x.y.0/24 with up to 3 hosts per user
+        self.home = [f"10.{(i >> 8) & 255}.{i & 255}." for i in range(n)]
+        self.share = rng.integers(0, max(1, n // 50), n)
+
+
+def _public_ips(rng: np.random.Generator, k: int) -> List[str]:
+    octs = rng.integers(0, 256, size=(k, 4))
+    octs[:, 0] = rng.choice(np.r_[11:100, 101:127, 128:169, 170:172, 173:192, 193:223], size=k)
+    return [f"{a}.{b}.{c}.{d}" for a, b, c, d in octs.tolist()]
+
+
+def _day_rows(cfg: SynthConfig, pop: _Population, day_idx: int, codes: List[str],
+              probs: np.ndarray) -> Tuple[np.ndarray, List[tuple]]:
+    """(seconds-of-day, rows) for one day, unsorted."""
+    rng = np.random.default_rng([cfg.seed, 1, day_idx])
+    day = cfg.start + timedelta(days=day_idx)
+    rate = cfg.events_per_day * (cfg.weekend_factor if day.weekday() >= 5 else 1.0)
+    counts = rng.poisson(rate * pop.weight)
+    users = np.repeat(np.arange(cfg.users), counts)
+    n = len(users)
+
+    # business hours ~ N(13h, 2.5h) in [8h, 19h); after hours uniform over [0h, 8h) + [19h, 24h)
+    after = rng.random(n) < cfg.after_hours_ratio
+    hours = np.clip(rng.normal(13.0, 2.5, n), 8.0, 18.999)
+    off = rng.random(n) * 13.0
+    hours[after] = np.where(off[after] < 8.0, off[after], off[after] + 11.0)
+    secs = np.minimum((hours * 3600).astype(np.int64), 86399)
+
+    acts = rng.choice(len(codes), size=n, p=probs)
+    churn = rng.random(n) < cfg.ip_churn
+    host = rng.integers(1, 4, n)
+    doc = rng.integers(0, 40, n)
+    dev = rng.integers(0, 2, n)
+    foreign = iter(_public_ips(rng, int(churn.sum())))
+
+    prefix = day.isoformat() + "T"
+    rows = []
+    for u, s, a, ch, h, d, dv in zip(users.tolist(), secs.tolist(), acts.tolist(), churn.tolist(),
+                                     host.tolist(), doc.tolist(), dev.tolist()):
+        code = codes[a]
+        share = int(pop.share[u])
+        if ch:
+            ip = next(foreign)
+            device = f"dev-{u:07d}-x{d}"
+            resource = f"/share/p{(share + d) % max(1, cfg.users // 50)}/doc{d}"
+        else:
+            ip = pop.home[u] + str(h)
+            device = f"dev-{u:07d}-{dv}"
+            resource = f"/share/p{share}/doc{d}"
+        rows.append((pop.uid[u], prefix + _CLOCK[s] + "Z", code, ip, pop.username[u], pop.email[u],
+                     resource if code in RESOURCE_ACTIVITIES else "", device))
+    return secs, rows
+
+
+def _attack_plan(cfg: SynthConfig) -> Dict[int, List[Tuple[str, int, int]]]:
+    """day index -> [(attack, user index, start second)]"""
+    rng = np.random.default_rng([cfg.seed, 2])
+    plan: Dict[int, List[Tuple[str, int, int]]] = {}
+    for kind in ATTACKS:
+        for _ in range(int(cfg.attacks.get(kind, 0))):
+            day = int(rng.integers(0, cfg.days))
+            plan.setdefault(day, []).append((kind, int(rng.integers(0, cfg.users)), int(rng.integers(0, 86400 - 7200))))
+    return plan
+
+
+def _attack_rows(cfg: SynthConfig, pop: _Population, day_idx: int, kind: str, u: int,
+                 start: int) -> Tuple[List[int], List[tuple], dict]:
+    rng = np.random.default_rng([cfg.seed, 3, day_idx, u, start])
+    day = cfg.start + timedelta(days=day_idx)
+    prefix = day.isoformat() + "T"
+    ips = _public_ips(rng, 2)
+    home = pop.home[u] + "1"
+    device = f"dev-{u:07d}-0"
+    secs: List[int] = []
+    acts: List[tuple] = []
+
+    def add(sec: int, code: str, ip: str, resource: str = "", dev: str = device):
+        sec = min(int(sec), 86399)
+        secs.append(sec)
+        acts.append((pop.uid[u], prefix + _CLOCK[sec] + "Z", code, ip, pop.username[u], pop.email[u], resource, dev))
+
+    if kind == "brute_force":
+        n = int(rng.integers(8, 25))
+        for k in range(n):
+            add(start + k * int(rng.integers(2, 15)), "login_failed", ips[0])
+        add(start + n * 15 + 5, "login_success", ips[0])
+    elif kind == "impossible_travel":
+        add(start, "login_success", home)
+        add(start + int(rng.integers(300, 1500)), "login_success", ips[0])
+    elif kind == "exfiltration":
+        # after-hours download burst over many distinct resources
+        start = 19 * 3600 + start % (4 * 3600)
+        for k in range(int(rng.integers(120, 400))):
+            add(start + k * 5, "file_download", home, f"/share/p{int(rng.integers(0, 10_000))}/doc{k}")
+    elif kind == "new_device":
+        add(start, "login_success", ips[1], dev=f"dev-{u:07d}-new")
+    truth = {"attack": kind, "uid": pop.uid[u], "start": prefix + _CLOCK[min(start, 86399)] + "Z", "events": len(acts)}
+    return secs, acts, truth
+
+
+def generate(cfg: SynthConfig, truth: List[dict] | None = None) -> Iterator[List[tuple]]:
+    """Yield one time-sorted list of COLUMNS tuples per day (stops at `max_events`)."""
+    codes = list(cfg.mix)
+    probs = np.array([cfg.mix[c] for c in codes], dtype=np.float64)
+    probs /= probs.sum()
+    pop = _Population(cfg)
+    plan = _attack_plan(cfg)
+    emitted = 0
+    for d in range(cfg.days):
+        secs, rows = _day_rows(cfg, pop, d, codes, probs)
+        secs = secs.tolist()
+        for kind, u, start in plan.get(d, []):
+            a_secs, a_rows, t = _attack_rows(cfg, pop, d, kind, u, start)
+            secs.extend(a_secs)
+            rows.extend(a_rows)
+            if truth is not None:
+                truth.append(t)
+        order = np.argsort(np.asarray(secs, dtype=np.int64), kind="stable")
+        day_rows = [rows[i] for i in order.tolist()]
+        if cfg.max_events and emitted + len(day_rows) > cfg.max_events:
+            day_rows = day_rows[:cfg.max_events - emitted]
+        emitted += len(day_rows)
+        if day_rows:
+            yield day_rows
+        if cfg.max_events and emitted >= cfg.max_events:
+            return
+
+
+# -------- writers --------
+def to_csv_lines(rows: List[tuple]) -> str:
+    # generated values never contain commas, quotes or newlines
+    return "".join(",".join(r) + "\n" for r in rows)
+
+
+def to_ndjson_lines(rows: List[tuple]) -> str:
+    out = []
+    for r in rows:
+        out.append("{" + ",".join(f'"{k}":"{v}"' for k, v in zip(COLUMNS, r) if v) + "}\n")
+    return "".join(out)
+
+
+def write(cfg: SynthConfig, path: str, fmt: str) -> dict:
+    truth: List[dict] = []
+    total = 0
+    if fmt == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("parquet output needs pyarrow")
+        schema = pa.schema([(c, pa.timestamp("s", tz="UTC") if c == "timestamp" else pa.string()) for c in COLUMNS])
+        with pq.ParquetWriter(path, schema) as w:
+            for rows in generate(cfg, truth):
+                cols = list(zip(*rows))
+                arrays = []
+                for c, vals in zip(COLUMNS, cols):
+                    if c == "timestamp":
+                        ts = np.array([v[:-1] for v in vals], dtype="datetime64[s]")
+                        arrays.append(pa.array(ts, type=pa.timestamp("s", tz="UTC")))
+                    else:
+                        arrays.append(pa.array(vals, type=pa.string()))
+                w.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                total += len(rows)
+    else:
+        fmt_rows = to_csv_lines if fmt == "csv" else to_ndjson_lines
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            if fmt == "csv":
+                f.write(",".join(COLUMNS) + "\n")
+            for rows in generate(cfg, truth):
+                f.write(fmt_rows(rows))
+                total += len(rows)
+    with open(path + ".truth.json", "w", encoding="utf-8") as f:
+        json.dump({"config": _config_dict(cfg), "events": total, "attacks": truth}, f, indent=1)
+    return {"events": total, "attacks": len(truth)}
+
+
+def _config_dict(cfg: SynthConfig) -> dict:
+    d = dict(cfg.__dict__)
+    d["end"] = cfg.end.isoformat()
+    return d
+
+
+def _pairs(s: str, cast=float) -> Dict[str, float]:
+    out = {}
+    for part in filter(None, (p.strip() for p in s.split(","))):
+        k, v = part.split("=", 1)
+        out[k.strip()] = cast(v)
+    return out
+
+
+def parse_args(argv=None) -> Tuple[SynthConfig, argparse.Namespace]:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--users", type=int, default=1000)
+    ap.add_argument("--days", type=int, default=7)
+    ap.add_argument("--events-per-day", type=float, default=20.0, help="mean events per user per weekday")
+    ap.add_argument("--end", default="2026-01-01", help="exclusive end date (YYYY-MM-DD or 'today')")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--mix", default="", help="activity weights, e.g. login_success=0.3,file_access=0.5")
+    ap.add_argument("--after-hours-ratio", type=float, default=0.05)
+    ap.add_argument("--ip-churn", type=float, default=0.02, help="share of events from a new IP/device")
+    ap.add_argument("--attacks", default="", help="e.g. brute_force=10,impossible_travel=5,exfiltration=2")
+    ap.add_argument("--max-events", type=int, default=0, help="stop after this many events (0 = no cap)")
+    ap.add_argument("--format", choices=("csv", "ndjson", "parquet"), default="csv")
+    ap.add_argument("--out", required=True)
+    args = ap.parse_args(argv)
+    end = datetime.now(timezone.utc).date() + timedelta(days=1) if args.end == "today" else date.fromisoformat(args.end)
+    unknown = set(_pairs(args.attacks)) - set(ATTACKS)
+    if unknown:
+        ap.error(f"unknown attacks: {', '.join(sorted(unknown))} (known: {', '.join(ATTACKS)})")
+    cfg = SynthConfig(
+        users=args.users, days=args.days, events_per_day=args.events_per_day, end=end, seed=args.seed,
+        mix=_pairs(args.mix) or dict(DEFAULT_MIX), after_hours_ratio=args.after_hours_ratio,
+        ip_churn=args.ip_churn, attacks={k: int(v) for k, v in _pairs(args.attacks).items()},
+        max_events=args.max_events,
+    )
+    return cfg, args
+
+
+def main(argv=None) -> int:
+    cfg, args = parse_args(argv)
+    info = write(cfg, args.out, args.format)
+    print(json.dumps({"out": args.out, **info}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,26 @@
+"""users risk_score index
+
+Revision ID: a3f1c9d2e7b4
+Revises: 6cf6e8c09ea2
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f1c9d2e7b4'
+down_revision: Union[str, Sequence[str], None] = '6cf6e8c09ea2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # top_by_risk orders by risk_score; refreshed set-based after each detection run
+    op.create_index('ix_users_risk_score', 'users', ['risk_score'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_risk_score', table_name='users')
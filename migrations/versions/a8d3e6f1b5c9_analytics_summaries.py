@@ -0,0 +1,59 @@
+"""analytics summary tables
+
+Revision ID: a8d3e6f1b5c9
+Revises: f7c2a5d9e4b8
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8d3e6f1b5c9'
+down_revision: Union[str, Sequence[str], None] = 'f7c2a5d9e4b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_anom_detected_at', 'anomalies', ['detected_at'])
+    op.create_table(
+        'anomaly_counts_hourly',
+        sa.Column('bucket', sa.DateTime(timezone=True), primary_key=True, nullable=False),
+        sa.Column('anomaly_type_id', sa.Integer(), sa.ForeignKey('anomaly_types.id'), primary_key=True, nullable=False),
+        sa.Column('anomaly_count', sa.Integer(), nullable=False),
+        sa.Column('risk_sum', sa.Float(), nullable=False),
+        sa.Column('max_risk', sa.Float(), nullable=False),
+    )
+    op.create_table(
+        'group_risk',
+        sa.Column('group_code', sa.String(length=64), primary_key=True, nullable=False),
+        sa.Column('group_name', sa.String(length=128), nullable=False),
+        sa.Column('user_count', sa.Integer(), nullable=False),
+        sa.Column('risk_sum', sa.Float(), nullable=False),
+        sa.Column('high_risk_users', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+    # backfill from existing data
+    op.execute("""
+        INSERT INTO anomaly_counts_hourly (bucket, anomaly_type_id, anomaly_count, risk_sum, max_risk)
+        SELECT date_trunc('hour', detected_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC', anomaly_type_id,
+               count(*), coalesce(sum(risk), 0), coalesce(max(risk), 0)
+        FROM anomalies
+        GROUP BY 1, 2
+    """)
+    op.execute("""
+        INSERT INTO group_risk (group_code, group_name, user_count, risk_sum, high_risk_users)
+        SELECT coalesce(r.code, 'employee'), coalesce(max(r.name), 'Employee'),
+               count(*), coalesce(sum(u.risk_score), 0), count(*) FILTER (WHERE u.risk_score >= 80)
+        FROM users u LEFT JOIN roles r ON r.id = u.role_id
+        GROUP BY 1
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('group_risk')
+    op.drop_table('anomaly_counts_hourly')
+    op.drop_index('ix_anom_detected_at', table_name='anomalies')
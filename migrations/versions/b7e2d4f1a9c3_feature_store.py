@@ -0,0 +1,43 @@
+"""feature store
+
+Revision ID: b7e2d4f1a9c3
+Revises: a3f1c9d2e7b4
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2d4f1a9c3'
+down_revision: Union[str, Sequence[str], None] = 'a3f1c9d2e7b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_features',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True, nullable=False),
+        sa.Column('window_end', sa.DateTime(timezone=True), primary_key=True, nullable=False),
+        sa.Column('feature_version', sa.Integer(), primary_key=True, nullable=False),
+        sa.Column('features', sa.JSON(), nullable=False),
+    )
+    op.create_index('ix_user_features_window', 'user_features', ['window_end', 'feature_version', 'user_id'])
+
+    op.create_table(
+        'feature_windows',
+        sa.Column('window_end', sa.DateTime(timezone=True), primary_key=True, nullable=False),
+        sa.Column('feature_version', sa.Integer(), primary_key=True, nullable=False),
+        sa.Column('window_hours', sa.Integer(), nullable=False),
+        sa.Column('user_count', sa.Integer(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('feature_windows')
+    op.drop_index('ix_user_features_window', table_name='user_features')
+    op.drop_table('user_features')
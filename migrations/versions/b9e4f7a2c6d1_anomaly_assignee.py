@@ -0,0 +1,25 @@
+"""anomalies.assignee for bulk triage
+
+Revision ID: b9e4f7a2c6d1
+Revises: a8d3e6f1b5c9
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9e4f7a2c6d1'
+down_revision: Union[str, Sequence[str], None] = 'a8d3e6f1b5c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('anomalies', sa.Column('assignee', sa.String(length=128), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('anomalies', 'assignee')
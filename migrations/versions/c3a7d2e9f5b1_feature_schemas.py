@@ -0,0 +1,30 @@
+"""feature schemas referenced by model anomaly evidence
+
+Revision ID: c3a7d2e9f5b1
+Revises: b9e4f7a2c6d1
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a7d2e9f5b1'
+down_revision: Union[str, Sequence[str], None] = 'b9e4f7a2c6d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'feature_schemas',
+        sa.Column('id', sa.String(length=12), primary_key=True, nullable=False),
+        sa.Column('columns', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('feature_schemas')
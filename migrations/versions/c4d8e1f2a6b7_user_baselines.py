@@ -0,0 +1,39 @@
+"""user baselines
+
+Revision ID: c4d8e1f2a6b7
+Revises: b7e2d4f1a9c3
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d8e1f2a6b7'
+down_revision: Union[str, Sequence[str], None] = 'b7e2d4f1a9c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_baselines',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True, nullable=False),
+        sa.Column('n_hours', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('mean', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('m2', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('cur_bucket', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('cur_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('hour_hist', sa.JSON(), nullable=False),
+        sa.Column('activity_counts', sa.JSON(), nullable=False),
+        sa.Column('last_alert_bucket', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+    op.create_index('ix_user_baselines_cur_bucket', 'user_baselines', ['cur_bucket'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_baselines_cur_bucket', table_name='user_baselines')
+    op.drop_table('user_baselines')
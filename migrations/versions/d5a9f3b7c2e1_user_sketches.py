@@ -0,0 +1,34 @@
+"""user sketches
+
+Revision ID: d5a9f3b7c2e1
+Revises: c4d8e1f2a6b7
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a9f3b7c2e1'
+down_revision: Union[str, Sequence[str], None] = 'c4d8e1f2a6b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_sketches',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True, nullable=False),
+        sa.Column('attr', sa.String(length=16), primary_key=True, nullable=False),
+        sa.Column('bucket_start', sa.DateTime(timezone=True), primary_key=True, nullable=False),
+        sa.Column('span_hours', sa.SmallInteger(), primary_key=True, nullable=False),
+        sa.Column('sketch', sa.LargeBinary(), nullable=False),
+    )
+    op.create_index('ix_user_sketches_bucket', 'user_sketches', ['span_hours', 'bucket_start'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_sketches_bucket', table_name='user_sketches')
+    op.drop_table('user_sketches')
@@ -0,0 +1,32 @@
+"""user novelty index
+
+Revision ID: e6b1c4d8f3a2
+Revises: d5a9f3b7c2e1
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b1c4d8f3a2'
+down_revision: Union[str, Sequence[str], None] = 'd5a9f3b7c2e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_novelty',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True, nullable=False),
+        sa.Column('attr', sa.String(length=16), primary_key=True, nullable=False),
+        sa.Column('bloom', sa.LargeBinary(), nullable=False),
+        sa.Column('n_items', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('first_seen_at', sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_novelty')
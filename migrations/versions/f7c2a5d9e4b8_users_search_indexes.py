@@ -0,0 +1,34 @@
+"""users search and keyset indexes
+
+Revision ID: f7c2a5d9e4b8
+Revises: e6b1c4d8f3a2
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7c2a5d9e4b8'
+down_revision: Union[str, Sequence[str], None] = 'e6b1c4d8f3a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # (risk_score, id) serves both ORDER BY risk_score and the users-list keyset
+    op.create_index('ix_users_risk_score_id', 'users', ['risk_score', 'id'])
+    op.drop_index('ix_users_risk_score', table_name='users')
+    for col in ('username', 'email', 'uid'):
+        op.create_index(f'ix_users_{col}_trgm', 'users', [col],
+                        postgresql_using='gin', postgresql_ops={col: 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    for col in ('username', 'email', 'uid'):
+        op.drop_index(f'ix_users_{col}_trgm', table_name='users')
+    op.create_index('ix_users_risk_score', 'users', ['risk_score'])
+    op.drop_index('ix_users_risk_score_id', table_name='users')